@@ -26,4 +26,12 @@ if sys.version_info >= (3, 12) and not hasattr(ForwardRef._evaluate, "__patched_
     ForwardRef._evaluate = _patched_forward_ref_evaluate  # type: ignore[attr-defined]
 
 
-from .main import create_app  # noqa: E402,F401
+def __getattr__(name: str):
+    # Importing the app factory pulls in FastAPI and every router, so defer it
+    # until it is asked for; scripts and workers that only need ``app.db`` or
+    # ``app.services`` stay cheap to import.
+    if name == "create_app":
+        from .main import create_app
+
+        return create_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
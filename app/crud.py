@@ -3,18 +3,57 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Type, TypeVar
 
+from sqlalchemy import or_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import SQLModel, Session, select
+from sqlmodel.sql.expression import SelectOfScalar
 
 from . import models
+from .services import archive, ledger, outbox, search
 
+ModelT = TypeVar("ModelT", bound=SQLModel)
+# Backends whose INSERT supports ON CONFLICT ... DO UPDATE ... RETURNING.
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+WriteHook = Callable[[Session, SQLModel], None]
 
-def create_property(session: Session, property_in: models.Property) -> models.Property:
-    session.add(property_in)
+_write_hooks: List[WriteHook] = []
+
+
+def register_write_hook(hook: WriteHook) -> None:
+    """Call ``hook(session, instance)`` after every committed create."""
+
+    if hook not in _write_hooks:
+        _write_hooks.append(hook)
+
+
+def unregister_write_hook(hook: WriteHook) -> None:
+    if hook in _write_hooks:
+        _write_hooks.remove(hook)
+
+
+def _notify(session: Session, instances: Iterable[SQLModel]) -> None:
+    if not _write_hooks:
+        return
+    for instance in instances:
+        for hook in _write_hooks:
+            hook(session, instance)
+
+
+def _save(session: Session, instance: ModelT) -> ModelT:
+    session.add(instance)
+    session.flush()
+    outbox.record_changes(session, [instance])
+    search.index_rows(session, [instance])
     session.commit()
-    session.refresh(property_in)
-    return property_in
+    session.refresh(instance)
+    _notify(session, [instance])
+    return instance
+
+
+def create_property(session: Session, property_in: models.Property) -> models.Property:
+    return _save(session, property_in)
 
 
 def list_properties(session: Session) -> List[models.Property]:
@@ -22,58 +61,58 @@ def list_properties(session: Session) -> List[models.Property]:
 
 
 def create_unit(session: Session, unit_in: models.Unit) -> models.Unit:
-    session.add(unit_in)
-    session.commit()
-    session.refresh(unit_in)
-    return unit_in
+    return _save(session, unit_in)
 
 
-def list_units(session: Session, property_id: Optional[int] = None) -> List[models.Unit]:
+def units_query(property_id: Optional[int] = None) -> SelectOfScalar[models.Unit]:
     statement = select(models.Unit)
     if property_id is not None:
         statement = statement.where(models.Unit.property_id == property_id)
-    return session.exec(statement).all()
+    return statement
+
+
+def list_units(session: Session, property_id: Optional[int] = None) -> List[models.Unit]:
+    return session.exec(units_query(property_id)).all()
 
 
 def create_household(session: Session, household_in: models.Household) -> models.Household:
-    session.add(household_in)
-    session.commit()
-    session.refresh(household_in)
-    return household_in
+    return _save(session, household_in)
 
 
 def get_household(session: Session, household_id: int) -> Optional[models.Household]:
     return session.get(models.Household, household_id)
 
 
-def list_households(session: Session, property_id: Optional[int] = None) -> List[models.Household]:
+def households_query(property_id: Optional[int] = None) -> SelectOfScalar[models.Household]:
     statement = select(models.Household)
     if property_id is not None:
         statement = statement.join(
             models.Unit, models.Unit.id == models.Household.unit_id
         ).where(models.Unit.property_id == property_id)
-    return session.exec(statement).all()
+    return statement
+
+
+def list_households(session: Session, property_id: Optional[int] = None) -> List[models.Household]:
+    return session.exec(households_query(property_id)).all()
 
 
 def create_resident(session: Session, resident_in: models.Resident) -> models.Resident:
-    session.add(resident_in)
-    session.commit()
-    session.refresh(resident_in)
-    return resident_in
+    return _save(session, resident_in)
 
 
-def list_residents(session: Session, household_id: Optional[int] = None) -> List[models.Resident]:
+def residents_query(household_id: Optional[int] = None) -> SelectOfScalar[models.Resident]:
     statement = select(models.Resident)
     if household_id is not None:
         statement = statement.where(models.Resident.household_id == household_id)
-    return session.exec(statement).all()
+    return statement
+
+
+def list_residents(session: Session, household_id: Optional[int] = None) -> List[models.Resident]:
+    return session.exec(residents_query(household_id)).all()
 
 
 def create_program(session: Session, program_in: models.Program) -> models.Program:
-    session.add(program_in)
-    session.commit()
-    session.refresh(program_in)
-    return program_in
+    return _save(session, program_in)
 
 
 def list_programs(session: Session) -> List[models.Program]:
@@ -81,50 +120,56 @@ def list_programs(session: Session) -> List[models.Program]:
 
 
 def create_certification(session: Session, certification_in: models.Certification) -> models.Certification:
-    session.add(certification_in)
-    session.commit()
-    session.refresh(certification_in)
-    return certification_in
+    return _save(session, certification_in)
 
 
-def list_certifications(
-    session: Session,
+def certifications_query(
     household_id: Optional[int] = None,
     program_id: Optional[int] = None,
-) -> List[models.Certification]:
+) -> SelectOfScalar[models.Certification]:
     statement = select(models.Certification)
     if household_id is not None:
         statement = statement.where(models.Certification.household_id == household_id)
     if program_id is not None:
         statement = statement.where(models.Certification.program_id == program_id)
-    return session.exec(statement).all()
+    return statement
+
+
+def list_certifications(
+    session: Session,
+    household_id: Optional[int] = None,
+    program_id: Optional[int] = None,
+) -> List[models.Certification]:
+    return session.exec(certifications_query(household_id, program_id)).all()
 
 
 def create_compliance_event(
     session: Session,
     event_in: models.ComplianceEvent,
 ) -> models.ComplianceEvent:
-    session.add(event_in)
-    session.commit()
-    session.refresh(event_in)
-    return event_in
+    return _save(session, event_in)
 
 
-def list_compliance_events(session: Session, household_id: Optional[int] = None) -> List[models.ComplianceEvent]:
-    statement = select(models.ComplianceEvent)
+def compliance_events_query(
+    household_id: Optional[int] = None,
+    *,
+    model=models.ComplianceEvent,
+) -> SelectOfScalar[models.ComplianceEvent]:
+    statement = select(model)
     if household_id is not None:
-        statement = statement.where(models.ComplianceEvent.household_id == household_id)
-    return session.exec(statement).all()
+        statement = statement.where(model.household_id == household_id)
+    return statement
+
+
+def list_compliance_events(session: Session, household_id: Optional[int] = None) -> List[models.ComplianceEvent]:
+    return session.exec(compliance_events_query(household_id)).all()
 
 
 def create_waitlist_applicant(
     session: Session,
     applicant_in: models.WaitlistApplicant,
 ) -> models.WaitlistApplicant:
-    session.add(applicant_in)
-    session.commit()
-    session.refresh(applicant_in)
-    return applicant_in
+    return _save(session, applicant_in)
 
 
 def list_waitlist_applicants(session: Session, property_id: Optional[int] = None) -> List[models.WaitlistApplicant]:
@@ -135,10 +180,7 @@ def list_waitlist_applicants(session: Session, property_id: Optional[int] = None
 
 
 def create_inspection(session: Session, inspection_in: models.Inspection) -> models.Inspection:
-    session.add(inspection_in)
-    session.commit()
-    session.refresh(inspection_in)
-    return inspection_in
+    return _save(session, inspection_in)
 
 
 def list_inspections(session: Session, property_id: Optional[int] = None) -> List[models.Inspection]:
@@ -153,9 +195,41 @@ def create_transaction(
     transaction_in: models.FinancialTransaction,
 ) -> models.FinancialTransaction:
     session.add(transaction_in)
+    ledger.post_transactions(session, [transaction_in])
+    return _save(session, transaction_in)
+
+
+def transactions_query(
+    property_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    *,
+    model=models.FinancialTransaction,
+) -> SelectOfScalar[models.FinancialTransaction]:
+    statement = select(model)
+    if property_id is not None:
+        statement = statement.where(model.property_id == property_id)
+    if start_date is not None:
+        statement = statement.where(model.transaction_date >= start_date)
+    if end_date is not None:
+        statement = statement.where(model.transaction_date <= end_date)
+    return statement
+
+
+def create_transactions(
+    session: Session,
+    transactions_in: Iterable[models.FinancialTransaction],
+) -> List[models.FinancialTransaction]:
+    """Insert many transactions and their ledger postings in one commit."""
+
+    transactions = list(transactions_in)
+    session.add_all(transactions)
+    ledger.post_transactions(session, transactions)
+    session.flush()
+    outbox.record_changes(session, transactions)
     session.commit()
-    session.refresh(transaction_in)
-    return transaction_in
+    _notify(session, transactions)
+    return transactions
 
 
 def list_transactions(
@@ -164,17 +238,117 @@ def list_transactions(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
 ) -> List[models.FinancialTransaction]:
-    statement = select(models.FinancialTransaction)
-    if property_id is not None:
-        statement = statement.where(models.FinancialTransaction.property_id == property_id)
-    if start_date is not None:
-        statement = statement.where(models.FinancialTransaction.transaction_date >= start_date)
-    if end_date is not None:
-        statement = statement.where(models.FinancialTransaction.transaction_date <= end_date)
-    return session.exec(statement).all()
+    return session.exec(transactions_query(property_id, start_date, end_date)).all()
 
 
 def bulk_create(session: Session, items: Iterable[SQLModel]) -> None:
+    items = list(items)
     for item in items:
         session.add(item)
+    ledger.post_transactions(
+        session, [item for item in items if isinstance(item, models.FinancialTransaction)]
+    )
+    session.flush()
+    outbox.record_changes(session, items)
+    search.index_rows(session, items)
+    session.commit()
+    _notify(session, items)
+
+
+def bulk_update(
+    session: Session,
+    model: Type[ModelT],
+    rows: Sequence[Dict[str, Any]],
+    *,
+    batch_size: int = 1000,
+) -> int:
+    """Apply ``{"id": ..., column: value}`` updates in batched executemany statements.
+
+    Each row gets an ``update`` outbox entry in the same commit, and write
+    hooks see the updated instances afterwards.
+    """
+
+    if not rows:
+        return 0
+    for start in range(0, len(rows), batch_size):
+        session.execute(update(model), list(rows[start : start + batch_size]))
+    outbox.record_updates(session, model.__tablename__, rows)
+    session.commit()
+    if _write_hooks:
+        ids = [row["id"] for row in rows]
+        for start in range(0, len(ids), batch_size):
+            batch = session.exec(select(model).where(model.id.in_(ids[start : start + batch_size]))).all()
+            _notify(session, batch)
+    return len(rows)
+
+
+def missing_ids(session: Session, model: Type[SQLModel], ids: Iterable[int]) -> List[int]:
+    """Ids from ``ids`` with no ``model`` row, in ascending order."""
+
+    wanted = set(ids)
+    found = set(session.exec(select(model.id).where(model.id.in_(wanted))).all()) if wanted else set()
+    return sorted(wanted - found)
+
+
+def upsert(
+    session: Session,
+    model: Type[ModelT],
+    rows: Sequence[Dict[str, Any]],
+    keys: Sequence[str],
+    *,
+    update_existing: bool = True,
+    batch_size: int = 500,
+) -> List[int]:
+    """Insert ``rows``, or update the row with the same natural ``keys``, in one statement per batch.
+
+    The conflict update only fires when some column differs, so re-sending
+    unchanged rows writes nothing. Returns the ids of rows inserted or
+    changed; only those get outbox entries, search entries and write hooks.
+    Transactions are never updated in place: known keys are skipped and new
+    ones are posted to the ledger.
+    """
+
+    is_transaction = issubclass(model, models.FinancialTransaction)
+    if is_transaction and update_existing:
+        raise ValueError("Posted transactions cannot be updated; use update_existing=False")
+    # The last row wins when a payload repeats a key.
+    unique = list({tuple(row[key] for key in keys): row for row in rows}.values())
+    if is_transaction:
+        known = archive.archived_refs(session, (row["external_ref"] for row in unique))
+        unique = [row for row in unique if row["external_ref"] not in known]
+    if not unique:
+        return []
+
+    insert = UPSERT_INSERTS[session.get_bind().dialect.name]
+    table = model.__table__
+    changing = [column for column in unique[0] if column not in keys and column != "id"]
+    written: List[int] = []
+    for start in range(0, len(unique), batch_size):
+        statement = insert(table).values(unique[start : start + batch_size])
+        if update_existing and changing:
+            excluded = statement.excluded
+            statement = statement.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={column: excluded[column] for column in changing},
+                where=or_(*(table.c[column].is_distinct_from(excluded[column]) for column in changing)),
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=list(keys))
+        written.extend(session.execute(statement.returning(table.c.id)).scalars())
+
+    instances: List[SQLModel] = []
+    for start in range(0, len(written), batch_size):
+        instances.extend(
+            session.exec(
+                select(model)
+                .where(model.id.in_(written[start : start + batch_size]))
+                .execution_options(populate_existing=True)
+            ).all()
+        )
+    if is_transaction:
+        ledger.post_transactions(session, instances)
+    outbox.record_changes(session, instances, operation="upsert")
+    search.index_rows(session, instances)
     session.commit()
+    _notify(session, instances)
+    return written
@@ -1,19 +1,171 @@
 """Database configuration for the RentManager tool."""
 
+import hashlib
+import os
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Iterator, Optional
 
+from sqlalchemy import and_, event, func, inspect, select, text, true
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
 from sqlmodel import Session, SQLModel, create_engine
 
-DATABASE_URL = "sqlite:///./rentmanager.db"
+DATABASE_URL = os.environ.get("RENTMANAGER_DATABASE_URL", "sqlite:///./rentmanager.db")
+REPLICA_URL = os.environ.get("RENTMANAGER_REPLICA_URL")
 
 engine_kwargs = {"echo": False, "connect_args": {"check_same_thread": False}}
-engine = create_engine(DATABASE_URL, **engine_kwargs)
 
 
-def init_db() -> None:
-    """Create database tables."""
-    SQLModel.metadata.create_all(engine)
+def is_in_memory(url: URL) -> bool:
+    """Whether the URL points at a SQLite database private to one process."""
+
+    database = url.database or ""
+    return url.get_backend_name() == "sqlite" and (
+        database in ("", ":memory:") or "mode=memory" in database
+    )
+
+
+def create_db_engine(url: str = DATABASE_URL) -> Engine:
+    """Build an engine with the project's default options.
+
+    File-backed SQLite databases run in WAL mode so readers do not block the
+    writer and commits need fewer fsyncs.
+    """
+
+    engine = create_engine(url, **engine_kwargs)
+    if engine.url.get_backend_name() == "sqlite" and not is_in_memory(engine.url):
+        event.listen(engine, "connect", _sqlite_wal_pragmas)
+    return engine
+
+
+def _sqlite_wal_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+engine = create_db_engine()
+
+
+def schema_version(bind: Optional[Engine] = None) -> str:
+    """Fingerprint of the DDL the current models compile to."""
+
+    from . import models
+
+    dialect = (bind if bind is not None else engine).dialect
+    digest = hashlib.sha256()
+    for table in SQLModel.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    for ddl in models.EXTRA_DDL:
+        digest.update(ddl.statement.encode())
+    return digest.hexdigest()
+
+
+def init_db(bind: Optional[Engine] = None) -> bool:
+    """Create database tables unless the stored schema version is current.
+
+    Returns whether DDL ran. A matching version costs one primary-key read
+    instead of reflecting every table; a mismatch runs ``create_all`` and
+    adds missing nullable columns and indexes, but does not alter existing
+    columns. A new unique index over rows that repeat its key raises
+    ``RuntimeError`` naming them. It also fills an empty ledger from
+    existing transactions.
+    """
+
+    from . import models
+
+    bind = bind if bind is not None else engine
+    version = schema_version(bind)
+    try:
+        with Session(bind) as session:
+            stored = session.get(models.SchemaVersion, 1)
+    except (OperationalError, ProgrammingError):
+        stored = None
+    if stored is not None and stored.version == version:
+        return False
+
+    SQLModel.metadata.create_all(bind)
+    # create_all skips existing tables, including columns and indexes added
+    # to them since.
+    inspector = inspect(bind)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        with bind.begin() as connection:
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            if index.unique:
+                _check_unique(bind, index)
+            index.create(bind)
+    from .services.ledger import backfill_ledger
+
+    with Session(bind) as session:
+        backfill_ledger(session)
+        record = session.get(models.SchemaVersion, 1) or models.SchemaVersion(version=version)
+        record.version = version
+        session.add(record)
+        session.commit()
+    return True
+
+
+def _check_unique(bind: Engine, index, sample: int = 10) -> None:
+    """Refuse to add a unique index over rows that already repeat its key.
+
+    Rows with a NULL in the key never conflict, as in the index itself, and
+    a partial index only counts the rows its ``WHERE`` covers.
+    """
+
+    columns = list(index.columns)
+    partial = index.dialect_kwargs.get(f"{bind.dialect.name}_where")
+    statement = (
+        select(*columns, func.count())
+        .where(and_(*(column.is_not(None) for column in columns)))
+        .where(partial if partial is not None else true())
+        .group_by(*columns)
+        .having(func.count() > 1)
+        .limit(sample)
+    )
+    with bind.connect() as connection:
+        duplicates = connection.execute(statement).all()
+    if not duplicates:
+        return
+    names = ", ".join(column.name for column in columns)
+    rows = "; ".join(
+        f"({', '.join(repr(value) for value in row[:-1])}) x{row[-1]}" for row in duplicates
+    )
+    raise RuntimeError(
+        f"Cannot create unique index {index.name} on {index.table.name} ({names}): "
+        f"these keys repeat: {rows}. Merge or delete the duplicate rows and restart."
+    )
+
+
+def is_unique_violation(exc: IntegrityError) -> bool:
+    """Whether ``exc`` is a repeated unique key rather than, say, a NOT NULL failure."""
+
+    # PostgreSQL drivers report SQLSTATE 23505; SQLite only has the message.
+    code = getattr(exc.orig, "sqlstate", None) or getattr(exc.orig, "pgcode", None)
+    if code is not None:
+        return code == "23505"
+    return "UNIQUE constraint failed" in str(exc.orig)
+
+
+def primary_bind(session: Session) -> Engine:
+    """Engine that per-database caches for ``session`` are keyed by.
+
+    Replica sessions record their primary in ``session.info``, so they share
+    (and are invalidated with) the primary's cached reference data.
+    """
+
+    return session.info.get("primary_bind") or session.get_bind()
 
 
 def get_session() -> Iterator[Session]:
@@ -23,9 +175,9 @@ def get_session() -> Iterator[Session]:
 
 
 @contextmanager
-def session_scope() -> Iterator[Session]:
+def session_scope(bind: Optional[Engine] = None) -> Iterator[Session]:
     """Provide a transactional scope for scripts and services."""
-    session = Session(engine)
+    session = Session(bind if bind is not None else engine)
     try:
         yield session
         session.commit()
@@ -0,0 +1,195 @@
+"""Replay a recorded request trace against the API and report latency.
+
+Traces are JSON lines as written by ``app.middleware.TraceRecorder``.
+Each line has ``method``, ``path``, ``query`` and ``body``; other fields
+are ignored. Requests are sent from a thread pool, optionally paced to a
+fixed rate, to a running server or to an in-process ``TestClient``.
+
+Usage::
+
+    python -m app.loadtest trace.jsonl --base-url http://127.0.0.1:8000 \\
+        --concurrency 16 --rate 200
+    python -m app.loadtest trace.jsonl --in-process --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import httpx
+
+# Numeric ids and job uuids collapse into one route per endpoint.
+_ID_SEGMENT = re.compile(r"/(\d+|[0-9a-f]{32})(?=/|$)")
+
+
+class TraceEntry(NamedTuple):
+    method: str
+    path: str
+    query: List[List[str]]
+    body: Any
+
+
+class Sample(NamedTuple):
+    route: str
+    status: Optional[int]
+    elapsed_ms: float
+
+
+class RouteStats(NamedTuple):
+    route: str
+    requests: int
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    client_errors: int
+    errors: int
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+
+def load_trace(path: str) -> List[TraceEntry]:
+    with open(path, encoding="utf-8") as trace:
+        return [
+            TraceEntry(row["method"], row["path"], row.get("query") or [], row.get("body"))
+            for row in map(json.loads, filter(str.strip, trace))
+        ]
+
+
+def route_of(entry: TraceEntry) -> str:
+    return f"{entry.method} {_ID_SEGMENT.sub('/{id}', entry.path)}"
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(len(sorted_values) * fraction))
+    return sorted_values[rank - 1]
+
+
+def _send(client: httpx.Client, entry: TraceEntry) -> Sample:
+    started = time.perf_counter()
+    try:
+        response = client.request(
+            entry.method,
+            entry.path,
+            params=[tuple(pair) for pair in entry.query],
+            json=entry.body,
+        )
+        status: Optional[int] = response.status_code
+    except httpx.HTTPError:
+        status = None
+    return Sample(route_of(entry), status, (time.perf_counter() - started) * 1000)
+
+
+def replay(
+    client: httpx.Client,
+    entries: Iterable[TraceEntry],
+    *,
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+) -> List[RouteStats]:
+    """Send every entry and summarise the results per route.
+
+    ``rate`` caps the overall request rate in requests per second; without
+    it requests go out as fast as ``concurrency`` workers allow.
+    """
+
+    entries = list(entries)
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def run(index: int, entry: TraceEntry) -> None:
+        if rate:
+            delay = started + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sample = _send(client, entry)
+        with lock:
+            samples.append(sample)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="loadtest") as executor:
+        for future in [executor.submit(run, index, entry) for index, entry in enumerate(entries)]:
+            future.result()
+    return summarize(samples, time.perf_counter() - started)
+
+
+def summarize(samples: Iterable[Sample], wall_seconds: float) -> List[RouteStats]:
+    by_route: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_route[sample.route].append(sample)
+    stats: List[RouteStats] = []
+    for route in sorted(by_route):
+        route_samples = by_route[route]
+        latencies = sorted(sample.elapsed_ms for sample in route_samples)
+        stats.append(
+            RouteStats(
+                route=route,
+                requests=len(route_samples),
+                throughput=len(route_samples) / wall_seconds if wall_seconds else 0.0,
+                p50_ms=percentile(latencies, 0.50),
+                p95_ms=percentile(latencies, 0.95),
+                p99_ms=percentile(latencies, 0.99),
+                client_errors=sum(1 for s in route_samples if s.status is not None and 400 <= s.status < 500),
+                errors=sum(1 for s in route_samples if s.status is None or s.status >= 500),
+            )
+        )
+    return stats
+
+
+def format_report(stats: Sequence[RouteStats]) -> str:
+    lines = [
+        f"{'route':44} {'reqs':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'4xx':>5} {'err%':>6}"
+    ]
+    for row in stats:
+        lines.append(
+            f"{row.route[:44]:44} {row.requests:6} {row.throughput:8.1f} {row.p50_ms:8.2f} "
+            f"{row.p95_ms:8.2f} {row.p99_ms:8.2f} {row.client_errors:5} {row.error_rate * 100:6.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", help="JSONL trace recorded by TraceRecorder")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="running server, e.g. http://127.0.0.1:8000")
+    target.add_argument("--in-process", action="store_true", help="replay through TestClient")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=None, help="requests per second")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the trace this many times")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    entries = load_trace(args.trace) * args.repeat
+    if args.in_process:
+        from fastapi.testclient import TestClient
+
+        from .main import create_app
+
+        with TestClient(create_app()) as client:
+            stats = replay(client, entries, concurrency=args.concurrency, rate=args.rate)
+    else:
+        with httpx.Client(base_url=args.base_url, timeout=30.0) as client:
+            stats = replay(client, entries, concurrency=args.concurrency, rate=args.rate)
+    if args.json:
+        print(json.dumps([dict(row._asdict(), error_rate=row.error_rate) for row in stats], indent=2))
+    else:
+        print(format_report(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,60 @@
 
 from __future__ import annotations
 
-from fastapi import FastAPI
-
-from .db import init_db
-from .routers import (
-    compliance,
-    households,
-    programs,
-    properties,
-    reports,
-    transactions,
-    units,
+from importlib import import_module
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from . import models  # noqa: F401  (registers every table on SQLModel.metadata)
+from .db import REPLICA_URL, engine, init_db, is_unique_violation
+from .middleware import TRACE_PATH, TraceRecorder, TraceWriter
+
+# (module under app.routers, prefix, tags); imported when an app is built.
+ROUTERS = (
+    ("properties", "/properties", ["properties"]),
+    ("units", "/units", ["units"]),
+    ("programs", "/programs", ["programs"]),
+    ("households", "/households", ["households"]),
+    ("compliance", "/compliance", ["compliance"]),
+    ("reports", "/reports", ["reports"]),
+    ("transactions", "/transactions", ["transactions"]),
+    ("jobs", "/jobs", ["jobs"]),
+    ("changes", "/changes", ["changes"]),
+    ("search", "/search", ["search"]),
+    ("exports", "/exports", ["exports"]),
 )
 
 
-def create_app() -> FastAPI:
+def create_app(
+    *,
+    portfolio_snapshot: bool = False,
+    group_commit: bool = False,
+    replica_url: Optional[str] = REPLICA_URL,
+    trace_path: Optional[str] = TRACE_PATH,
+) -> FastAPI:
+    """Build the API.
+
+    ``portfolio_snapshot`` serves reports from memory, ``group_commit``
+    batches ``POST /transactions`` inserts through a single writer and
+    ``replica_url`` sends report and list reads to a read-only replica.
+    ``trace_path`` appends an anonymized trace of every request for
+    ``app.loadtest`` to replay.
+    """
+
+    # Services and routers load here, not at module import, so importing
+    # app.main (or app.create_app) costs only FastAPI and the database layer.
+    from .replica import ReadReplica
+    from .services.group_commit import GroupCommit
+    from .services.jobs import JobQueue
+    from .services.reference import get_reference_cache
+    from .services.report_packs import ReportPackRunner
+    from .services.single_flight import SingleFlight
+    from .services.snapshot import enable_snapshot
+
     app = FastAPI(
         title="RentManager Internal Tool",
         description=(
@@ -26,23 +65,62 @@ def create_app() -> FastAPI:
         version="0.1.0",
     )
 
+    app.state.report_packs = ReportPackRunner()
+    app.state.jobs = JobQueue()
+    app.state.group_commit = GroupCommit() if group_commit else None
+    app.state.replica = ReadReplica.from_url(replica_url) if replica_url else None
+    app.state.single_flight = SingleFlight()
+    app.state.trace_writer = TraceWriter(trace_path) if trace_path else None
+    if app.state.trace_writer is not None:
+        app.add_middleware(TraceRecorder, writer=app.state.trace_writer)
+
     @app.on_event("startup")
     def _startup() -> None:
         init_db()
+        with Session(engine) as session:
+            get_reference_cache(session)
+            app.state.jobs.recover(session)
+        if portfolio_snapshot:
+            enable_snapshot(engine)
+
+    @app.on_event("shutdown")
+    def _shutdown() -> None:
+        app.state.report_packs.shutdown()
+        app.state.jobs.shutdown()
+        if app.state.group_commit is not None:
+            app.state.group_commit.close()
+        if app.state.replica is not None:
+            app.state.replica.close()
+        if app.state.trace_writer is not None:
+            app.state.trace_writer.close()
 
-    app.include_router(properties.router, prefix="/properties", tags=["properties"])
-    app.include_router(units.router, prefix="/units", tags=["units"])
-    app.include_router(programs.router, prefix="/programs", tags=["programs"])
-    app.include_router(households.router, prefix="/households", tags=["households"])
-    app.include_router(compliance.router, prefix="/compliance", tags=["compliance"])
-    app.include_router(reports.router, prefix="/reports", tags=["reports"])
-    app.include_router(transactions.router, prefix="/transactions", tags=["transactions"])
+    @app.exception_handler(IntegrityError)
+    def _conflict(request: Request, exc: IntegrityError) -> JSONResponse:
+        # A create that repeats a natural key (property code, unit number, ...).
+        # Other integrity failures are bugs and surface as server errors.
+        if not is_unique_violation(exc):
+            raise exc
+        return JSONResponse(status_code=409, content={"detail": "Row already exists"})
+
+    for module_name, prefix, tags in ROUTERS:
+        module = import_module(f".routers.{module_name}", __package__)
+        app.include_router(module.router, prefix=prefix, tags=tags)
 
     @app.get("/health", tags=["monitoring"])
     def healthcheck() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/metrics", tags=["monitoring"])
+    def metrics() -> dict[str, dict]:
+        return {"single_flight": app.state.single_flight.stats()}
+
     return app
 
 
-app = create_app()
+def __getattr__(name: str):
+    # ``uvicorn app.main:app`` looks the attribute up, which builds the app
+    # on first access and keeps it for later lookups.
+    if name == "app":
+        application = globals()["app"] = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
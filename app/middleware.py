@@ -0,0 +1,258 @@
+"""Record anonymized request traces for ``app.loadtest`` to replay.
+
+``TraceRecorder`` is plain ASGI middleware. For every HTTP request it
+queues one JSON line for the trace file, holding:
+
+- the offset from the recorder's start
+- method, path, query and JSON body
+- response status and elapsed time
+
+A ``TraceWriter`` thread appends the lines, so requests never wait on
+file I/O.
+
+Only fields on an allowlist of ids, dates, codes and other non-personal
+values are kept as sent. Any other string becomes a salted token, and any
+other number becomes zero. The same string maps to the same token within
+one trace, so replayed searches and lookups keep their shape. Dates of
+birth become a fixed date. Fields added to the API later are scrubbed
+until someone adds them to the allowlist.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+TRACE_PATH = os.environ.get("RENTMANAGER_TRACE_PATH")
+
+# Request body and query fields that cannot identify a resident, applicant
+# or staff member, or reveal their income, health or notes about them.
+ALLOWED_FIELDS = frozenset(
+    {
+        # ids and references
+        "id",
+        "property_id",
+        "unit_id",
+        "household_id",
+        "program_id",
+        "external_ref",
+        # property, unit and program attributes
+        "code",
+        "type",
+        "city",
+        "state",
+        "postal_code",
+        "total_units",
+        "ami_area",
+        "area_code",
+        "number",
+        "bedrooms",
+        "bathrooms",
+        "square_feet",
+        "ami_percent",
+        "category",
+        "funding_source",
+        "income_limit_percent",
+        "rent_limit_percent",
+        # workflow state and dates
+        "status",
+        "relationship",
+        "voucher_type",
+        "household_size",
+        "move_in_date",
+        "effective_date",
+        "next_due_date",
+        "event_type",
+        "severity",
+        "occurred_on",
+        "resolved_on",
+        "inspection_type",
+        "scheduled_for",
+        "completed_on",
+        "passed",
+        "transaction_date",
+        "amount",
+        "source",
+        "period",
+        # query parameters
+        "start",
+        "end",
+        "start_date",
+        "end_date",
+        "as_of",
+        "sort",
+        "limit",
+        "offset",
+        "since",
+        "wait",
+        "entity",
+        "rule",
+        "format",
+        "gzip",
+        "include_events",
+        "tolerance",
+        "through_year",
+        "resolved_months",
+    }
+)
+FIXED_VALUES = {"date_of_birth": "1980-01-01"}
+
+
+class Anonymizer:
+    """Keeps allowlisted fields and replaces every other value."""
+
+    def __init__(self, salt: Optional[bytes] = None) -> None:
+        self.salt = salt or secrets.token_bytes(16)
+
+    def token(self, value: Any) -> str:
+        digest = hashlib.sha256(self.salt + str(value).encode()).hexdigest()
+        return f"anon-{digest[:12]}"
+
+    def field(self, key: str, value: Any) -> Any:
+        # List filters arrive as ``<field>__<op>``.
+        name = key.partition("__")[0]
+        if value is None:
+            return None
+        if name in FIXED_VALUES:
+            return FIXED_VALUES[name]
+        if isinstance(value, (dict, list)):
+            return self.scrub(value, allowed=name in ALLOWED_FIELDS)
+        if name in ALLOWED_FIELDS:
+            return value
+        return self.replace(value)
+
+    def replace(self, value: Any) -> Any:
+        if isinstance(value, bool):
+            return False
+        if isinstance(value, (int, float)):
+            return type(value)(0)
+        return self.token(value)
+
+    def scrub(self, value: Any, *, allowed: bool = False) -> Any:
+        if isinstance(value, dict):
+            return {key: self.field(key, item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.scrub(item, allowed=allowed) for item in value]
+        if value is None or allowed:
+            return value
+        return self.replace(value)
+
+    def query(self, query_string: str) -> List[List[str]]:
+        return [
+            [key, self.field(key, value)]
+            for key, value in parse_qsl(query_string, keep_blank_values=True)
+        ]
+
+
+_STOP = object()
+
+
+class TraceWriter:
+    """Appends queued trace entries to ``path`` from a background thread.
+
+    The thread starts with the first entry; ``close`` drains the queue and
+    stops it, and a later entry starts a new one.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                self._thread.start()
+            self._queue.put(entry)
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join()
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as trace:
+            while True:
+                entry = self._queue.get()
+                if entry is _STOP:
+                    return
+                trace.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                if self._queue.empty():
+                    trace.flush()
+
+
+class TraceRecorder:
+    """ASGI middleware appending one anonymized JSON line per HTTP request."""
+
+    def __init__(
+        self,
+        app,
+        path: Optional[str] = None,
+        *,
+        writer: Optional[TraceWriter] = None,
+        anonymizer: Optional[Anonymizer] = None,
+    ) -> None:
+        if writer is None and path is None:
+            raise ValueError("TraceRecorder needs a path or a writer")
+        self.app = app
+        self.writer = writer or TraceWriter(path)
+        self.anonymizer = anonymizer or Anonymizer()
+        self.started = time.monotonic()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        chunks: List[bytes] = []
+        status: Dict[str, int] = {}
+
+        async def recording_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            self.writer.write(
+                {
+                    "offset": round(started - self.started, 4),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": self.anonymizer.query(scope["query_string"].decode("latin-1")),
+                    "body": self._body(scope, b"".join(chunks)),
+                    "status": status.get("code", 500),
+                    "elapsed_ms": round((time.monotonic() - started) * 1000, 3),
+                }
+            )
+
+    def _body(self, scope, raw: bytes) -> Any:
+        if not raw:
+            return None
+        content_type = dict(scope["headers"]).get(b"content-type", b"")
+        if not content_type.startswith(b"application/json"):
+            # Uploads such as income-limit CSVs are not replayed.
+            return None
+        try:
+            return self.anonymizer.scrub(json.loads(raw))
+        except ValueError:
+            return None
@@ -2,15 +2,26 @@
 
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, datetime
 from typing import Optional
 
+from sqlalchemy import DDL, Index, UniqueConstraint, event, text
 from sqlmodel import Field, SQLModel
 
 
+class SchemaVersion(SQLModel, table=True):
+    """Fingerprint of the metadata last applied by ``init_db``."""
+
+    id: int = Field(default=1, primary_key=True)
+    version: str
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class Property(SQLModel, table=True):
     """Affordable housing property."""
 
+    __table_args__ = (Index("ux_property_code", "code", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     code: str
@@ -21,11 +32,36 @@ class Property(SQLModel, table=True):
     postal_code: str
     total_units: Optional[int] = None
     property_manager: Optional[str] = None
+    ami_area: Optional[str] = Field(
+        default=None,
+        description="HUD income-limit area (county or metro code) used for AMI lookups.",
+    )
+
+
+class AreaMedianIncome(SQLModel, table=True):
+    """Published area median income for a HUD income-limit area."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    area_code: str = Field(index=True, sa_column_kwargs={"unique": True})
+    area_name: Optional[str] = None
+    median_income: float
+
+
+class IncomeLimit(SQLModel, table=True):
+    """Published income limit by area, AMI percentage, and household size."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    area_code: str = Field(index=True)
+    ami_percent: int
+    household_size: int
+    amount: float
 
 
 class Unit(SQLModel, table=True):
     """A physical unit associated with a property."""
 
+    __table_args__ = (Index("ux_unit_property_number", "property_id", "number", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     property_id: int = Field(foreign_key="property.id")
     number: str
@@ -65,13 +101,17 @@ class SubsidyContract(SQLModel, table=True):
 class Household(SQLModel, table=True):
     """A family or group leasing a unit."""
 
+    __table_args__ = (
+        Index("ux_household_unit_name_move_in", "unit_id", "name", "move_in_date", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    unit_id: int = Field(foreign_key="unit.id")
+    unit_id: int = Field(foreign_key="unit.id", index=True)
     name: str
-    move_in_date: date
-    annual_income: float
+    move_in_date: date = Field(index=True)
+    annual_income: float = Field(index=True)
     household_size: int
-    voucher_type: Optional[str] = None
+    voucher_type: Optional[str] = Field(default=None, index=True)
 
 
 class Resident(SQLModel, table=True):
@@ -90,9 +130,20 @@ class Resident(SQLModel, table=True):
 class Certification(SQLModel, table=True):
     """Compliance certification record for a household."""
 
+    __table_args__ = (
+        Index("ix_certification_status_due", "status", "next_due_date"),
+        Index(
+            "ux_certification_household_program_effective",
+            "household_id",
+            "program_id",
+            "effective_date",
+            unique=True,
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    household_id: int = Field(foreign_key="household.id")
-    program_id: int = Field(foreign_key="program.id")
+    household_id: int = Field(foreign_key="household.id", index=True)
+    program_id: int = Field(foreign_key="program.id", index=True)
     effective_date: date
     next_due_date: date
     household_income: float
@@ -106,12 +157,12 @@ class ComplianceEvent(SQLModel, table=True):
     """Stores compliance findings for audit tracking."""
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    household_id: int = Field(foreign_key="household.id")
+    household_id: int = Field(foreign_key="household.id", index=True)
     program_id: int = Field(foreign_key="program.id")
     event_type: str
     finding: str
-    severity: str
-    occurred_on: date
+    severity: str = Field(index=True)
+    occurred_on: date = Field(index=True)
     resolved_on: Optional[date] = None
     notes: Optional[str] = None
 
@@ -143,6 +194,101 @@ class Inspection(SQLModel, table=True):
 class FinancialTransaction(SQLModel, table=True):
     """Simple accounting entry for tracking revenue and expense."""
 
+    __table_args__ = (Index("ix_transaction_property_date", "property_id", "transaction_date"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    property_id: int = Field(foreign_key="property.id")
+    transaction_date: date = Field(index=True)
+    category: str = Field(index=True)
+    amount: float
+    description: Optional[str] = None
+    source: str = Field(default="tenant")
+    external_ref: Optional[str] = Field(default=None, index=True, unique=True)
+
+
+class LedgerBalance(SQLModel, table=True):
+    """Per-day posting total and running balance for a property and category.
+
+    Maintained alongside ``FinancialTransaction`` so any date window total is
+    the difference of two running balances.
+    """
+
+    __table_args__ = (UniqueConstraint("property_id", "category", "balance_date"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    property_id: int = Field(foreign_key="property.id")
+    category: str
+    balance_date: date
+    amount: float = 0.0
+    cumulative_amount: float = 0.0
+
+
+class Budget(SQLModel, table=True):
+    """Budgeted amount for a property and category in one calendar month."""
+
+    __table_args__ = (UniqueConstraint("property_id", "period", "category"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    property_id: int = Field(foreign_key="property.id")
+    period: date = Field(description="First day of the budgeted month.")
+    category: str
+    amount: float
+
+
+class ChangeEvent(SQLModel, table=True):
+    """Outbox entry written in the same transaction as the change it records."""
+
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    entity: str = Field(index=True)
+    entity_id: int
+    operation: str = "insert"
+    payload: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+ACTIVE_JOB = text("status IN ('pending', 'running')")
+
+
+class ReportJob(SQLModel, table=True):
+    """Background report computation and its persisted result.
+
+    ``owner`` is the ``JobQueue`` that runs the job, which refreshes
+    ``heartbeat_at`` while it is active. At most one active job exists per
+    ``params_key``.
+    """
+
+    __table_args__ = (
+        Index(
+            "ux_reportjob_active_params",
+            "params_key",
+            unique=True,
+            sqlite_where=ACTIVE_JOB,
+            postgresql_where=ACTIVE_JOB,
+        ),
+    )
+
+    id: str = Field(primary_key=True)
+    kind: str
+    params_key: str
+    parameters: str
+    status: str = Field(default="pending", index=True)
+    result: Optional[str] = None
+    error: Optional[str] = None
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = Field(default=None, index=True)
+    owner: Optional[str] = None
+    heartbeat_at: Optional[datetime] = None
+
+
+class ArchivedTransaction(SQLModel, table=True):
+    """``FinancialTransaction`` row moved out of the hot table once its year closed."""
+
+    __table_args__ = (
+        Index("ix_archivedtransaction_property_date", "property_id", "transaction_date"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     property_id: int = Field(foreign_key="property.id")
     transaction_date: date
@@ -150,3 +296,57 @@ class FinancialTransaction(SQLModel, table=True):
     amount: float
     description: Optional[str] = None
     source: str = Field(default="tenant")
+    external_ref: Optional[str] = Field(default=None, index=True, unique=True)
+
+
+class ArchivedComplianceEvent(SQLModel, table=True):
+    """``ComplianceEvent`` moved out of the hot table after it was resolved."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    household_id: int = Field(foreign_key="household.id", index=True)
+    program_id: int = Field(foreign_key="program.id")
+    event_type: str
+    finding: str
+    severity: str
+    occurred_on: date = Field(index=True)
+    resolved_on: Optional[date] = None
+    notes: Optional[str] = None
+
+
+class ArchiveWatermark(SQLModel, table=True):
+    """Latest date column value held by an archive table.
+
+    Queries whose range starts after it never need to read the archive.
+    """
+
+    name: str = Field(primary_key=True)
+    archived_through: date
+
+
+class OccupancySnapshot(SQLModel, table=True):
+    """Occupancy of one property at the end of one day."""
+
+    __table_args__ = (
+        Index("ux_occupancysnapshot_property_date", "property_id", "snapshot_date", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    property_id: int = Field(foreign_key="property.id")
+    snapshot_date: date
+    total_units: int
+    occupied_units: int
+    vacant_by_bedroom: str = Field(description='JSON object of vacant units by bedroom count, e.g. {"1":2}.')
+    ami_average: Optional[float] = None
+
+
+# Schema objects SQLModel cannot declare. They run after ``create_all`` and
+# are part of the schema version ``init_db`` compares.
+EXTRA_DDL = (
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "entity UNINDEXED, entity_id UNINDEXED, label, keywords, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    ).execute_if(dialect="sqlite"),
+)
+for _ddl in EXTRA_DDL:
+    event.listen(SQLModel.metadata, "after_create", _ddl)
@@ -0,0 +1,134 @@
+"""Route read-only requests to an optional replica database.
+
+``get_read_session`` yields a session on ``app.state.replica`` when one is
+configured and fresh enough, and otherwise the primary session from
+``get_session``. Freshness is measured in outbox entries: the primary's
+highest ``ChangeEvent.seq`` minus the replica's. A replica that raises a
+database error is skipped for ``retry_after`` seconds. Clients that must
+read their own writes send ``X-Read-Consistency: primary``.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import Iterator
+
+from fastapi import Depends, Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from . import db
+from .services import outbox
+
+CONSISTENCY_HEADER = "X-Read-Consistency"
+
+
+class ReadReplica:
+    """A read-only engine plus the lag and health checks that gate it."""
+
+    def __init__(
+        self,
+        bind: Engine,
+        *,
+        max_lag: int = 100,
+        check_interval: float = 1.0,
+        retry_after: float = 30.0,
+    ) -> None:
+        self.bind = bind
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self.reads = 0
+        self.fallbacks = 0
+        self._fresh = False
+        self._checked_at = float("-inf")
+        self._down_until = float("-inf")
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **options) -> "ReadReplica":
+        bind = db.create_db_engine(url)
+        if bind.url.get_backend_name() == "sqlite":
+            event.listen(bind, "connect", _sqlite_query_only)
+        return cls(bind, **options)
+
+    def lag(self, primary: Engine) -> int:
+        """Outbox entries committed on ``primary`` but not yet on the replica."""
+
+        with Session(primary) as session:
+            head = outbox.latest_seq(session)
+        with Session(self.bind) as session:
+            return head - outbox.latest_seq(session)
+
+    def available(self, primary: Engine) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._down_until:
+                return False
+            if now - self._checked_at < self.check_interval:
+                return self._fresh
+        try:
+            fresh = self.lag(primary) <= self.max_lag
+        except OperationalError:
+            self.mark_failed()
+            return False
+        with self._lock:
+            self._fresh, self._checked_at = fresh, now
+        return fresh
+
+    def mark_failed(self) -> None:
+        with self._lock:
+            self._fresh = False
+            self._down_until = time.monotonic() + self.retry_after
+
+    def close(self) -> None:
+        self.bind.dispose()
+
+
+def _sqlite_query_only(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def refresh_sqlite_copy(primary: Engine, replica: Engine) -> None:
+    """Overwrite a file-backed SQLite replica with a consistent copy of the primary.
+
+    Stands in for real replication when running locally, e.g. from cron.
+    """
+
+    source = primary.raw_connection()
+    target = sqlite3.connect(replica.url.database)
+    try:
+        source.driver_connection.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def get_read_session(
+    request: Request, session: Session = Depends(db.get_session)
+) -> Iterator[Session]:
+    """FastAPI dependency for routes that only read."""
+
+    replica = getattr(request.app.state, "replica", None)
+    if replica is None:
+        yield session
+        return
+    if request.headers.get(CONSISTENCY_HEADER, "").lower() == "primary" or not replica.available(
+        session.get_bind()
+    ):
+        replica.fallbacks += 1
+        yield session
+        return
+    replica.reads += 1
+    with Session(replica.bind, info={"primary_bind": session.get_bind()}) as replica_session:
+        try:
+            yield replica_session
+        except OperationalError:
+            replica.mark_failed()
+            raise
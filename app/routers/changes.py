@@ -0,0 +1,72 @@
+"""Change-data-capture feed over the write outbox."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from .. import schemas
+from ..db import get_session
+from ..services import outbox
+
+router = APIRouter()
+
+POLL_INTERVAL = 0.25
+MAX_WAIT = 30.0
+
+
+def _read(bind: Engine, since: int, limit: int, entities: Optional[List[str]]):
+    with Session(bind) as session:
+        return outbox.read_changes(session, since, limit=limit, entities=entities)
+
+
+@router.get("/", response_model=schemas.ChangeFeed)
+async def list_changes(
+    since: int = 0,
+    limit: int = Query(default=500, ge=1, le=5000),
+    wait: float = Query(default=0.0, ge=0.0, le=MAX_WAIT),
+    entity: Optional[List[str]] = Query(default=None),
+    session: Session = Depends(get_session),
+) -> schemas.ChangeFeed:
+    """Changes after ``since``; with ``wait`` > 0, long-poll until one arrives."""
+
+    bind = session.get_bind()
+    deadline = time.monotonic() + wait
+    while True:
+        changes = await run_in_threadpool(_read, bind, since, limit, entity)
+        if changes or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(POLL_INTERVAL)
+    last_seq = changes[-1].seq if changes else since
+    return schemas.ChangeFeed(changes=changes, last_seq=last_seq)
+
+
+@router.get("/stream")
+async def stream_changes(
+    since: int = 0,
+    entity: Optional[List[str]] = Query(default=None),
+    session: Session = Depends(get_session),
+) -> StreamingResponse:
+    """Server-Sent Events stream of changes after ``since``."""
+
+    bind = session.get_bind()
+
+    async def events() -> AsyncIterator[str]:
+        cursor = since
+        while True:
+            changes = await run_in_threadpool(_read, bind, cursor, 500, entity)
+            for change in changes:
+                cursor = change.seq
+                yield f"id: {change.seq}\nevent: {change.entity}\ndata: {change.json()}\n\n"
+            if not changes:
+                yield ": keep-alive\n\n"
+                await asyncio.sleep(POLL_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
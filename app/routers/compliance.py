@@ -2,28 +2,83 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
+import csv
+import io
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from sqlmodel import Session, func, select
 
 from .. import crud, models, schemas
 from ..db import get_session
+from ..filters import FilterSpec, filter_params
+from ..replica import get_read_session
+from ..serialization import rows_response
 from ..services import compliance as compliance_service
+from ..services import archive, income_limits, rent_limits, rules
+from ..services.reference import get_reference_cache
+from ..services.snapshot import get_snapshot
 
 router = APIRouter()
 
 
 @router.get("/issues", response_model=list[schemas.ComplianceIssue])
 def compliance_issues(
+    request: Request,
     include_events: bool = True,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ) -> list[schemas.ComplianceIssue]:
-    service = compliance_service.ComplianceService(session)
-    issues = service.consolidate_issues()
-    if include_events:
-        issues = compliance_service.combine_issue_sources(
-            issues, compliance_service.open_findings(session)
+    return request.app.state.single_flight.call(
+        session,
+        compliance_service.portfolio_issues,
+        include_events=include_events,
+        snapshot=get_snapshot(session),
+    )
+
+
+@router.get("/rules", response_model=list[schemas.ComplianceRuleRead])
+def list_rules() -> list[schemas.ComplianceRuleRead]:
+    return [
+        schemas.ComplianceRuleRead(
+            name=rule.name,
+            columns=list(rule.columns),
+            description=rule.description,
+            default=rule.default,
         )
-    return issues
+        for rule in rules.RULES.values()
+    ]
+
+
+@router.get("/sweep", response_model=schemas.RuleSweep)
+def rule_sweep(
+    rule: Optional[List[str]] = Query(default=None),
+    session: Session = Depends(get_read_session),
+) -> schemas.RuleSweep:
+    """Run the selected rules (default: all) in one pass with per-rule timings."""
+
+    service = compliance_service.ComplianceService(
+        session,
+        income_limits=income_limits.get_income_limits(session),
+        snapshot=get_snapshot(session),
+    )
+    try:
+        return service.sweep(rule)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Unknown rule: {exc.args[0]}") from None
+
+
+@router.get("/rent-limits", response_model=list[schemas.ComplianceIssue])
+def rent_limit_violations(
+    property_id: int | None = None,
+    session: Session = Depends(get_read_session),
+) -> list[schemas.ComplianceIssue]:
+    """Active certifications whose gross rent exceeds the program's max rent for the unit size."""
+
+    return rent_limits.rent_limit_violations(
+        session,
+        income_limits.get_income_limits(session),
+        property_ids=[property_id] if property_id is not None else None,
+    )
 
 
 @router.post("/events", response_model=schemas.ComplianceEventRead, status_code=201)
@@ -34,8 +89,7 @@ def create_event(
     household = session.get(models.Household, payload.household_id)
     if household is None:
         raise HTTPException(status_code=404, detail="Household not found")
-    program = session.get(models.Program, payload.program_id)
-    if program is None:
+    if not get_reference_cache(session).program_exists(session, payload.program_id):
         raise HTTPException(status_code=404, detail="Program not found")
     event_in = models.ComplianceEvent(**payload.dict())
     return crud.create_compliance_event(session, event_in)
@@ -44,6 +98,53 @@ def create_event(
 @router.get("/events", response_model=list[schemas.ComplianceEventRead])
 def list_events(
     household_id: int | None = None,
+    spec: FilterSpec = Depends(filter_params(schemas.ComplianceEventRead)),
+    session: Session = Depends(get_read_session),
+) -> Response:
+    model = archive.source(session, "compliance-events", spec.lower_bound("occurred_on"))
+    return rows_response(
+        session,
+        spec.apply(crud.compliance_events_query(household_id, model=model), model),
+        model,
+        schemas.ComplianceEventRead,
+        with_total=True,
+    )
+
+
+@router.get("/certifications", response_model=list[schemas.CertificationRead])
+def list_certifications(
+    program_id: int | None = None,
+    spec: FilterSpec = Depends(filter_params(schemas.CertificationRead)),
+    session: Session = Depends(get_read_session),
+) -> Response:
+    """Certifications across the portfolio, e.g. ``status__in=Active&next_due_date__lte=...``."""
+
+    return rows_response(
+        session,
+        spec.apply(crud.certifications_query(program_id=program_id), models.Certification),
+        models.Certification,
+        schemas.CertificationRead,
+        with_total=True,
+    )
+
+
+@router.get("/income-limits", response_model=schemas.IncomeLimitTableRead)
+def get_income_limits(session: Session = Depends(get_read_session)) -> schemas.IncomeLimitTableRead:
+    table = income_limits.get_income_limits(session)
+    areas = session.exec(
+        select(models.AreaMedianIncome).order_by(models.AreaMedianIncome.area_code)
+    ).all()
+    limit_count = session.exec(select(func.count(models.IncomeLimit.id))).one()
+    return schemas.IncomeLimitTableRead(version=table.version, areas=areas, limit_count=limit_count)
+
+
+@router.put("/income-limits", response_model=schemas.IncomeLimitTableRead)
+def import_income_limits(
+    payload: str = Body(..., media_type="text/csv"),
     session: Session = Depends(get_session),
-) -> list[schemas.ComplianceEventRead]:
-    return crud.list_compliance_events(session, household_id)
+) -> schemas.IncomeLimitTableRead:
+    try:
+        income_limits.import_hud_csv(session, io.StringIO(payload))
+    except (ValueError, csv.Error) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return get_income_limits(session)
@@ -0,0 +1,53 @@
+"""Streaming CSV downloads for agency reporting."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from ..replica import get_read_session
+from ..services import exports
+
+router = APIRouter()
+
+
+def _download(name: str, chunks, compress: bool) -> StreamingResponse:
+    filename = f"{name}.csv.gz" if compress else f"{name}.csv"
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if compress else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/rent-roll.csv")
+def export_rent_roll(
+    property_id: int | None = None,
+    gzip: bool = False,
+    session: Session = Depends(get_read_session),
+) -> StreamingResponse:
+    chunks = exports.stream_export(
+        session.get_bind(),
+        exports.RENT_ROLL_HEADER,
+        lambda export_session: exports.rent_roll_rows(export_session, property_id),
+        compress=gzip,
+        info=session.info,
+    )
+    return _download("rent-roll", chunks, gzip)
+
+
+@router.get("/compliance-issues.csv")
+def export_compliance_issues(
+    include_events: bool = True,
+    gzip: bool = False,
+    session: Session = Depends(get_read_session),
+) -> StreamingResponse:
+    chunks = exports.stream_export(
+        session.get_bind(),
+        exports.COMPLIANCE_ISSUE_HEADER,
+        lambda export_session: exports.compliance_issue_rows(export_session, include_events),
+        compress=gzip,
+        info=session.info,
+    )
+    return _download("compliance-issues", chunks, gzip)
@@ -2,11 +2,18 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session
 
 from .. import crud, models, schemas
 from ..db import get_session
+from ..filters import FilterSpec, filter_params
+from ..replica import get_read_session
+from ..serialization import rows_response
+from ..services import household_income
+from ..services.reference import get_reference_cache
 
 router = APIRouter()
 
@@ -23,12 +30,85 @@ def create_household(
     return crud.create_household(session, household_in)
 
 
+@router.put("/", response_model=schemas.UpsertResult)
+def upsert_households(
+    payload: List[schemas.HouseholdCreate],
+    session: Session = Depends(get_session),
+) -> schemas.UpsertResult:
+    """Insert or update households by ``(unit_id, name, move_in_date)``."""
+
+    missing = crud.missing_ids(session, models.Unit, {row.unit_id for row in payload})
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Unit not found: {missing}")
+    ids = crud.upsert(
+        session,
+        models.Household,
+        [row.dict() for row in payload],
+        ("unit_id", "name", "move_in_date"),
+    )
+    return schemas.UpsertResult(
+        received=len(payload), written=len(ids), unchanged=len(payload) - len(ids), ids=ids
+    )
+
+
+@router.put("/certifications", response_model=schemas.UpsertResult)
+def upsert_certifications(
+    payload: List[schemas.CertificationCreate],
+    session: Session = Depends(get_session),
+) -> schemas.UpsertResult:
+    """Insert or update certifications by ``(household_id, program_id, effective_date)``."""
+
+    missing = crud.missing_ids(session, models.Household, {row.household_id for row in payload})
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Household not found: {missing}")
+    missing = get_reference_cache(session).missing(
+        session, models.Program, {row.program_id for row in payload}
+    )
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Program not found: {missing}")
+    ids = crud.upsert(
+        session,
+        models.Certification,
+        [row.dict() for row in payload],
+        ("household_id", "program_id", "effective_date"),
+    )
+    return schemas.UpsertResult(
+        received=len(payload), written=len(ids), unchanged=len(payload) - len(ids), ids=ids
+    )
+
+
 @router.get("/", response_model=list[schemas.HouseholdRead])
 def list_households(
     property_id: int | None = None,
+    spec: FilterSpec = Depends(filter_params(schemas.HouseholdRead)),
+    session: Session = Depends(get_read_session),
+) -> Response:
+    return rows_response(
+        session,
+        spec.apply(crud.households_query(property_id), models.Household),
+        models.Household,
+        schemas.HouseholdRead,
+        with_total=True,
+    )
+
+
+@router.post("/income/recompute", response_model=schemas.IncomeRecomputation)
+def recompute_income(
+    property_id: int | None = None,
+    household_id: Optional[List[int]] = Query(default=None),
+    tolerance: float = Query(default=1.0, ge=0),
+    apply: bool = False,
     session: Session = Depends(get_session),
-) -> list[schemas.HouseholdRead]:
-    return crud.list_households(session, property_id)
+) -> schemas.IncomeRecomputation:
+    """Compare stored incomes with 12x the residents' monthly income; ``apply`` writes the fix."""
+
+    return household_income.recompute_incomes(
+        session,
+        property_id=property_id,
+        household_ids=household_id,
+        tolerance=tolerance,
+        apply=apply,
+    )
 
 
 @router.get("/{household_id}", response_model=schemas.HouseholdRead)
@@ -60,12 +140,14 @@ def add_resident(
 @router.get("/{household_id}/residents", response_model=list[schemas.ResidentRead])
 def list_residents(
     household_id: int,
-    session: Session = Depends(get_session),
-) -> list[schemas.ResidentRead]:
+    session: Session = Depends(get_read_session),
+) -> Response:
     household = crud.get_household(session, household_id)
     if household is None:
         raise HTTPException(status_code=404, detail="Household not found")
-    return crud.list_residents(session, household_id)
+    return rows_response(
+        session, crud.residents_query(household_id), models.Resident, schemas.ResidentRead
+    )
 
 
 @router.post(
@@ -83,8 +165,7 @@ def create_certification(
         raise HTTPException(status_code=404, detail="Household not found")
     if payload.household_id != household_id:
         raise HTTPException(status_code=400, detail="Household mismatch in payload")
-    program = session.get(models.Program, payload.program_id)
-    if program is None:
+    if not get_reference_cache(session).program_exists(session, payload.program_id):
         raise HTTPException(status_code=404, detail="Program not found")
     certification_in = models.Certification(**payload.dict())
     return crud.create_certification(session, certification_in)
@@ -93,9 +174,16 @@ def create_certification(
 @router.get("/{household_id}/certifications", response_model=list[schemas.CertificationRead])
 def list_certifications(
     household_id: int,
-    session: Session = Depends(get_session),
-) -> list[schemas.CertificationRead]:
+    spec: FilterSpec = Depends(filter_params(schemas.CertificationRead)),
+    session: Session = Depends(get_read_session),
+) -> Response:
     household = crud.get_household(session, household_id)
     if household is None:
         raise HTTPException(status_code=404, detail="Household not found")
-    return crud.list_certifications(session, household_id=household_id)
+    return rows_response(
+        session,
+        spec.apply(crud.certifications_query(household_id=household_id), models.Certification),
+        models.Certification,
+        schemas.CertificationRead,
+        with_total=True,
+    )
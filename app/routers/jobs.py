@@ -0,0 +1,57 @@
+"""Background report job endpoints."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
+from pydantic import ValidationError
+from sqlmodel import Session
+
+from .. import models, schemas
+from ..db import get_session
+from ..services import jobs
+
+router = APIRouter()
+
+
+@router.post("/{kind}", response_model=schemas.ReportJobRead, status_code=202)
+def submit_job(
+    kind: str,
+    request: Request,
+    params: Dict[str, Any] = Body(default={}),
+    session: Session = Depends(get_session),
+) -> schemas.ReportJobRead:
+    queue: jobs.JobQueue = request.app.state.jobs
+    try:
+        return queue.submit(session, kind, params)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind: {kind}") from exc
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors()) from exc
+
+
+@router.get("/{job_id}", response_model=schemas.ReportJobRead)
+def get_job(
+    job_id: str, request: Request, session: Session = Depends(get_session)
+) -> schemas.ReportJobRead:
+    return _get_job(request, session, job_id)
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str, request: Request, session: Session = Depends(get_session)) -> Any:
+    job = _get_job(request, session, job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return json.loads(job.result)
+
+
+def _get_job(request: Request, session: Session, job_id: str) -> models.ReportJob:
+    job = session.get(models.ReportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # A job whose worker has gone is reported as failed rather than running forever.
+    return request.app.state.jobs.refresh(session, job)
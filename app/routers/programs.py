@@ -7,6 +7,7 @@ from sqlmodel import Session
 
 from .. import crud, models, schemas
 from ..db import get_session
+from ..replica import get_read_session
 
 router = APIRouter()
 
@@ -21,5 +22,5 @@ def create_program(
 
 
 @router.get("/", response_model=list[schemas.ProgramRead])
-def list_programs(session: Session = Depends(get_session)) -> list[schemas.ProgramRead]:
+def list_programs(session: Session = Depends(get_read_session)) -> list[schemas.ProgramRead]:
     return crud.list_programs(session)
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+from typing import List
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from sqlmodel import Session
 
 from .. import crud, models, schemas
 from ..db import get_session
+from ..replica import get_read_session
+from ..services.reference import get_reference_cache
 
 router = APIRouter()
 
@@ -16,17 +20,27 @@ def create_property(
     payload: schemas.PropertyCreate,
     session: Session = Depends(get_session),
 ) -> schemas.PropertyRead:
-    existing = session.exec(
-        select(models.Property).where(models.Property.code == payload.code)
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Property code already exists")
+    if get_reference_cache(session).property_code_exists(payload.code):
+        raise HTTPException(status_code=409, detail="Property code already exists")
     property_in = models.Property(**payload.dict())
     return crud.create_property(session, property_in)
 
 
+@router.put("/", response_model=schemas.UpsertResult)
+def upsert_properties(
+    payload: List[schemas.PropertyCreate],
+    session: Session = Depends(get_session),
+) -> schemas.UpsertResult:
+    """Insert or update properties by ``code``."""
+
+    ids = crud.upsert(session, models.Property, [row.dict() for row in payload], ("code",))
+    return schemas.UpsertResult(
+        received=len(payload), written=len(ids), unchanged=len(payload) - len(ids), ids=ids
+    )
+
+
 @router.get("/", response_model=list[schemas.PropertyRead])
-def list_properties(session: Session = Depends(get_session)) -> list[schemas.PropertyRead]:
+def list_properties(session: Session = Depends(get_read_session)) -> list[schemas.PropertyRead]:
     return crud.list_properties(session)
 
 
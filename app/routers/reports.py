@@ -3,53 +3,158 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Dict
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session
 
 from .. import schemas
 from ..db import get_session
-from ..services import financials
+from ..replica import get_read_session
+from ..serialization import RowsResponse, dumps
+from ..services import budgets, dashboard, financials, ledger, occupancy_history, report_packs
+from ..services.snapshot import get_snapshot
 
 router = APIRouter()
 
 
 @router.get("/occupancy", response_model=list[schemas.OccupancyReport])
 def occupancy_report(
+    request: Request,
     property_id: int | None = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ) -> list[schemas.OccupancyReport]:
-    return financials.occupancy_reports(session, property_id)
+    return request.app.state.single_flight.call(
+        session, financials.occupancy_reports, property_id, snapshot=get_snapshot(session)
+    )
+
+
+@router.get("/occupancy/history", response_model=list[schemas.OccupancyHistoryPoint])
+def occupancy_history_report(
+    property_id: Optional[List[int]] = Query(default=None),
+    start: date | None = None,
+    end: date | None = None,
+    session: Session = Depends(get_read_session),
+) -> Response:
+    """Daily snapshots recorded by the ``occupancy-snapshot`` job."""
+
+    rows = occupancy_history.history(session, property_id, start, end)
+    return RowsResponse(content=dumps(rows))
 
 
 @router.get("/rent", response_model=list[schemas.RentProjection])
 def rent_report(
+    request: Request,
     property_id: int | None = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ) -> list[schemas.RentProjection]:
-    return financials.rent_projection(session, property_id)
+    return request.app.state.single_flight.call(
+        session, financials.rent_projection, property_id, snapshot=get_snapshot(session)
+    )
 
 
 @router.get("/operating-summary", response_model=Dict[str, float])
 def operating_report(
+    request: Request,
     property_id: int | None = None,
     start: date | None = None,
     end: date | None = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ) -> Dict[str, float]:
-    return financials.operating_summary(session, property_id=property_id, start=start, end=end)
+    return request.app.state.single_flight.call(
+        session, financials.operating_summary, property_id=property_id, start=start, end=end
+    )
 
 
 @router.get("/noi", response_model=schemas.NOIReport)
 def net_operating_income_report(
+    request: Request,
     property_id: int | None = None,
     start: date | None = None,
     end: date | None = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ) -> schemas.NOIReport:
-    summary = financials.operating_summary(
-        session, property_id=property_id, start=start, end=end
+    return request.app.state.single_flight.call(
+        session, financials.noi_report, property_id=property_id, start=start, end=end
+    )
+
+
+@router.get("/dashboard", response_model=schemas.Dashboard)
+def dashboard_report(
+    request: Request,
+    start: date | None = None,
+    end: date | None = None,
+    include_events: bool = True,
+    session: Session = Depends(get_read_session),
+) -> schemas.Dashboard:
+    return request.app.state.single_flight.call(
+        session, dashboard.build_dashboard, start=start, end=end, include_events=include_events
     )
-    noi = financials.net_operating_income(summary)
-    return schemas.NOIReport(net_operating_income=noi, summary=summary)
+
+
+@router.put("/budgets", response_model=schemas.BudgetImportResult)
+def import_budgets(
+    payload: List[schemas.BudgetCreate],
+    session: Session = Depends(get_session),
+) -> schemas.BudgetImportResult:
+    return schemas.BudgetImportResult(imported=budgets.import_budgets(session, payload))
+
+
+@router.get("/budget-variance", response_model=list[schemas.BudgetVarianceRow])
+def budget_variance_report(
+    property_id: int | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    session: Session = Depends(get_read_session),
+) -> list[schemas.BudgetVarianceRow]:
+    return budgets.budget_variance(session, property_id=property_id, start=start, end=end)
+
+
+@router.get("/ledger/verify", response_model=schemas.LedgerVerification)
+def verify_ledger(session: Session = Depends(get_session)) -> schemas.LedgerVerification:
+    return ledger.verify_ledger(session)
+
+
+@router.post("/ledger/rebuild", response_model=schemas.LedgerVerification)
+def rebuild_ledger(session: Session = Depends(get_session)) -> schemas.LedgerVerification:
+    ledger.rebuild_ledger(session)
+    return ledger.verify_ledger(session)
+
+
+@router.post("/packs", response_model=schemas.ReportPackJobRead, status_code=202)
+def submit_report_pack(
+    payload: schemas.ReportPackRequest,
+    request: Request,
+    session: Session = Depends(get_session),
+) -> schemas.ReportPackJobRead:
+    runner: report_packs.ReportPackRunner = request.app.state.report_packs
+    job = runner.submit(session.get_bind(), start=payload.start, end=payload.end)
+    return job.summary()
+
+
+@router.get("/packs/{job_id}", response_model=schemas.ReportPackJobRead)
+def report_pack_status(job_id: str, request: Request) -> schemas.ReportPackJobRead:
+    return _get_pack_job(request, job_id).summary()
+
+
+@router.get("/packs/{job_id}/download")
+def download_report_pack(job_id: str, request: Request, format: str = "json") -> Response:
+    job = _get_pack_job(request, job_id)
+    if job.pack is None:
+        raise HTTPException(status_code=409, detail=f"Report pack is {job.status}")
+    try:
+        content, media_type, filename = report_packs.render_pack(job.pack, format)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _get_pack_job(request: Request, job_id: str) -> report_packs.ReportPackJob:
+    job = request.app.state.report_packs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report pack not found")
+    return job
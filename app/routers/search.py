@@ -0,0 +1,32 @@
+"""Name search endpoints."""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import Session
+
+from .. import schemas
+from ..db import get_session
+from ..replica import get_read_session
+from ..services import search as search_service
+
+router = APIRouter()
+
+
+@router.get("/", response_model=list[schemas.SearchResult])
+def search(
+    q: str = Query(min_length=1),
+    entity: Optional[List[str]] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=200),
+    session: Session = Depends(get_read_session),
+) -> list[schemas.SearchResult]:
+    """Households, residents, applicants and properties matching every term as a prefix."""
+
+    return search_service.search(session, q, entities=entity, limit=limit)
+
+
+@router.post("/rebuild", response_model=Dict[str, int])
+def rebuild_search_index(session: Session = Depends(get_session)) -> Dict[str, int]:
+    return {"indexed": search_service.rebuild_index(session)}
@@ -2,27 +2,80 @@
 
 from __future__ import annotations
 
+import asyncio
 from datetime import date
+from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 
 from .. import crud, models, schemas
 from ..db import get_session
+from ..filters import FilterSpec, filter_params
+from ..replica import get_read_session
+from ..serialization import rows_response
+from ..services import archive
+from ..services.reference import get_reference_cache
 
 router = APIRouter()
 
 
 @router.post("/", response_model=schemas.FinancialTransactionRead, status_code=201)
-def create_transaction(
+async def create_transaction(
     payload: schemas.FinancialTransactionCreate,
+    request: Request,
     session: Session = Depends(get_session),
 ) -> schemas.FinancialTransactionRead:
-    property_ = session.get(models.Property, payload.property_id)
-    if property_ is None:
+    cache = get_reference_cache(session)
+    if not await run_in_threadpool(cache.property_exists, session, payload.property_id):
         raise HTTPException(status_code=404, detail="Property not found")
+    # The hot table's unique index no longer sees references moved to the
+    # archive, and re-posting one would count it in the ledger twice.
+    if payload.external_ref is not None and await run_in_threadpool(
+        archive.archived_refs, session, [payload.external_ref]
+    ):
+        raise HTTPException(status_code=409, detail="Transaction already posted")
+    group_commit = request.app.state.group_commit
     transaction_in = models.FinancialTransaction(**payload.dict())
-    return crud.create_transaction(session, transaction_in)
+    if group_commit is None:
+        return await run_in_threadpool(crud.create_transaction, session, transaction_in)
+    # The request waits on the event loop rather than holding a threadpool
+    # worker; shield keeps a timed-out request from cancelling the posting.
+    future = group_commit.submit(session.get_bind(), transaction_in)
+    try:
+        transaction_id = await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(future)), group_commit.timeout
+        )
+    except asyncio.TimeoutError as exc:
+        raise HTTPException(status_code=503, detail="Transaction posting is still queued") from exc
+    return schemas.FinancialTransactionRead(id=transaction_id, **payload.dict())
+
+
+@router.put("/", response_model=schemas.UpsertResult)
+def upsert_transactions(
+    payload: List[schemas.FinancialTransactionCreate],
+    session: Session = Depends(get_session),
+) -> schemas.UpsertResult:
+    """Post transactions whose ``external_ref`` is new; known references are skipped."""
+
+    if any(row.external_ref is None for row in payload):
+        raise HTTPException(status_code=400, detail="external_ref is required for upserts")
+    missing = get_reference_cache(session).missing(
+        session, models.Property, {row.property_id for row in payload}
+    )
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Property not found: {missing}")
+    ids = crud.upsert(
+        session,
+        models.FinancialTransaction,
+        [row.dict() for row in payload],
+        ("external_ref",),
+        update_existing=False,
+    )
+    return schemas.UpsertResult(
+        received=len(payload), written=len(ids), unchanged=len(payload) - len(ids), ids=ids
+    )
 
 
 @router.get("/", response_model=list[schemas.FinancialTransactionRead])
@@ -30,8 +83,16 @@ def list_transactions(
     property_id: int | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-    session: Session = Depends(get_session),
-) -> list[schemas.FinancialTransactionRead]:
-    return crud.list_transactions(
-        session, property_id=property_id, start_date=start_date, end_date=end_date
+    spec: FilterSpec = Depends(filter_params(schemas.FinancialTransactionRead)),
+    session: Session = Depends(get_read_session),
+) -> Response:
+    model = archive.source(
+        session, "transactions", spec.lower_bound("transaction_date", start_date)
+    )
+    return rows_response(
+        session,
+        spec.apply(crud.transactions_query(property_id, start_date, end_date, model=model), model),
+        model,
+        schemas.FinancialTransactionRead,
+        with_total=True,
     )
@@ -2,11 +2,16 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session
 
 from .. import crud, models, schemas
 from ..db import get_session
+from ..replica import get_read_session
+from ..serialization import rows_response
+from ..services.reference import get_reference_cache
 
 router = APIRouter()
 
@@ -16,16 +21,35 @@ def create_unit(
     payload: schemas.UnitCreate,
     session: Session = Depends(get_session),
 ) -> schemas.UnitRead:
-    property_ = session.get(models.Property, payload.property_id)
-    if property_ is None:
+    if not get_reference_cache(session).property_exists(session, payload.property_id):
         raise HTTPException(status_code=404, detail="Property not found")
     unit_in = models.Unit(**payload.dict())
     return crud.create_unit(session, unit_in)
 
 
+@router.put("/", response_model=schemas.UpsertResult)
+def upsert_units(
+    payload: List[schemas.UnitCreate],
+    session: Session = Depends(get_session),
+) -> schemas.UpsertResult:
+    """Insert or update units by ``(property_id, number)``."""
+
+    missing = get_reference_cache(session).missing(
+        session, models.Property, {row.property_id for row in payload}
+    )
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Property not found: {missing}")
+    ids = crud.upsert(
+        session, models.Unit, [row.dict() for row in payload], ("property_id", "number")
+    )
+    return schemas.UpsertResult(
+        received=len(payload), written=len(ids), unchanged=len(payload) - len(ids), ids=ids
+    )
+
+
 @router.get("/", response_model=list[schemas.UnitRead])
 def list_units(
     property_id: int | None = None,
-    session: Session = Depends(get_session),
-) -> list[schemas.UnitRead]:
-    return crud.list_units(session, property_id)
+    session: Session = Depends(get_read_session),
+) -> Response:
+    return rows_response(session, crud.units_query(property_id), models.Unit, schemas.UnitRead)
@@ -2,10 +2,10 @@
 
 from __future__ import annotations
 
-from datetime import date
-from typing import Dict, Optional
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 
 
 class PropertyBase(BaseModel):
@@ -18,6 +18,7 @@ class PropertyBase(BaseModel):
     postal_code: str
     total_units: Optional[int] = None
     property_manager: Optional[str] = None
+    ami_area: Optional[str] = None
 
 
 class PropertyCreate(PropertyBase):
@@ -31,6 +32,21 @@ class PropertyRead(PropertyBase):
         orm_mode = True
 
 
+class AreaMedianIncomeRead(BaseModel):
+    area_code: str
+    area_name: Optional[str] = None
+    median_income: float
+
+    class Config:
+        orm_mode = True
+
+
+class IncomeLimitTableRead(BaseModel):
+    version: int
+    areas: List[AreaMedianIncomeRead]
+    limit_count: int
+
+
 class UnitBase(BaseModel):
     property_id: int
     number: str
@@ -200,6 +216,7 @@ class FinancialTransactionBase(BaseModel):
     amount: float
     description: Optional[str] = None
     source: str = "tenant"
+    external_ref: Optional[str] = None
 
 
 class FinancialTransactionCreate(FinancialTransactionBase):
@@ -222,6 +239,16 @@ class OccupancyReport(BaseModel):
     ami_average: Optional[float]
 
 
+class OccupancyHistoryPoint(BaseModel):
+    property_id: int
+    snapshot_date: date
+    total_units: int
+    occupied_units: int
+    occupancy_rate: float
+    vacant_by_bedroom: Dict[int, int]
+    ami_average: Optional[float]
+
+
 class ComplianceIssue(BaseModel):
     household_id: int
     household_name: str
@@ -231,6 +258,26 @@ class ComplianceIssue(BaseModel):
     next_due_date: date
 
 
+class ComplianceRuleRead(BaseModel):
+    name: str
+    columns: List[str]
+    description: str
+    default: bool = True
+
+
+class RuleTiming(BaseModel):
+    name: str
+    findings: int
+    elapsed_ms: float
+
+
+class RuleSweep(BaseModel):
+    rows_scanned: int
+    elapsed_ms: float
+    rules: List[RuleTiming]
+    issues: List[ComplianceIssue]
+
+
 class RentProjection(BaseModel):
     property_id: int
     property_name: str
@@ -242,3 +289,149 @@ class RentProjection(BaseModel):
 class NOIReport(BaseModel):
     net_operating_income: float
     summary: Dict[str, float]
+
+
+class ComplianceSummary(BaseModel):
+    total: int
+    by_severity: Dict[str, int]
+    issues: List[ComplianceIssue]
+
+
+class Dashboard(BaseModel):
+    generated_at: datetime
+    occupancy: List[OccupancyReport]
+    rent: List[RentProjection]
+    noi: NOIReport
+    compliance: ComplianceSummary
+
+
+class ArchiveResult(BaseModel):
+    transactions: int
+    compliance_events: int
+    transactions_through: Optional[date]
+    compliance_events_through: Optional[date]
+
+
+class UpsertResult(BaseModel):
+    received: int
+    written: int
+    unchanged: int
+    ids: List[int]
+
+
+class IncomeDiscrepancy(BaseModel):
+    household_id: int
+    household_name: str
+    computed_income: float
+    household_income: float
+    certification_id: Optional[int] = None
+    certification_income: Optional[float] = None
+
+
+class IncomeRecomputation(BaseModel):
+    checked: int
+    discrepancies: List[IncomeDiscrepancy]
+    updated_households: int = 0
+    updated_certifications: int = 0
+
+
+class BudgetCreate(BaseModel):
+    property_id: int
+    period: date
+    category: str
+    amount: float
+
+    @validator("period")
+    def first_of_month(cls, value: date) -> date:
+        return value.replace(day=1)
+
+
+class BudgetImportResult(BaseModel):
+    imported: int
+
+
+class BudgetVarianceRow(BaseModel):
+    property_id: int
+    period: date
+    category: str
+    budget: float
+    actual: float
+    variance: float
+
+
+class ReportPack(BaseModel):
+    generated_at: datetime
+    start: Optional[date] = None
+    end: Optional[date] = None
+    property_count: int
+    occupancy: List[OccupancyReport]
+    rent: List[RentProjection]
+    operating_summary: Dict[str, float]
+    net_operating_income: float
+    compliance_issues: List[ComplianceIssue]
+
+
+class ReportPackRequest(BaseModel):
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+
+class ReportPackJobRead(BaseModel):
+    id: str
+    status: str
+    shard_count: int
+    completed_shards: int
+    submitted_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class ReportJobRead(BaseModel):
+    id: str
+    kind: str
+    status: str
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+
+class LedgerDiscrepancy(BaseModel):
+    property_id: int
+    category: str
+    balance_date: date
+    expected_amount: float
+    expected_cumulative: Optional[float] = None
+    recorded_amount: Optional[float] = None
+    recorded_cumulative: Optional[float] = None
+
+
+class LedgerVerification(BaseModel):
+    balanced: bool
+    checked_rows: int
+    discrepancies: List[LedgerDiscrepancy]
+
+
+class SearchResult(BaseModel):
+    entity: str
+    entity_id: int
+    label: str
+    score: float
+
+
+class ChangeEventRead(BaseModel):
+    seq: int
+    entity: str
+    entity_id: int
+    operation: str
+    payload: Dict[str, Any]
+    created_at: datetime
+
+
+class ChangeFeed(BaseModel):
+    changes: List[ChangeEventRead]
+    last_seq: int
@@ -0,0 +1,147 @@
+"""Archive tier for closed transactions and resolved compliance events.
+
+Transactions from closed fiscal years (calendar years here) and events
+resolved more than a configurable number of months ago move into
+same-shaped ``Archived*`` tables. Ledger balances are left in place, so
+``operating_summary`` and the budget reports keep the archived totals
+without reading either table. ``ArchiveWatermark`` records the latest
+date each archive holds. List queries UNION the archive only when their
+date range starts on or before it.
+"""
+
+from __future__ import annotations
+
+import calendar
+from datetime import date
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Type
+
+from sqlalchemy import delete, func, insert, union_all
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, SQLModel, select
+
+from .. import models, schemas
+
+
+class ArchivedTable(NamedTuple):
+    hot: Type[SQLModel]
+    archive: Type[SQLModel]
+    date_column: str
+
+
+ARCHIVES: Dict[str, ArchivedTable] = {
+    "transactions": ArchivedTable(
+        models.FinancialTransaction, models.ArchivedTransaction, "transaction_date"
+    ),
+    "compliance-events": ArchivedTable(
+        models.ComplianceEvent, models.ArchivedComplianceEvent, "occurred_on"
+    ),
+}
+
+
+def months_before(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(index, 12)
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def watermark(session: Session, name: str) -> Optional[date]:
+    row = session.get(models.ArchiveWatermark, name)
+    return row.archived_through if row is not None else None
+
+
+def archived_refs(session: Session, refs: Iterable[str]) -> Set[str]:
+    """External references among ``refs`` that already sit in the transaction archive."""
+
+    refs = list(refs)
+    if not refs or watermark(session, "transactions") is None:
+        return set()
+    column = models.ArchivedTransaction.external_ref
+    return set(session.exec(select(column).where(column.in_(refs))).all())
+
+
+def all_rows(name: str):
+    """The hot table and its archive as one entity, for ``select``."""
+
+    table = ARCHIVES[name]
+    columns = [column.name for column in table.hot.__table__.columns]
+    combined = union_all(
+        select(*(getattr(table.hot, column) for column in columns)),
+        select(*(getattr(table.archive, column) for column in columns)),
+    ).subquery(f"{table.hot.__tablename__}_all")
+    return aliased(table.hot, combined)
+
+
+def source(session: Session, name: str, start: Optional[date] = None):
+    """Entity to query for rows dated ``start`` onwards (``None``: all dates).
+
+    That is the hot table alone unless the archive may hold matching rows.
+    """
+
+    through = watermark(session, name)
+    if through is None or (start is not None and start > through):
+        return ARCHIVES[name].hot
+    return all_rows(name)
+
+
+def _move(session: Session, name: str, condition) -> int:
+    table = ARCHIVES[name]
+    columns = [column.name for column in table.hot.__table__.columns]
+    # SQLite may hand a deleted maximum rowid out again, which would
+    # duplicate an id across the two tables, so the newest row stays hot.
+    newest = select(func.max(table.hot.id)).scalar_subquery()
+    condition = condition & (table.hot.id < newest)
+    moved_through = session.exec(
+        select(func.max(getattr(table.hot, table.date_column))).where(condition)
+    ).one()
+    if moved_through is None:
+        return 0
+    # The INSERT takes the write lock, so no posting can land between the
+    # copy and the delete.
+    session.execute(
+        insert(table.archive).from_select(
+            columns, select(*(getattr(table.hot, column) for column in columns)).where(condition)
+        )
+    )
+    moved = session.execute(
+        delete(table.hot).where(condition).execution_options(synchronize_session=False)
+    ).rowcount
+    current = session.get(models.ArchiveWatermark, name)
+    if current is None:
+        session.add(models.ArchiveWatermark(name=name, archived_through=moved_through))
+    elif moved_through > current.archived_through:
+        current.archived_through = moved_through
+        session.add(current)
+    return moved
+
+
+def archive_closed_periods(
+    session: Session,
+    *,
+    through_year: Optional[int] = None,
+    resolved_months: int = 12,
+    today: Optional[date] = None,
+) -> schemas.ArchiveResult:
+    """Move transactions dated up to ``through_year`` (default: last year) and
+    events resolved more than ``resolved_months`` ago into the archive."""
+
+    today = today or date.today()
+    year_end = date(through_year if through_year is not None else today.year - 1, 12, 31)
+    resolved_before = months_before(today, resolved_months)
+    transactions = _move(
+        session,
+        "transactions",
+        models.FinancialTransaction.transaction_date <= year_end,
+    )
+    events = _move(
+        session,
+        "compliance-events",
+        models.ComplianceEvent.resolved_on.is_not(None)
+        & (models.ComplianceEvent.resolved_on < resolved_before),
+    )
+    session.commit()
+    return schemas.ArchiveResult(
+        transactions=transactions,
+        compliance_events=events,
+        transactions_through=watermark(session, "transactions"),
+        compliance_events_through=watermark(session, "compliance-events"),
+    )
@@ -0,0 +1,126 @@
+"""Budgets by property, category and month, and variance against actuals.
+
+Actuals come from the ledger's day totals grouped by calendar month in one
+query. Budgets and actuals are both read in ``(property, month, category)``
+order and merged in a single pass, so a portfolio-wide, multi-year report
+costs two ordered scans regardless of how many properties it covers.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, extract, func, tuple_
+from sqlmodel import Session, select
+
+from .. import crud, models, schemas
+from .financials import _filter_properties
+
+Key = Tuple[int, date, str]
+
+
+def import_budgets(session: Session, budgets: Iterable[schemas.BudgetCreate]) -> int:
+    """Insert budgets, replacing any existing amount for the same property, month and category."""
+
+    latest = {(budget.property_id, budget.period, budget.category): budget for budget in budgets}
+    if not latest:
+        return 0
+    keys = list(latest)
+    for start in range(0, len(keys), 500):
+        session.exec(
+            delete(models.Budget).where(
+                tuple_(models.Budget.property_id, models.Budget.period, models.Budget.category).in_(
+                    keys[start : start + 500]
+                )
+            )
+        )
+    crud.bulk_create(session, [models.Budget(**budget.dict()) for budget in latest.values()])
+    return len(latest)
+
+
+def _month_start(value: Optional[date]) -> Optional[date]:
+    return value.replace(day=1) if value is not None else None
+
+
+def _budget_rows(session, property_id, property_ids, start, end) -> Iterator[Tuple[Key, float]]:
+    statement = _filter_properties(
+        select(models.Budget.property_id, models.Budget.period, models.Budget.category, models.Budget.amount),
+        models.Budget.property_id,
+        property_id,
+        property_ids,
+    )
+    if start is not None:
+        statement = statement.where(models.Budget.period >= start)
+    if end is not None:
+        statement = statement.where(models.Budget.period <= end)
+    statement = statement.order_by(models.Budget.property_id, models.Budget.period, models.Budget.category)
+    for owner, period, category, amount in session.execute(statement):
+        yield (owner, period, category), amount
+
+
+def _actual_rows(session, property_id, property_ids, start, end) -> Iterator[Tuple[Key, float]]:
+    year = extract("year", models.LedgerBalance.balance_date).label("year")
+    month = extract("month", models.LedgerBalance.balance_date).label("month")
+    statement = _filter_properties(
+        select(
+            models.LedgerBalance.property_id,
+            year,
+            month,
+            models.LedgerBalance.category,
+            func.sum(models.LedgerBalance.amount),
+        ),
+        models.LedgerBalance.property_id,
+        property_id,
+        property_ids,
+    )
+    if start is not None:
+        statement = statement.where(models.LedgerBalance.balance_date >= start)
+    if end is not None:
+        # ``end`` is a month start; include every day of that month.
+        next_month = date(end.year + end.month // 12, end.month % 12 + 1, 1)
+        statement = statement.where(models.LedgerBalance.balance_date < next_month)
+    statement = statement.group_by(
+        models.LedgerBalance.property_id, year, month, models.LedgerBalance.category
+    ).order_by(models.LedgerBalance.property_id, year, month, models.LedgerBalance.category)
+    for owner, year_, month_, category, amount in session.execute(statement):
+        yield (owner, date(int(year_), int(month_), 1), category), amount
+
+
+def budget_variance(
+    session: Session,
+    *,
+    property_id: Optional[int] = None,
+    property_ids: Optional[Sequence[int]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[schemas.BudgetVarianceRow]:
+    """Actual minus budget per property, month and category, as ``apply_budget_variance`` computes it."""
+
+    start, end = _month_start(start), _month_start(end)
+    budgets = _budget_rows(session, property_id, property_ids, start, end)
+    actuals = _actual_rows(session, property_id, property_ids, start, end)
+    rows: List[schemas.BudgetVarianceRow] = []
+    budget = next(budgets, None)
+    actual = next(actuals, None)
+    while budget is not None or actual is not None:
+        if actual is None or (budget is not None and budget[0] < actual[0]):
+            key, budgeted, spent = budget[0], budget[1], 0.0
+            budget = next(budgets, None)
+        elif budget is None or actual[0] < budget[0]:
+            key, budgeted, spent = actual[0], 0.0, actual[1]
+            actual = next(actuals, None)
+        else:
+            key, budgeted, spent = budget[0], budget[1], actual[1]
+            budget, actual = next(budgets, None), next(actuals, None)
+        rows.append(
+            schemas.BudgetVarianceRow(
+                property_id=key[0],
+                period=key[1],
+                category=key[2],
+                budget=round(budgeted, 2),
+                actual=round(spent, 2),
+                variance=round(spent - budgeted, 2),
+            )
+        )
+    return rows
@@ -3,12 +3,23 @@
 from __future__ import annotations
 
 from datetime import date, timedelta
-from typing import Iterable, List
+from functools import partial
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Sequence
 
 from sqlalchemy import exists
 from sqlmodel import Session, select
 
 from .. import models, schemas
+from . import rules
+from .income_limits import DEFAULT_AREA_MEDIAN_INCOME, IncomeLimitTable, get_income_limits
+from .reference import get_reference_cache
+from .rent_limits import MaxRentTable
+
+# Rows fetched per round trip when issues are streamed rather than collected.
+STREAM_BATCH = 1000
+
+if TYPE_CHECKING:
+    from .snapshot import PortfolioSnapshot
 
 
 class ComplianceService:
@@ -18,144 +29,187 @@ class ComplianceService:
         self,
         session: Session,
         *,
-        area_median_income: float = 65000.0,
+        area_median_income: float = DEFAULT_AREA_MEDIAN_INCOME,
+        income_limits: Optional[IncomeLimitTable] = None,
         recertification_window: int = 30,
+        property_ids: Optional[Sequence[int]] = None,
+        snapshot: Optional["PortfolioSnapshot"] = None,
     ) -> None:
         self.session = session
+        self.property_ids = property_ids
+        self.snapshot = snapshot
         self.area_median_income = area_median_income
+        self.income_limits = income_limits or IncomeLimitTable.flat(area_median_income)
         self.recertification_window = recertification_window
 
     # ------------------------------------------------------------------
     # Certification monitoring
     # ------------------------------------------------------------------
+    def rule_context(self) -> rules.RuleContext:
+        return rules.RuleContext(
+            date.today(),
+            self.recertification_window,
+            self.income_limits,
+            MaxRentTable(self.income_limits),
+        )
+
+    def rule_source(self, columns: Sequence[str], where: Sequence[object] = ()):
+        """Rows for the rule engine: the snapshot when it holds every column, else one query.
+
+        ``where`` narrows the query only; the rules still check every row
+        they are given, so the snapshot can ignore it.
+        """
+
+        if self.snapshot is not None and self.snapshot.supports(columns):
+            return self.snapshot.rule_rows(columns, self.property_ids)
+        references = get_reference_cache(self.session)
+        return rules.database_rows(
+            self.session,
+            columns,
+            self.property_ids,
+            program_names=partial(references.program_name, self.session),
+            where=where,
+        )
+
+    def iter_rule_issues(
+        self, names: Optional[Sequence[str]] = None
+    ) -> Iterator[schemas.ComplianceIssue]:
+        """Issues from the default rules (or ``names``), evaluated in one pass."""
+
+        selected, context = rules.select_rules(names), self.rule_context()
+        for _, issue in rules.iter_findings(self._source_for(selected, context), selected, context):
+            yield issue
+
+    def sweep(self, names: Optional[Sequence[str]] = None) -> schemas.RuleSweep:
+        selected, context = rules.select_rules(names), self.rule_context()
+        return rules.sweep(self._source_for(selected, context), selected, context)
+
+    def _source_for(self, selected: Sequence[rules.Rule], context: rules.RuleContext):
+        # A rule running alone pushes its predicate into the query, so e.g.
+        # certifications_due reads only due rows through the date index.
+        if len(selected) == 1 and selected[0].where is not None:
+            return partial(self.rule_source, where=[selected[0].where(context)])
+        return self.rule_source
+
     def certifications_due(self) -> List[schemas.ComplianceIssue]:
         """Return certifications that are due soon or past due."""
 
-        today = date.today()
-        threshold = today + timedelta(days=self.recertification_window)
-        statement = (
-            select(models.Certification, models.Household, models.Program)
-            .join(models.Household, models.Household.id == models.Certification.household_id)
-            .join(models.Program, models.Program.id == models.Certification.program_id)
-            .where(models.Certification.status == "Active")
-            .where(models.Certification.next_due_date <= threshold)
-        )
-        issues: List[schemas.ComplianceIssue] = []
-        for certification, household, program in self.session.exec(statement).all():
-            severity = "High" if certification.next_due_date < today else "Medium"
-            issue = schemas.ComplianceIssue(
-                household_id=household.id,
-                household_name=household.name,
-                program_name=program.name,
-                issue="Certification due",
-                severity=severity,
-                next_due_date=certification.next_due_date,
-            )
-            issues.append(issue)
-        return issues
+        return list(self.iter_rule_issues(["certification-due"]))
 
     def income_limit_exceptions(self) -> List[schemas.ComplianceIssue]:
         """Identify households whose reported income exceeds program limits."""
 
-        statement = (
-            select(models.Certification, models.Household, models.Program)
-            .join(models.Household, models.Household.id == models.Certification.household_id)
-            .join(models.Program, models.Program.id == models.Certification.program_id)
-            .where(models.Certification.status == "Active")
-        )
-        issues: List[schemas.ComplianceIssue] = []
-        for certification, household, program in self.session.exec(statement).all():
-            limit = self._income_limit_for_household(program, household)
-            if certification.household_income > limit:
-                issues.append(
-                    schemas.ComplianceIssue(
-                        household_id=household.id,
-                        household_name=household.name,
-                        program_name=program.name,
-                        issue=(
-                            f"Household income ${certification.household_income:,.0f} "
-                            f"exceeds limit ${limit:,.0f}"
-                        ),
-                        severity="High",
-                        next_due_date=certification.next_due_date,
-                    )
-                )
-        return issues
+        return list(self.iter_rule_issues(["income-limit"]))
 
     def households_without_recent_activity(self, months: int = 6) -> List[schemas.ComplianceIssue]:
         """Flag households lacking certifications in the given timeframe."""
 
+        return list(self.iter_households_without_recent_activity(months))
+
+    def iter_households_without_recent_activity(
+        self, months: int = 6
+    ) -> Iterator[schemas.ComplianceIssue]:
         cutoff = date.today() - timedelta(days=months * 30)
         subquery = (
             select(models.Certification.id)
             .where(models.Certification.household_id == models.Household.id)
             .where(models.Certification.effective_date >= cutoff)
         )
-        statement = select(models.Household).where(~exists(subquery))
-        households = self.session.exec(statement).all()
-        issues: List[schemas.ComplianceIssue] = []
-        for household in households:
-            issues.append(
-                schemas.ComplianceIssue(
-                    household_id=household.id,
-                    household_name=household.name,
-                    program_name="All",
-                    issue="No recertification activity",
-                    severity="Medium",
-                    next_due_date=date.today(),
-                )
+        statement = self._scope_to_properties(
+            select(models.Household).where(~exists(subquery))
+        )
+        for household in self._stream(statement):
+            yield schemas.ComplianceIssue(
+                household_id=household.id,
+                household_name=household.name,
+                program_name="All",
+                issue="No recertification activity",
+                severity="Medium",
+                next_due_date=date.today(),
             )
-        return issues
 
     def consolidate_issues(self) -> List[schemas.ComplianceIssue]:
         """Aggregate compliance issues for dashboards."""
 
-        aggregated: List[schemas.ComplianceIssue] = []
-        for issue in self.certifications_due():
-            aggregated.append(issue)
-        for issue in self.income_limit_exceptions():
-            aggregated.append(issue)
-        for issue in self.households_without_recent_activity():
-            aggregated.append(issue)
-        return aggregated
+        return list(self.iter_issues())
+
+    def iter_issues(self) -> Iterator[schemas.ComplianceIssue]:
+        yield from self.iter_rule_issues()
+        yield from self.iter_households_without_recent_activity()
 
     # ------------------------------------------------------------------
     # Helpers
     # ------------------------------------------------------------------
-    def _income_limit_for_household(
-        self, program: models.Program, household: models.Household
-    ) -> float:
-        """Approximate program income limits with a household size bump factor."""
+    def _stream(self, statement):
+        """Execute in batches so callers that iterate never hold the full result."""
+
+        return self.session.exec(statement.execution_options(yield_per=STREAM_BATCH))
 
-        size_adjustment = max(household.household_size - 4, 0)
-        bump = 1 + 0.08 * size_adjustment
-        return self.area_median_income * (program.income_limit_percent / 100) * bump
+    def _scope_to_properties(self, statement):
+        """Restrict a household-based statement to the configured properties."""
+
+        if self.property_ids is None:
+            return statement
+        return statement.join(models.Unit, models.Unit.id == models.Household.unit_id).where(
+            models.Unit.property_id.in_(self.property_ids)
+        )
 
 
 def open_findings(session: Session) -> List[schemas.ComplianceIssue]:
     """Convert unresolved compliance events into issue objects."""
 
+    return list(iter_open_findings(session))
+
+
+def iter_open_findings(session: Session) -> Iterator[schemas.ComplianceIssue]:
+    # The inner join drops events whose household no longer exists; program
+    # names come from the reference cache.
+    references = get_reference_cache(session)
     statement = (
-        select(models.ComplianceEvent, models.Program)
-        .join(models.Program, models.Program.id == models.ComplianceEvent.program_id)
+        select(models.ComplianceEvent, models.Household)
+        .join(models.Household, models.Household.id == models.ComplianceEvent.household_id)
         .where(models.ComplianceEvent.resolved_on.is_(None))
+        .order_by(models.ComplianceEvent.id)
     )
-    issues: List[schemas.ComplianceIssue] = []
-    for event, program in session.exec(statement).all():
-        household = session.get(models.Household, event.household_id)
-        if household is None:
+    for event, household in session.exec(statement.execution_options(yield_per=STREAM_BATCH)):
+        program_name = references.program_name(session, event.program_id)
+        if program_name is None:
             continue
-        issues.append(
-            schemas.ComplianceIssue(
-                household_id=household.id,
-                household_name=household.name,
-                program_name=program.name,
-                issue=event.finding,
-                severity=event.severity,
-                next_due_date=event.occurred_on,
-            )
+        yield schemas.ComplianceIssue(
+            household_id=household.id,
+            household_name=household.name,
+            program_name=program_name,
+            issue=event.finding,
+            severity=event.severity,
+            next_due_date=event.occurred_on,
         )
-    return issues
+
+
+def portfolio_issues(
+    session: Session,
+    *,
+    include_events: bool = True,
+    snapshot: Optional["PortfolioSnapshot"] = None,
+) -> List[schemas.ComplianceIssue]:
+    """Consolidated issues for the whole portfolio, as served by ``/compliance/issues``."""
+
+    return list(iter_portfolio_issues(session, include_events=include_events, snapshot=snapshot))
+
+
+def iter_portfolio_issues(
+    session: Session,
+    *,
+    include_events: bool = True,
+    snapshot: Optional["PortfolioSnapshot"] = None,
+) -> Iterator[schemas.ComplianceIssue]:
+    """``portfolio_issues`` one issue at a time, for streaming exports."""
+
+    service = ComplianceService(
+        session, income_limits=get_income_limits(session), snapshot=snapshot
+    )
+    yield from service.iter_issues()
+    if include_events:
+        yield from iter_open_findings(session)
 
 
 def combine_issue_sources(
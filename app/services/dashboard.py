@@ -0,0 +1,152 @@
+"""Portfolio dashboard assembled from one set of grouped queries.
+
+The dashboard used to be four separate calls (occupancy, rent, NOI and
+compliance issues), each walking units, households and certifications
+again, once per property. Here occupancy and rent come from two ``GROUP
+BY`` queries over the whole portfolio, NOI from the ledger balances, and
+compliance from the single-pass rule engine. The sections are independent,
+so each runs on its own connection in parallel; in-memory databases run
+them inline in the caller's session.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, case, distinct, func
+from sqlmodel import Session, select
+
+from .. import db, models, schemas
+from . import compliance, financials
+from .snapshot import get_snapshot
+
+Section = Callable[[Session], Any]
+
+
+def property_rollups(session: Session) -> List[Any]:
+    """Unit count, occupied unit count and occupied AMI average per property."""
+
+    occupied = select(distinct(models.Household.unit_id).label("unit_id")).subquery()
+    ami = case(
+        (and_(occupied.c.unit_id.is_not(None), models.Unit.ami_percent != 0), models.Unit.ami_percent)
+    )
+    statement = (
+        select(
+            models.Property.id,
+            models.Property.name,
+            func.count(models.Unit.id),
+            func.count(occupied.c.unit_id),
+            func.avg(ami),
+        )
+        .outerjoin(models.Unit, models.Unit.property_id == models.Property.id)
+        .outerjoin(occupied, occupied.c.unit_id == models.Unit.id)
+        .group_by(models.Property.id, models.Property.name)
+        .order_by(models.Property.id)
+    )
+    return session.exec(statement).all()
+
+
+def rent_rollups(session: Session) -> Dict[int, Any]:
+    """Active tenant and subsidy rent totals per property."""
+
+    statement = (
+        select(
+            models.Unit.property_id,
+            func.sum(models.Certification.tenant_rent),
+            func.sum(models.Certification.contract_rent - models.Certification.tenant_rent),
+        )
+        .join(models.Household, models.Household.id == models.Certification.household_id)
+        .join(models.Unit, models.Unit.id == models.Household.unit_id)
+        .where(models.Certification.status == "Active")
+        .group_by(models.Unit.property_id)
+    )
+    return {property_id: (tenant, subsidy) for property_id, tenant, subsidy in session.exec(statement)}
+
+
+def _occupancy(rollups: List[Any]) -> List[schemas.OccupancyReport]:
+    return [
+        schemas.OccupancyReport(
+            property_id=property_id,
+            property_name=name,
+            total_units=total,
+            occupied_units=occupied,
+            occupancy_rate=round(occupied / total * 100, 2) if total else 0,
+            ami_average=ami_average,
+        )
+        for property_id, name, total, occupied, ami_average in rollups
+    ]
+
+
+def _rent(rollups: List[Any], rents: Dict[int, Any]) -> List[schemas.RentProjection]:
+    projections: List[schemas.RentProjection] = []
+    for property_id, name, *_ in rollups:
+        tenant, subsidy = rents.get(property_id, (0.0, 0.0))
+        projections.append(
+            schemas.RentProjection(
+                property_id=property_id,
+                property_name=name,
+                monthly_rent_roll=round(tenant + subsidy, 2),
+                subsidy_share=round(subsidy, 2),
+                tenant_share=round(tenant, 2),
+            )
+        )
+    return projections
+
+
+def _run_sections(session: Session, sections: Dict[str, Section]) -> Dict[str, Any]:
+    bind = session.get_bind()
+    if db.is_in_memory(bind.url) or len(sections) < 2:
+        return {name: run(session) for name, run in sections.items()}
+
+    def run_on_own_connection(run: Section) -> Any:
+        # Copying ``info`` keeps replica workers on the primary's caches.
+        with Session(bind, info=dict(session.info)) as worker:
+            return run(worker)
+
+    with ThreadPoolExecutor(max_workers=len(sections), thread_name_prefix="dashboard") as executor:
+        futures = {name: executor.submit(run_on_own_connection, run) for name, run in sections.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def build_dashboard(
+    session: Session,
+    *,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    include_events: bool = True,
+) -> schemas.Dashboard:
+    """Occupancy, rent, NOI and compliance KPIs for the whole portfolio."""
+
+    snapshot = get_snapshot(session)
+    sections: Dict[str, Section] = {
+        "noi": lambda s: financials.noi_report(s, start=start, end=end),
+        "issues": lambda s: compliance.portfolio_issues(
+            s, include_events=include_events, snapshot=snapshot
+        ),
+    }
+    if snapshot is None:
+        sections["properties"] = property_rollups
+        sections["rents"] = rent_rollups
+    results = _run_sections(session, sections)
+
+    if snapshot is None:
+        occupancy = _occupancy(results["properties"])
+        rent = _rent(results["properties"], results["rents"])
+    else:
+        occupancy = snapshot.occupancy_reports()
+        rent = snapshot.rent_projection()
+    issues: List[schemas.ComplianceIssue] = results["issues"]
+    return schemas.Dashboard(
+        generated_at=datetime.utcnow(),
+        occupancy=occupancy,
+        rent=rent,
+        noi=results["noi"],
+        compliance=schemas.ComplianceSummary(
+            total=len(issues),
+            by_severity=dict(Counter(issue.severity for issue in issues)),
+            issues=issues,
+        ),
+    )
@@ -0,0 +1,149 @@
+"""Memory-bounded CSV exports.
+
+Each export is a generator pipeline: a batched cursor (``yield_per``) feeds
+a row transform, rows are written into a small ``StringIO`` that is drained
+every ``CHUNK_SIZE`` characters, and the optional gzip stage compresses
+chunk by chunk. Peak memory depends on the batch and chunk sizes, not on
+the number of rows exported.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import and_
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from .. import models
+from .compliance import iter_portfolio_issues
+
+CHUNK_SIZE = 64 * 1024
+FETCH_BATCH = 1000
+
+RENT_ROLL_HEADER = (
+    "property_code",
+    "property_name",
+    "unit_number",
+    "bedrooms",
+    "unit_status",
+    "household_id",
+    "household_name",
+    "move_in_date",
+    "annual_income",
+    "household_size",
+    "contract_rent",
+    "tenant_rent",
+    "utility_allowance",
+    "subsidy",
+    "next_due_date",
+)
+
+COMPLIANCE_ISSUE_HEADER = (
+    "household_id",
+    "household_name",
+    "program_name",
+    "issue",
+    "severity",
+    "next_due_date",
+)
+
+RowSource = Callable[[Session], Iterable[Sequence[object]]]
+
+
+def rent_roll_rows(session: Session, property_id: Optional[int] = None) -> Iterator[tuple]:
+    """One row per unit and current household, with the active certification's rents."""
+
+    statement = (
+        select(
+            models.Property.code,
+            models.Property.name,
+            models.Unit.number,
+            models.Unit.bedrooms,
+            models.Unit.status,
+            models.Household.id,
+            models.Household.name,
+            models.Household.move_in_date,
+            models.Household.annual_income,
+            models.Household.household_size,
+            models.Certification.contract_rent,
+            models.Certification.tenant_rent,
+            models.Certification.utility_allowance,
+            models.Certification.next_due_date,
+        )
+        .join(models.Property, models.Property.id == models.Unit.property_id)
+        .outerjoin(models.Household, models.Household.unit_id == models.Unit.id)
+        .outerjoin(
+            models.Certification,
+            and_(
+                models.Certification.household_id == models.Household.id,
+                models.Certification.status == "Active",
+            ),
+        )
+        .order_by(models.Property.code, models.Unit.number, models.Household.id)
+    )
+    if property_id is not None:
+        statement = statement.where(models.Unit.property_id == property_id)
+    for row in session.execute(statement.execution_options(yield_per=FETCH_BATCH)):
+        *leading, contract_rent, tenant_rent, allowance, next_due = row
+        subsidy = None if contract_rent is None else round(contract_rent - tenant_rent, 2)
+        yield (*leading, contract_rent, tenant_rent, allowance, subsidy, next_due)
+
+
+def compliance_issue_rows(session: Session, include_events: bool = True) -> Iterator[tuple]:
+    for issue in iter_portfolio_issues(session, include_events=include_events):
+        yield (
+            issue.household_id,
+            issue.household_name,
+            issue.program_name,
+            issue.issue,
+            issue.severity,
+            issue.next_due_date,
+        )
+
+
+def csv_chunks(header: Sequence[str], rows: Iterable[Sequence[object]]) -> Iterator[bytes]:
+    """Encode rows as CSV, yielding roughly ``CHUNK_SIZE`` bytes at a time."""
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(
+    bind: Engine,
+    header: Sequence[str],
+    source: RowSource,
+    *,
+    compress: bool = False,
+    info: Optional[Dict[str, Any]] = None,
+) -> Iterator[bytes]:
+    """Run ``source`` on a session owned by the generator, so it outlives the request scope.
+
+    ``info`` is copied from the request session, so a replica export keys
+    its caches by the primary (see ``db.primary_bind``).
+    """
+
+    with Session(bind, info=dict(info or {})) as session:
+        chunks = csv_chunks(header, source(session))
+        yield from gzip_chunks(chunks) if compress else chunks
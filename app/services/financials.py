@@ -2,21 +2,40 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
 from datetime import date
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
 
 from sqlmodel import Session, select
 
 from .. import models, schemas
+from . import ledger
 
+if TYPE_CHECKING:
+    from .snapshot import PortfolioSnapshot
 
-def occupancy_reports(session: Session, property_id: Optional[int] = None) -> List[schemas.OccupancyReport]:
-    """Compute occupancy and affordability metrics for each property."""
 
-    property_stmt = select(models.Property)
+def _filter_properties(statement, column, property_id, property_ids):
     if property_id is not None:
-        property_stmt = property_stmt.where(models.Property.id == property_id)
+        statement = statement.where(column == property_id)
+    if property_ids is not None:
+        statement = statement.where(column.in_(property_ids))
+    return statement
+
+
+def occupancy_reports(
+    session: Session,
+    property_id: Optional[int] = None,
+    *,
+    property_ids: Optional[Sequence[int]] = None,
+    snapshot: Optional["PortfolioSnapshot"] = None,
+) -> List[schemas.OccupancyReport]:
+    """Compute occupancy and affordability metrics for each property."""
+
+    if snapshot is not None:
+        return snapshot.occupancy_reports(property_id, property_ids=property_ids)
+    property_stmt = _filter_properties(
+        select(models.Property), models.Property.id, property_id, property_ids
+    )
     properties = session.exec(property_stmt).all()
     reports: List[schemas.OccupancyReport] = []
     for property_ in properties:
@@ -50,13 +69,19 @@ def occupancy_reports(session: Session, property_id: Optional[int] = None) -> Li
     return reports
 
 
-def rent_projection(session: Session, property_id: Optional[int] = None) -> List[schemas.RentProjection]:
+def rent_projection(
+    session: Session,
+    property_id: Optional[int] = None,
+    *,
+    property_ids: Optional[Sequence[int]] = None,
+    snapshot: Optional["PortfolioSnapshot"] = None,
+) -> List[schemas.RentProjection]:
     """Summaries of subsidy vs tenant rent for the rent roll."""
 
-    statement = (
-        select(models.Property)
-        if property_id is None
-        else select(models.Property).where(models.Property.id == property_id)
+    if snapshot is not None:
+        return snapshot.rent_projection(property_id, property_ids=property_ids)
+    statement = _filter_properties(
+        select(models.Property), models.Property.id, property_id, property_ids
     )
     projections: List[schemas.RentProjection] = []
     for property_ in session.exec(statement).all():
@@ -88,23 +113,19 @@ def operating_summary(
     session: Session,
     *,
     property_id: Optional[int] = None,
+    property_ids: Optional[Sequence[int]] = None,
     start: Optional[date] = None,
     end: Optional[date] = None,
 ) -> Dict[str, float]:
-    """Aggregate transactions into revenue and expense totals."""
+    """Aggregate transactions into revenue and expense totals.
 
-    stmt = select(models.FinancialTransaction)
-    if property_id is not None:
-        stmt = stmt.where(models.FinancialTransaction.property_id == property_id)
-    if start is not None:
-        stmt = stmt.where(models.FinancialTransaction.transaction_date >= start)
-    if end is not None:
-        stmt = stmt.where(models.FinancialTransaction.transaction_date <= end)
+    Totals come from the running balances in ``LedgerBalance``, so the cost
+    does not grow with the number of transactions in the window.
+    """
 
-    buckets: Dict[str, float] = defaultdict(float)
-    for transaction in session.exec(stmt).all():
-        buckets[transaction.category] += transaction.amount
-    return dict(buckets)
+    return ledger.window_totals(
+        session, property_id=property_id, property_ids=property_ids, start=start, end=end
+    )
 
 
 def net_operating_income(summary: Dict[str, float]) -> float:
@@ -115,6 +136,19 @@ def net_operating_income(summary: Dict[str, float]) -> float:
     return round(revenue - expenses, 2)
 
 
+def noi_report(
+    session: Session,
+    *,
+    property_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> schemas.NOIReport:
+    """Operating summary together with the derived net operating income."""
+
+    summary = operating_summary(session, property_id=property_id, start=start, end=end)
+    return schemas.NOIReport(net_operating_income=net_operating_income(summary), summary=summary)
+
+
 def apply_budget_variance(actuals: Dict[str, float], budget: Dict[str, float]) -> Dict[str, float]:
     """Compute variance between actuals and budget expectations."""
 
@@ -0,0 +1,139 @@
+"""Group commit for high-frequency transaction posting.
+
+Callers enqueue validated ``FinancialTransaction`` rows and receive a
+future. A single writer thread drains the queue and commits up to
+``max_batch`` rows, or whatever arrived within ``max_delay_ms``, in one
+database transaction. It then resolves every future with the row's id.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from .. import crud, db, models
+
+Pending = Tuple[models.FinancialTransaction, "Future[int]"]
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Single writer thread that batches transaction inserts for one engine."""
+
+    def __init__(self, bind: Engine, *, max_batch: int = 500, max_delay_ms: float = 5.0) -> None:
+        self.bind = bind
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.batches = 0
+        self.rows = 0
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, transaction: models.FinancialTransaction) -> "Future[int]":
+        future: "Future[int]" = Future()
+        self._queue.put((transaction, future))
+        return future
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch: List[Pending] = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch: List[Pending]) -> None:
+        try:
+            ids = _write(self.bind, [transaction for transaction, _ in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            # Retry row by row so one bad posting does not reject the batch.
+            for pending in batch:
+                self._flush([pending])
+            return
+        self.batches += 1
+        self.rows += len(ids)
+        for (_, future), transaction_id in zip(batch, ids):
+            future.set_result(transaction_id)
+
+
+def _write(bind: Engine, transactions: List[models.FinancialTransaction]) -> List[int]:
+    """Insert fresh copies so a failed attempt leaves no state on the originals."""
+
+    rows = [models.FinancialTransaction(**row.model_dump(exclude={"id"})) for row in transactions]
+    with Session(bind, expire_on_commit=False) as session:
+        return [row.id for row in crud.create_transactions(session, rows)]
+
+
+class GroupCommit:
+    """Hands out one writer per engine; in-memory databases write inline.
+
+    ``timeout`` bounds how long a request waits for its batch to commit.
+    """
+
+    def __init__(
+        self, *, max_batch: int = 500, max_delay_ms: float = 5.0, timeout: float = 30.0
+    ) -> None:
+        self.max_batch = max_batch
+        self.max_delay_ms = max_delay_ms
+        self.timeout = timeout
+        self._writers: Dict[Engine, GroupCommitWriter] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, bind: Engine, transaction: models.FinancialTransaction) -> "Future[int]":
+        if db.is_in_memory(bind.url):
+            future: "Future[int]" = Future()
+            try:
+                future.set_result(_write(bind, [transaction])[0])
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+        return self._writer_for(bind).submit(transaction)
+
+    def writer(self, bind: Engine) -> Optional[GroupCommitWriter]:
+        return self._writers.get(bind)
+
+    def close(self) -> None:
+        with self._lock:
+            writers, self._writers = list(self._writers.values()), {}
+        for writer in writers:
+            writer.close()
+
+    def _writer_for(self, bind: Engine) -> GroupCommitWriter:
+        with self._lock:
+            writer = self._writers.get(bind)
+            if writer is None:
+                writer = GroupCommitWriter(
+                    bind, max_batch=self.max_batch, max_delay_ms=self.max_delay_ms
+                )
+                self._writers[bind] = writer
+            return writer
@@ -0,0 +1,97 @@
+"""Recompute household income from resident incomes.
+
+``SUM(Resident.monthly_income) * 12`` is computed for every household in
+one grouped query and compared with ``Household.annual_income`` and the
+active certification's ``household_income``. Households without any
+resident income on file are left alone.
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional, Sequence
+
+from sqlalchemy import and_, func
+from sqlmodel import Session, select
+
+from .. import crud, models, schemas
+
+
+def recompute_incomes(
+    session: Session,
+    *,
+    property_id: Optional[int] = None,
+    household_ids: Optional[Sequence[int]] = None,
+    tolerance: float = 1.0,
+    apply: bool = False,
+) -> schemas.IncomeRecomputation:
+    """Report (and with ``apply``, correct) stored incomes that differ from resident totals."""
+
+    resident_income = (
+        select(
+            models.Resident.household_id,
+            (func.sum(models.Resident.monthly_income) * 12).label("computed"),
+        )
+        .where(models.Resident.monthly_income.is_not(None))
+        .group_by(models.Resident.household_id)
+        .subquery()
+    )
+    statement = (
+        select(
+            models.Household.id,
+            models.Household.name,
+            models.Household.annual_income,
+            resident_income.c.computed,
+            models.Certification.id,
+            models.Certification.household_income,
+        )
+        .join(resident_income, resident_income.c.household_id == models.Household.id)
+        .outerjoin(
+            models.Certification,
+            and_(
+                models.Certification.household_id == models.Household.id,
+                models.Certification.status == "Active",
+            ),
+        )
+        .order_by(models.Household.id)
+    )
+    if property_id is not None:
+        statement = statement.join(models.Unit, models.Unit.id == models.Household.unit_id).where(
+            models.Unit.property_id == property_id
+        )
+    if household_ids is not None:
+        statement = statement.where(models.Household.id.in_(household_ids))
+
+    discrepancies: List[schemas.IncomeDiscrepancy] = []
+    household_updates, certification_updates = {}, []
+    checked = set()
+    for household_id, name, stored, computed, certification_id, certified in session.execute(statement):
+        checked.add(household_id)
+        computed = round(computed, 2)
+        household_off = abs(stored - computed) > tolerance
+        certification_off = certification_id is not None and abs(certified - computed) > tolerance
+        if not (household_off or certification_off):
+            continue
+        discrepancies.append(
+            schemas.IncomeDiscrepancy(
+                household_id=household_id,
+                household_name=name,
+                computed_income=computed,
+                household_income=stored,
+                certification_id=certification_id,
+                certification_income=certified,
+            )
+        )
+        if household_off:
+            household_updates[household_id] = {"id": household_id, "annual_income": computed}
+        if certification_off:
+            certification_updates.append({"id": certification_id, "household_income": computed})
+
+    result = schemas.IncomeRecomputation(checked=len(checked), discrepancies=discrepancies)
+    if apply:
+        result.updated_households = crud.bulk_update(
+            session, models.Household, list(household_updates.values())
+        )
+        result.updated_certifications = crud.bulk_update(
+            session, models.Certification, certification_updates
+        )
+    return result
@@ -0,0 +1,231 @@
+"""Area median income and income-limit tables for compliance checks."""
+
+from __future__ import annotations
+
+import csv
+import itertools
+import re
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import delete
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from .. import db, models
+
+DEFAULT_AREA_MEDIAN_INCOME = 65000.0
+
+_AREA_COLUMNS = ("area_code", "hud_area_code", "fips2010", "fips")
+_NAME_COLUMNS = ("area_name", "hud_area_name", "county_name", "name")
+_LIMIT_COLUMN = re.compile(r"^(?:l(?P<percent>\d+)|(?P<eli>eli))_(?P<size>\d+)$")
+_EXTREMELY_LOW_INCOME_PERCENT = 30
+
+LimitKey = Tuple[str, int, int]
+
+_versions = itertools.count(1)
+_tables: "WeakKeyDictionary[Engine, IncomeLimitTable]" = WeakKeyDictionary()
+
+
+def estimated_limit(median_income: float, ami_percent: int, household_size: int) -> float:
+    """Approximate an income limit with a household size bump factor."""
+
+    size_adjustment = max(household_size - 4, 0)
+    bump = 1 + 0.08 * size_adjustment
+    return median_income * (ami_percent / 100) * bump
+
+
+class IncomeLimitTable:
+    """Read-only, in-memory view of published AMI figures and income limits.
+
+    Lookups are plain dictionary hits so the compliance pipeline never issues
+    per-row queries. Areas or household sizes that were not published fall
+    back to an estimate derived from the area (or default) median income.
+    """
+
+    __slots__ = ("version", "default_median", "_medians", "_limits")
+
+    def __init__(
+        self,
+        version: int,
+        medians: Dict[str, float],
+        limits: Dict[LimitKey, float],
+        *,
+        default_median: float = DEFAULT_AREA_MEDIAN_INCOME,
+    ) -> None:
+        self.version = version
+        self.default_median = default_median
+        self._medians = medians
+        self._limits = limits
+
+    @classmethod
+    def flat(cls, median_income: float = DEFAULT_AREA_MEDIAN_INCOME) -> "IncomeLimitTable":
+        """Table that applies one median income to every property."""
+
+        return cls(0, {}, {}, default_median=median_income)
+
+    def __len__(self) -> int:
+        return len(self._limits)
+
+    def median_for(self, area_code: Optional[str]) -> float:
+        if area_code is None:
+            return self.default_median
+        return self._medians.get(area_code, self.default_median)
+
+    def limit_for(self, area_code: Optional[str], ami_percent: int, household_size: int) -> float:
+        if area_code is not None:
+            published = self._limits.get((area_code, ami_percent, household_size))
+            if published is not None:
+                return published
+        return estimated_limit(self.median_for(area_code), ami_percent, household_size)
+
+
+def load_income_limits(session: Session) -> IncomeLimitTable:
+    """Read every published area and limit into a fresh table."""
+
+    medians = {
+        area_code: median
+        for area_code, median in session.exec(
+            select(models.AreaMedianIncome.area_code, models.AreaMedianIncome.median_income)
+        ).all()
+    }
+    limits = {
+        (area_code, percent, size): amount
+        for area_code, percent, size, amount in session.exec(
+            select(
+                models.IncomeLimit.area_code,
+                models.IncomeLimit.ami_percent,
+                models.IncomeLimit.household_size,
+                models.IncomeLimit.amount,
+            )
+        ).all()
+    }
+    return IncomeLimitTable(next(_versions), medians, limits)
+
+
+def get_income_limits(session: Session) -> IncomeLimitTable:
+    """Return the cached table for the session's database, loading it once.
+
+    Replica sessions share the primary's table, which is loaded from the
+    primary so a lagging replica cannot cache limits that were replaced.
+    """
+
+    bind = db.primary_bind(session)
+    table = _tables.get(bind)
+    if table is None:
+        if bind is session.get_bind():
+            table = load_income_limits(session)
+        else:
+            with Session(bind) as primary:
+                table = load_income_limits(primary)
+        _tables[bind] = table
+    return table
+
+
+def invalidate_income_limits(session: Session) -> None:
+    """Drop the cached table so the next lookup reloads it."""
+
+    _tables.pop(db.primary_bind(session), None)
+
+
+def parse_hud_csv(
+    stream: TextIO,
+) -> Tuple[List[models.AreaMedianIncome], List[models.IncomeLimit]]:
+    """Parse a HUD-style income limits file.
+
+    Expects one row per area with an area code column (``area_code`` or
+    ``fips``), an optional name column, a ``median*`` column, and limit
+    columns named ``l<percent>_<size>`` (``eli_<size>`` for 30% AMI).
+    """
+
+    reader = csv.DictReader(stream)
+    headers = {name.strip().lower(): name for name in reader.fieldnames or []}
+    area_column = next((headers[c] for c in _AREA_COLUMNS if c in headers), None)
+    if area_column is None:
+        raise ValueError("Income limit file is missing an area code column")
+    name_column = next((headers[c] for c in _NAME_COLUMNS if c in headers), None)
+    median_column = next(
+        (original for lowered, original in headers.items() if lowered.startswith("median")),
+        None,
+    )
+    if median_column is None:
+        raise ValueError("Income limit file is missing a median income column")
+    limit_columns: List[Tuple[str, int, int]] = []
+    for lowered, original in headers.items():
+        match = _LIMIT_COLUMN.match(lowered)
+        if match is None:
+            continue
+        percent = (
+            _EXTREMELY_LOW_INCOME_PERCENT if match.group("eli") else int(match.group("percent"))
+        )
+        limit_columns.append((original, percent, int(match.group("size"))))
+
+    areas: List[models.AreaMedianIncome] = []
+    limits: List[models.IncomeLimit] = []
+    seen: Dict[str, int] = {}
+    for line_number, row in enumerate(reader, start=2):
+        area_code = (row.get(area_column) or "").strip()
+        if not area_code:
+            raise ValueError(f"Missing area code on line {line_number}")
+        if area_code in seen:
+            raise ValueError(
+                f"Duplicate area code {area_code!r} on line {line_number}"
+                f" (first on line {seen[area_code]})"
+            )
+        seen[area_code] = line_number
+        area_name = (row.get(name_column) or "").strip() if name_column else ""
+        areas.append(
+            models.AreaMedianIncome(
+                area_code=area_code,
+                area_name=area_name or None,
+                median_income=_parse_amount(row.get(median_column) or "", line_number),
+            )
+        )
+        for column, percent, size in limit_columns:
+            raw = (row.get(column) or "").strip()
+            if not raw:
+                continue
+            limits.append(
+                models.IncomeLimit(
+                    area_code=area_code,
+                    ami_percent=percent,
+                    household_size=size,
+                    amount=_parse_amount(raw, line_number),
+                )
+            )
+    return areas, limits
+
+
+def import_hud_csv(session: Session, stream: TextIO) -> IncomeLimitTable:
+    """Replace the published figures for every area in the file and reload."""
+
+    areas, limits = parse_hud_csv(stream)
+    replace_income_limits(session, areas, limits)
+    return get_income_limits(session)
+
+
+def replace_income_limits(
+    session: Session,
+    areas: Iterable[models.AreaMedianIncome],
+    limits: Iterable[models.IncomeLimit],
+) -> None:
+    """Bulk replace areas and limits in one transaction, then invalidate."""
+
+    areas = list(areas)
+    codes = {area.area_code for area in areas}
+    if codes:
+        session.exec(delete(models.IncomeLimit).where(models.IncomeLimit.area_code.in_(codes)))
+        session.exec(
+            delete(models.AreaMedianIncome).where(models.AreaMedianIncome.area_code.in_(codes))
+        )
+    session.add_all(areas)
+    session.add_all(list(limits))
+    session.commit()
+    invalidate_income_limits(session)
+
+
+def _parse_amount(raw: str, line_number: int) -> float:
+    try:
+        return float(raw.replace(",", "").replace("$", "").strip())
+    except ValueError as exc:
+        raise ValueError(f"Invalid amount {raw!r} on line {line_number}") from exc
@@ -0,0 +1,343 @@
+"""Background execution of long-running report calls."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Type
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import delete, or_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import Session, select
+
+from .. import db, models
+from . import archive, compliance, financials, occupancy_history
+from .snapshot import get_snapshot
+
+ACTIVE_STATUSES = ("pending", "running")
+
+
+class ComplianceIssuesParams(BaseModel):
+    include_events: bool = True
+
+
+class PropertyParams(BaseModel):
+    property_id: Optional[int] = None
+
+
+class ReportWindowParams(BaseModel):
+    property_id: Optional[int] = None
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+
+class ArchiveParams(BaseModel):
+    through_year: Optional[int] = None
+    resolved_months: int = 12
+
+
+class SnapshotParams(BaseModel):
+    # Snapshots describe current state, so there is no date to pass.
+    class Config:
+        extra = "forbid"
+
+
+class JobKind(NamedTuple):
+    params: Type[BaseModel]
+    run: Callable[[Session, Any], Any]
+
+
+JOB_KINDS: Dict[str, JobKind] = {
+    "compliance-issues": JobKind(
+        ComplianceIssuesParams,
+        lambda session, p: compliance.portfolio_issues(
+            session, include_events=p.include_events, snapshot=get_snapshot(session)
+        ),
+    ),
+    "occupancy": JobKind(
+        PropertyParams,
+        lambda session, p: financials.occupancy_reports(
+            session, p.property_id, snapshot=get_snapshot(session)
+        ),
+    ),
+    "rent": JobKind(
+        PropertyParams,
+        lambda session, p: financials.rent_projection(
+            session, p.property_id, snapshot=get_snapshot(session)
+        ),
+    ),
+    "operating-summary": JobKind(
+        ReportWindowParams,
+        lambda session, p: financials.operating_summary(
+            session, property_id=p.property_id, start=p.start, end=p.end
+        ),
+    ),
+    "noi": JobKind(
+        ReportWindowParams,
+        lambda session, p: financials.noi_report(
+            session, property_id=p.property_id, start=p.start, end=p.end
+        ),
+    ),
+    "occupancy-snapshot": JobKind(
+        SnapshotParams,
+        lambda session, p: occupancy_history.take_snapshot(session),
+    ),
+    "archive": JobKind(
+        ArchiveParams,
+        lambda session, p: archive.archive_closed_periods(
+            session, through_year=p.through_year, resolved_months=p.resolved_months
+        ),
+    ),
+}
+
+
+def params_key(kind: str, params: BaseModel) -> str:
+    """Stable fingerprint of a job kind and its validated parameters."""
+
+    canonical = json.dumps(jsonable_encoder(params), sort_keys=True)
+    return hashlib.sha256(f"{kind}:{canonical}".encode()).hexdigest()
+
+
+def purge_expired(session: Session, now: Optional[datetime] = None) -> int:
+    """Delete finished jobs whose results have outlived their TTL."""
+
+    now = now or datetime.utcnow()
+    result = session.exec(delete(models.ReportJob).where(models.ReportJob.expires_at < now))
+    session.commit()
+    return result.rowcount
+
+
+def fail_jobs(
+    session: Session,
+    error: str,
+    result_ttl: timedelta,
+    job_ids: Optional[Iterable[str]] = None,
+    *,
+    stale_before: Optional[datetime] = None,
+) -> int:
+    """Mark pending or running jobs as failed.
+
+    ``job_ids`` limits this to those jobs, and ``stale_before`` to jobs whose
+    owner has not sent a heartbeat since then.
+    """
+
+    now = datetime.utcnow()
+    job = models.ReportJob
+    statement = update(job).where(job.status.in_(ACTIVE_STATUSES))
+    if job_ids is not None:
+        statement = statement.where(job.id.in_(list(job_ids)))
+    if stale_before is not None:
+        statement = statement.where(
+            or_(job.heartbeat_at.is_(None), job.heartbeat_at < stale_before)
+        )
+    result = session.exec(
+        statement.values(status="failed", error=error, finished_at=now, expires_at=now + result_ttl)
+    )
+    session.commit()
+    return result.rowcount
+
+
+class JobQueue:
+    """Runs report jobs on a thread pool and persists results in ``ReportJob``.
+
+    A submission whose kind and parameters match a pending or running job
+    returns that job instead of queueing a duplicate; a partial unique index
+    on ``params_key`` enforces this across processes. Jobs against
+    in-memory SQLite databases run inline because their connection cannot
+    be shared.
+
+    Each queue stamps the jobs it owns with a heartbeat every
+    ``heartbeat_interval``. A job whose heartbeat is older than
+    ``stale_after`` belongs to a process that stopped, and is failed by
+    ``recover`` (at startup, on submit and when polled), so it cannot hold
+    a duplicate submission forever. Jobs still queued at ``shutdown`` are
+    failed there.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        result_ttl: timedelta = timedelta(hours=24),
+        *,
+        heartbeat_interval: timedelta = timedelta(seconds=15),
+        stale_after: timedelta = timedelta(seconds=60),
+    ) -> None:
+        self.result_ttl = result_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+        self._futures: Dict[str, Tuple[Future, Engine]] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def recover(self, session: Session, job_ids: Optional[Iterable[str]] = None) -> int:
+        """Fail active jobs (or ``job_ids``) whose owner stopped sending heartbeats."""
+
+        return fail_jobs(
+            session,
+            "Worker stopped before finishing",
+            self.result_ttl,
+            job_ids,
+            stale_before=datetime.utcnow() - self.stale_after,
+        )
+
+    def refresh(self, session: Session, job: models.ReportJob) -> models.ReportJob:
+        """``job``, failed first if it is active but its owner has gone."""
+
+        if job.status in ACTIVE_STATUSES and self.recover(session, [job.id]):
+            session.refresh(job)
+        return job
+
+    def submit(self, session: Session, kind: str, raw_params: Dict[str, Any]) -> models.ReportJob:
+        if kind not in JOB_KINDS:
+            raise KeyError(kind)
+        params = JOB_KINDS[kind].params.parse_obj(raw_params)
+        key = params_key(kind, params)
+        purge_expired(session)
+        self.recover(session)
+        job, created = self._claim(session, kind, key, params)
+        if not created:
+            return job
+
+        bind = session.get_bind()
+        if db.is_in_memory(bind.url):
+            self._run(bind, job.id)
+            session.refresh(job)
+        else:
+            future = self._executor.submit(self._run, bind, job.id)
+            with self._lock:
+                self._futures[job.id] = (future, bind)
+                self._start_heartbeat()
+            future.add_done_callback(lambda _, job_id=job.id: self._forget(job_id))
+        return job
+
+    def _claim(
+        self, session: Session, kind: str, key: str, params: BaseModel
+    ) -> Tuple[models.ReportJob, bool]:
+        """Insert a job for ``key``, or find the active one; and whether it is new."""
+
+        while True:
+            now = datetime.utcnow()
+            job = models.ReportJob(
+                id=uuid.uuid4().hex,
+                kind=kind,
+                params_key=key,
+                parameters=params.json(),
+                submitted_at=now,
+                owner=self.owner,
+                heartbeat_at=now,
+            )
+            session.add(job)
+            try:
+                session.commit()
+            except IntegrityError as exc:
+                session.rollback()
+                if not db.is_unique_violation(exc):
+                    raise
+            else:
+                session.refresh(job)
+                return job, True
+            existing = session.exec(
+                select(models.ReportJob)
+                .where(models.ReportJob.params_key == key)
+                .where(models.ReportJob.status.in_(ACTIVE_STATUSES))
+            ).first()
+            if existing is not None:
+                return existing, False
+            # The active job finished between the insert and the lookup.
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            entry = self._futures.get(job_id)
+        if entry is not None:
+            entry[0].result(timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            queued = dict(self._futures)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._stopping.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        cancelled: Dict[Engine, list] = {}
+        for job_id, (future, bind) in queued.items():
+            if future.cancelled():
+                cancelled.setdefault(bind, []).append(job_id)
+        for bind, job_ids in cancelled.items():
+            with Session(bind) as session:
+                fail_jobs(session, "Cancelled at shutdown", self.result_ttl, job_ids)
+
+    def beat(self) -> None:
+        """Refresh the heartbeat of every active job this queue owns."""
+
+        with self._lock:
+            binds = {bind for _, bind in self._futures.values()}
+        for bind in binds:
+            try:
+                with Session(bind) as session:
+                    session.exec(
+                        update(models.ReportJob)
+                        .where(models.ReportJob.owner == self.owner)
+                        .where(models.ReportJob.status.in_(ACTIVE_STATUSES))
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+                    session.commit()
+            except OperationalError:
+                pass  # e.g. a busy SQLite writer; the next beat retries
+
+    def _start_heartbeat(self) -> None:
+        # Called with ``_lock`` held.
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(
+                target=self._beat_until_stopped, name="report-job-heartbeat", daemon=True
+            )
+            self._heartbeat.start()
+
+    def _beat_until_stopped(self) -> None:
+        while not self._stopping.wait(self.heartbeat_interval.total_seconds()):
+            self.beat()
+
+    def _run(self, bind: Engine, job_id: str) -> None:
+        # Both transitions are conditional, so a job that ``recover`` failed
+        # in the meantime keeps its failure.
+        owned = (models.ReportJob.id == job_id, models.ReportJob.owner == self.owner)
+        with db.session_scope(bind) as session:
+            started = session.exec(
+                update(models.ReportJob)
+                .where(*owned, models.ReportJob.status == "pending")
+                .values(status="running", started_at=datetime.utcnow())
+            )
+            session.commit()
+            if not started.rowcount:
+                return
+            job = session.get(models.ReportJob, job_id)
+            kind = JOB_KINDS[job.kind]
+            outcome: Dict[str, Any]
+            try:
+                result = kind.run(session, kind.params.parse_raw(job.parameters))
+            except Exception as exc:  # persisted for the polling client
+                session.rollback()
+                outcome = {"status": "failed", "error": f"{type(exc).__name__}: {exc}"}
+            else:
+                outcome = {"status": "completed", "result": json.dumps(jsonable_encoder(result))}
+            finished_at = datetime.utcnow()
+            session.exec(
+                update(models.ReportJob)
+                .where(*owned, models.ReportJob.status == "running")
+                .values(finished_at=finished_at, expires_at=finished_at + self.result_ttl, **outcome)
+            )
+
+    def _forget(self, job_id: str) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
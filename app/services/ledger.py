@@ -0,0 +1,261 @@
+"""Running balances over the append-only transaction ledger.
+
+``FinancialTransaction`` rows are only ever inserted. Each insert also
+posts into ``LedgerBalance``, which holds the day's total and the running
+balance per property and category, inside the same database transaction.
+A window total is then ``balance(end) - balance(start - 1 day)``: two
+indexed point lookups per category regardless of history depth.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, delete, func, update
+from sqlmodel import Session, select
+
+from .. import models, schemas
+from . import archive
+
+BalanceKey = Tuple[int, str]
+TOLERANCE = 0.005
+
+
+def post_transactions(
+    session: Session, transactions: Iterable[models.FinancialTransaction]
+) -> None:
+    """Fold new transactions into the running balances (caller commits)."""
+
+    deltas: Dict[Tuple[int, str, date], float] = defaultdict(float)
+    for transaction in transactions:
+        key = (transaction.property_id, transaction.category, transaction.transaction_date)
+        deltas[key] += transaction.amount
+    for (property_id, category, posted_on), delta in sorted(deltas.items()):
+        _post(session, property_id, category, posted_on, delta)
+
+
+def _post(session: Session, property_id: int, category: str, posted_on: date, delta: float) -> None:
+    same_account = (
+        models.LedgerBalance.property_id == property_id,
+        models.LedgerBalance.category == category,
+    )
+    # Write before reading so the database write lock is held while the
+    # running balance for a new day is derived from the previous one.
+    session.exec(
+        update(models.LedgerBalance)
+        .where(*same_account, models.LedgerBalance.balance_date >= posted_on)
+        .values(cumulative_amount=models.LedgerBalance.cumulative_amount + delta)
+    )
+    updated = session.exec(
+        update(models.LedgerBalance)
+        .where(*same_account, models.LedgerBalance.balance_date == posted_on)
+        .values(amount=models.LedgerBalance.amount + delta)
+    )
+    if updated.rowcount:
+        return
+    previous = session.exec(
+        select(models.LedgerBalance.cumulative_amount)
+        .where(*same_account, models.LedgerBalance.balance_date < posted_on)
+        .order_by(models.LedgerBalance.balance_date.desc())
+        .limit(1)
+    ).first()
+    session.add(
+        models.LedgerBalance(
+            property_id=property_id,
+            category=category,
+            balance_date=posted_on,
+            amount=delta,
+            cumulative_amount=(previous or 0.0) + delta,
+        )
+    )
+
+
+def balances_as_of(
+    session: Session,
+    as_of: Optional[date],
+    *,
+    property_id: Optional[int] = None,
+    property_ids: Optional[Sequence[int]] = None,
+) -> Dict[BalanceKey, Tuple[date, float]]:
+    """Latest running balance on or before ``as_of`` for each property and category.
+
+    The (property, category) keys are walked with a recursive CTE that
+    seeks to the next key on the unique ``(property_id, category,
+    balance_date)`` index, and each key's balance is one more seek on it,
+    so the cost follows the number of accounts rather than history depth.
+    """
+
+    balance = models.LedgerBalance
+    scope = []
+    if property_id is not None:
+        scope.append(balance.property_id == property_id)
+    if property_ids is not None:
+        scope.append(balance.property_id.in_(property_ids))
+
+    def first_category(owner):
+        return select(func.min(balance.category)).where(balance.property_id == owner).scalar_subquery()
+
+    first_property = select(func.min(balance.property_id)).where(*scope).scalar_subquery()
+    keys = select(
+        first_property.label("property_id"), first_category(first_property).label("category")
+    ).cte("ledger_keys", recursive=True)
+    next_category = (
+        select(func.min(balance.category))
+        .where(balance.property_id == keys.c.property_id, balance.category > keys.c.category)
+        .correlate(keys)
+        .scalar_subquery()
+    )
+    next_property = (
+        select(func.min(balance.property_id))
+        .where(*scope, balance.property_id > keys.c.property_id)
+        .correlate(keys)
+        .scalar_subquery()
+    )
+    keys = keys.union_all(
+        select(
+            case((next_category.is_not(None), keys.c.property_id), else_=next_property),
+            func.coalesce(next_category, first_category(next_property)),
+        ).where(keys.c.property_id.is_not(None))
+    )
+
+    latest = select(balance.id).where(
+        balance.property_id == keys.c.property_id, balance.category == keys.c.category
+    )
+    if as_of is not None:
+        latest = latest.where(balance.balance_date <= as_of)
+    latest = latest.order_by(balance.balance_date.desc()).limit(1).scalar_subquery()
+    statement = select(
+        balance.property_id, balance.category, balance.balance_date, balance.cumulative_amount
+    ).where(balance.id.in_(select(latest).where(keys.c.property_id.is_not(None))))
+    return {
+        (owner, category): (balance_date, cumulative)
+        for owner, category, balance_date, cumulative in session.exec(statement).all()
+    }
+
+
+def window_totals(
+    session: Session,
+    *,
+    property_id: Optional[int] = None,
+    property_ids: Optional[Sequence[int]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Dict[str, float]:
+    """Category totals for transactions dated within ``[start, end]``.
+
+    Totals are rounded to cents: a difference of two running balances
+    carries float noise that a direct sum of the same amounts would not.
+    """
+
+    closing = balances_as_of(session, end, property_id=property_id, property_ids=property_ids)
+    opening: Dict[BalanceKey, Tuple[date, float]] = {}
+    if start is not None:
+        opening = balances_as_of(
+            session,
+            start - timedelta(days=1),
+            property_id=property_id,
+            property_ids=property_ids,
+        )
+    totals: Dict[str, float] = defaultdict(float)
+    for key, (last_posted, cumulative) in closing.items():
+        if start is not None and last_posted < start:
+            continue
+        opening_balance = opening.get(key, (None, 0.0))[1]
+        totals[key[1]] += cumulative - opening_balance
+    return {category: round(amount, 2) for category, amount in totals.items()}
+
+
+def _expected_rows(session: Session) -> Dict[Tuple[int, str, date], Tuple[float, float]]:
+    """Re-derive day totals and running balances from the raw transactions."""
+
+    # Archived years still have balance rows, so they are re-derived too.
+    transaction = archive.all_rows("transactions")
+    statement = (
+        select(
+            transaction.property_id,
+            transaction.category,
+            transaction.transaction_date,
+            func.sum(transaction.amount),
+        )
+        .group_by(transaction.property_id, transaction.category, transaction.transaction_date)
+        .order_by(transaction.property_id, transaction.category, transaction.transaction_date)
+    )
+    expected: Dict[Tuple[int, str, date], Tuple[float, float]] = {}
+    running: Dict[BalanceKey, float] = defaultdict(float)
+    for owner, category, posted_on, amount in session.exec(statement).all():
+        running[(owner, category)] += amount
+        expected[(owner, category, posted_on)] = (amount, running[(owner, category)])
+    return expected
+
+
+def verify_ledger(session: Session) -> schemas.LedgerVerification:
+    """Compare stored balances against balances re-derived from transactions."""
+
+    expected = _expected_rows(session)
+    recorded = {
+        (row.property_id, row.category, row.balance_date): (row.amount, row.cumulative_amount)
+        for row in session.exec(select(models.LedgerBalance)).all()
+    }
+    discrepancies: List[schemas.LedgerDiscrepancy] = []
+    for key in sorted(set(expected) | set(recorded)):
+        expected_amount, expected_cumulative = expected.get(key, (0.0, None))
+        recorded_amount, recorded_cumulative = recorded.get(key, (None, None))
+        if (
+            expected_cumulative is not None
+            and recorded_amount is not None
+            and abs(recorded_amount - expected_amount) <= TOLERANCE
+            and abs(recorded_cumulative - expected_cumulative) <= TOLERANCE
+        ):
+            continue
+        discrepancies.append(
+            schemas.LedgerDiscrepancy(
+                property_id=key[0],
+                category=key[1],
+                balance_date=key[2],
+                expected_amount=expected_amount,
+                expected_cumulative=expected_cumulative,
+                recorded_amount=recorded_amount,
+                recorded_cumulative=recorded_cumulative,
+            )
+        )
+    return schemas.LedgerVerification(
+        balanced=not discrepancies,
+        checked_rows=len(recorded),
+        discrepancies=discrepancies,
+    )
+
+
+def rebuild_ledger(session: Session) -> int:
+    """Replace every balance row with one re-derived from transactions."""
+
+    session.exec(delete(models.LedgerBalance))
+    rows = [
+        models.LedgerBalance(
+            property_id=owner,
+            category=category,
+            balance_date=posted_on,
+            amount=amount,
+            cumulative_amount=cumulative,
+        )
+        for (owner, category, posted_on), (amount, cumulative) in _expected_rows(session).items()
+    ]
+    session.add_all(rows)
+    session.commit()
+    return len(rows)
+
+
+def backfill_ledger(session: Session) -> int:
+    """Rebuild balances when there are none yet but transactions exist.
+
+    Covers databases created before the ledger, whose reports would
+    otherwise read as empty. Returns the number of rows written.
+    """
+
+    if session.exec(select(models.LedgerBalance.id).limit(1)).first() is not None:
+        return 0
+    transaction = archive.all_rows("transactions")
+    if session.exec(select(transaction.id).limit(1)).first() is None:
+        return 0
+    return rebuild_ledger(session)
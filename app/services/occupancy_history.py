@@ -0,0 +1,114 @@
+"""Daily occupancy snapshots and the history served from them.
+
+``Unit.status`` and household moves overwrite the current state, so the
+only way to chart occupancy over time is to record it. The snapshot job
+writes one ``OccupancySnapshot`` row per property for today from a single
+grouped query. Re-running it the same day updates that day's rows. It
+only reads current state, so it cannot backfill earlier dates.
+History reads are a range scan of the ``(property_id, snapshot_date)``
+index.
+"""
+
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, case, distinct, func
+from sqlmodel import Session, select
+
+from .. import crud, models
+
+
+def snapshot_rows(session: Session, snapshot_date: date) -> List[Dict[str, Any]]:
+    """One snapshot row per property, from units grouped by property and bedroom count."""
+
+    occupied = select(distinct(models.Household.unit_id).label("unit_id")).subquery()
+    ami = case(
+        (and_(occupied.c.unit_id.is_not(None), models.Unit.ami_percent != 0), models.Unit.ami_percent)
+    )
+    statement = (
+        select(
+            models.Property.id,
+            models.Unit.bedrooms,
+            func.count(models.Unit.id),
+            func.count(occupied.c.unit_id),
+            func.sum(ami),
+            func.count(ami),
+        )
+        .outerjoin(models.Unit, models.Unit.property_id == models.Property.id)
+        .outerjoin(occupied, occupied.c.unit_id == models.Unit.id)
+        .group_by(models.Property.id, models.Unit.bedrooms)
+        .order_by(models.Property.id, models.Unit.bedrooms)
+    )
+    totals: Dict[int, List[int]] = defaultdict(lambda: [0, 0, 0, 0])
+    vacant: Dict[int, Dict[str, int]] = defaultdict(dict)
+    for property_id, bedrooms, units, occupied_units, ami_sum, ami_count in session.exec(statement):
+        total = totals[property_id]
+        total[0] += units
+        total[1] += occupied_units
+        total[2] += ami_sum or 0
+        total[3] += ami_count
+        if bedrooms is not None:
+            vacant[property_id][str(bedrooms)] = units - occupied_units
+    return [
+        {
+            "property_id": property_id,
+            "snapshot_date": snapshot_date,
+            "total_units": units,
+            "occupied_units": occupied_units,
+            "vacant_by_bedroom": json.dumps(vacant[property_id], separators=(",", ":")),
+            "ami_average": ami_sum / ami_count if ami_count else None,
+        }
+        for property_id, (units, occupied_units, ami_sum, ami_count) in totals.items()
+    ]
+
+
+def take_snapshot(session: Session) -> int:
+    """Record today's occupancy for every property."""
+
+    rows = snapshot_rows(session, date.today())
+    crud.upsert(session, models.OccupancySnapshot, rows, ("property_id", "snapshot_date"))
+    return len(rows)
+
+
+def history(
+    session: Session,
+    property_ids: Optional[Sequence[int]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """Snapshot series ordered by property and date."""
+
+    snapshot = models.OccupancySnapshot
+    statement = select(
+        snapshot.property_id,
+        snapshot.snapshot_date,
+        snapshot.total_units,
+        snapshot.occupied_units,
+        snapshot.vacant_by_bedroom,
+        snapshot.ami_average,
+    )
+    if property_ids:
+        statement = statement.where(snapshot.property_id.in_(property_ids))
+    if start is not None:
+        statement = statement.where(snapshot.snapshot_date >= start)
+    if end is not None:
+        statement = statement.where(snapshot.snapshot_date <= end)
+    statement = statement.order_by(snapshot.property_id, snapshot.snapshot_date)
+    return [
+        {
+            "property_id": row.property_id,
+            "snapshot_date": row.snapshot_date,
+            "total_units": row.total_units,
+            "occupied_units": row.occupied_units,
+            "occupancy_rate": (
+                round(row.occupied_units / row.total_units * 100, 2) if row.total_units else 0
+            ),
+            "vacant_by_bedroom": json.loads(row.vacant_by_bedroom),
+            "ami_average": row.ami_average,
+        }
+        for row in session.exec(statement)
+    ]
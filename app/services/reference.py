@@ -0,0 +1,132 @@
+"""Process-wide cache of slowly changing reference data."""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Type
+from weakref import WeakKeyDictionary
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, select
+
+from .. import crud, db, models
+
+
+class ReferenceCache:
+    """Property and program ids and names, and property codes, for one database.
+
+    Id misses fall through to a primary-key lookup, so rows created by
+    another process are picked up on first use; crud writes are applied
+    directly. Property codes are only checked against the cache, since the
+    unique index on ``Property.code`` rejects anything it has not seen.
+
+    Entries for known ids are never reloaded, so a rename or code change
+    made by another process is not seen here until restart. A stale name
+    only affects labels such as program names on compliance issues. A
+    code freed elsewhere still reads as taken. Run writers that rename
+    properties or programs in the serving process.
+    """
+
+    def __init__(
+        self,
+        property_names: Dict[int, str],
+        property_codes: Dict[str, int],
+        program_names: Dict[int, str],
+    ) -> None:
+        self._names: Dict[Type[SQLModel], Dict[int, str]] = {
+            models.Property: property_names,
+            models.Program: program_names,
+        }
+        self._property_codes = property_codes
+        self._code_of = {owner: code for code, owner in property_codes.items()}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, session: Session) -> "ReferenceCache":
+        properties = session.exec(
+            select(models.Property.id, models.Property.name, models.Property.code)
+        ).all()
+        programs = session.exec(select(models.Program.id, models.Program.name)).all()
+        return cls(
+            {id_: name for id_, name, _ in properties},
+            {code: id_ for id_, _, code in properties},
+            dict(programs),
+        )
+
+    def name(self, session: Session, model: Type[SQLModel], id_: int) -> Optional[str]:
+        names = self._names[model]
+        if id_ not in names:
+            row = session.get(model, id_)
+            if row is None:
+                return None
+            self.apply(row)
+        return names[id_]
+
+    def exists(self, session: Session, model: Type[SQLModel], id_: int) -> bool:
+        return self.name(session, model, id_) is not None
+
+    def missing(self, session: Session, model: Type[SQLModel], ids: Iterable[int]) -> List[int]:
+        """Ids from ``ids`` with no ``model`` row, in ascending order."""
+
+        unknown = set(ids) - self._names[model].keys()
+        return crud.missing_ids(session, model, unknown) if unknown else []
+
+    def property_exists(self, session: Session, property_id: int) -> bool:
+        return self.exists(session, models.Property, property_id)
+
+    def program_exists(self, session: Session, program_id: int) -> bool:
+        return self.exists(session, models.Program, program_id)
+
+    def program_name(self, session: Session, program_id: int) -> Optional[str]:
+        return self.name(session, models.Program, program_id)
+
+    def property_code_exists(self, code: str) -> bool:
+        return code in self._property_codes
+
+    def apply(self, instance: SQLModel) -> None:
+        if isinstance(instance, models.Property):
+            with self._lock:
+                self._names[models.Property][instance.id] = instance.name
+                previous = self._code_of.get(instance.id)
+                if previous is not None and previous != instance.code:
+                    self._property_codes.pop(previous, None)
+                self._property_codes[instance.code] = instance.id
+                self._code_of[instance.id] = instance.code
+        elif isinstance(instance, models.Program):
+            with self._lock:
+                self._names[models.Program][instance.id] = instance.name
+
+
+_caches: "WeakKeyDictionary[Engine, ReferenceCache]" = WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def get_reference_cache(session: Session) -> ReferenceCache:
+    """Cache for the session's database, warmed on first use.
+
+    Replica sessions share the primary's cache, loaded from the primary, so
+    crud writes keep it current for both.
+    """
+
+    bind = db.primary_bind(session)
+    cache = _caches.get(bind)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(bind)
+            if cache is None:
+                if bind is session.get_bind():
+                    cache = ReferenceCache.load(session)
+                else:
+                    with Session(bind) as primary:
+                        cache = ReferenceCache.load(primary)
+                _caches[bind] = cache
+    return cache
+
+
+def _apply_write(session: Session, instance: SQLModel) -> None:
+    cache = _caches.get(db.primary_bind(session))
+    if cache is not None:
+        cache.apply(instance)
+
+
+crud.register_write_hook(_apply_write)
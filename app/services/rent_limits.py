@@ -0,0 +1,165 @@
+"""Maximum gross rents by program, income-limit area and bedroom count.
+
+Tax-credit style rent limits are 30% of the income limit at the program's
+``rent_limit_percent`` for the household size imputed from the unit: one
+person for an efficiency, 1.5 per bedroom otherwise (a half person averages
+the two neighbouring limits), divided by twelve. A certification violates
+the limit when ``tenant_rent + utility_allowance`` exceeds it.
+
+The few distinct (program, area, bedrooms) combinations are priced once
+into a table; violations are then found with one SQL join against that
+table, or by dictionary lookups inside the rule engine's single pass.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Float, Integer, String, and_, column, values
+from sqlmodel import Session, select
+
+from .. import models, schemas
+from .income_limits import IncomeLimitTable
+
+RENT_SHARE = 0.30
+
+RentKey = Tuple[int, Optional[str], int]
+
+
+def imputed_household_size(bedrooms: int) -> float:
+    return 1.0 if bedrooms <= 0 else 1.5 * bedrooms
+
+
+def max_gross_rent(
+    income_limits: IncomeLimitTable, area_code: Optional[str], rent_limit_percent: int, bedrooms: int
+) -> float:
+    size = imputed_household_size(bedrooms)
+    low, high = math.floor(size), math.ceil(size)
+    income = (
+        income_limits.limit_for(area_code, rent_limit_percent, low)
+        + income_limits.limit_for(area_code, rent_limit_percent, high)
+    ) / 2
+    return round(income * RENT_SHARE / 12, 2)
+
+
+class MaxRentTable:
+    """Memoized max gross rent per (program, area, bedrooms)."""
+
+    __slots__ = ("income_limits", "_rents")
+
+    def __init__(self, income_limits: IncomeLimitTable) -> None:
+        self.income_limits = income_limits
+        self._rents: Dict[Tuple[int, Optional[str], int], float] = {}
+
+    def __len__(self) -> int:
+        return len(self._rents)
+
+    def items(self):
+        return self._rents.items()
+
+    def max_for(self, rent_limit_percent: int, area_code: Optional[str], bedrooms: int) -> float:
+        key = (rent_limit_percent, area_code, bedrooms)
+        rent = self._rents.get(key)
+        if rent is None:
+            rent = self._rents[key] = max_gross_rent(
+                self.income_limits, area_code, rent_limit_percent, bedrooms
+            )
+        return rent
+
+
+def _certification_scope(statement, property_ids: Optional[Sequence[int]]):
+    statement = (
+        statement.join(models.Household, models.Household.id == models.Certification.household_id)
+        .join(models.Program, models.Program.id == models.Certification.program_id)
+        .join(models.Unit, models.Unit.id == models.Household.unit_id)
+        .join(models.Property, models.Property.id == models.Unit.property_id)
+        .where(models.Certification.status == "Active")
+        .where(models.Program.rent_limit_percent.is_not(None))
+    )
+    if property_ids is not None:
+        statement = statement.where(models.Property.id.in_(property_ids))
+    return statement
+
+
+def build_max_rent_table(
+    session: Session, income_limits: IncomeLimitTable, property_ids: Optional[Sequence[int]] = None
+) -> Dict[RentKey, float]:
+    """Max gross rent for every (program, area, bedrooms) in use by an active certification."""
+
+    combos = session.execute(
+        _certification_scope(
+            select(models.Program.id, models.Program.rent_limit_percent, models.Property.ami_area, models.Unit.bedrooms)
+            .select_from(models.Certification)
+            .distinct(),
+            property_ids,
+        )
+    ).all()
+    table = MaxRentTable(income_limits)
+    return {
+        (program_id, area, bedrooms): table.max_for(percent, area, bedrooms)
+        for program_id, percent, area, bedrooms in combos
+    }
+
+
+def rent_limit_violations(
+    session: Session, income_limits: IncomeLimitTable, property_ids: Optional[Sequence[int]] = None
+) -> List[schemas.ComplianceIssue]:
+    """Active certifications whose gross rent exceeds the table, found in one join."""
+
+    rents = build_max_rent_table(session, income_limits, property_ids)
+    if not rents:
+        return []
+    limits = (
+        values(
+            column("program_id", Integer),
+            column("area_code", String),
+            column("bedrooms", Integer),
+            column("max_rent", Float),
+            name="max_rent",
+        )
+        .data([(program_id, area, bedrooms, rent) for (program_id, area, bedrooms), rent in rents.items()])
+        .cte("max_rent")
+    )
+    gross = models.Certification.tenant_rent + models.Certification.utility_allowance
+    statement = _certification_scope(
+        select(
+            models.Household.id,
+            models.Household.name,
+            models.Program.name,
+            models.Certification.next_due_date,
+            gross,
+            limits.c.max_rent,
+        ).select_from(models.Certification),
+        property_ids,
+    )
+    statement = (
+        statement.join(
+            limits,
+            and_(
+                limits.c.program_id == models.Program.id,
+                # Null-safe, so properties without an area match the NULL row.
+                limits.c.area_code.is_not_distinct_from(models.Property.ami_area),
+                limits.c.bedrooms == models.Unit.bedrooms,
+            ),
+        )
+        .where(gross > limits.c.max_rent)
+        .order_by(models.Certification.id)
+    )
+    return [
+        schemas.ComplianceIssue(
+            household_id=household_id,
+            household_name=household_name,
+            program_name=program_name,
+            issue=rent_issue(gross_rent, max_rent),
+            severity="High",
+            next_due_date=next_due_date,
+        )
+        for household_id, household_name, program_name, next_due_date, gross_rent, max_rent in session.execute(
+            statement
+        )
+    ]
+
+
+def rent_issue(gross_rent: float, max_rent: float) -> str:
+    return f"Gross rent ${gross_rent:,.0f} exceeds limit ${max_rent:,.0f}"
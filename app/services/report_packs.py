@@ -0,0 +1,334 @@
+"""Monthly report packs computed in parallel across property shards."""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+import threading
+import uuid
+import zipfile
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from .. import db, models, schemas
+from . import financials
+from .compliance import ComplianceService
+from .income_limits import get_income_limits
+
+PACK_FORMATS = ("json", "csv", "parquet")
+
+_worker_engine: Optional[Engine] = None
+
+
+class ShardResult(BaseModel):
+    occupancy: List[schemas.OccupancyReport]
+    rent: List[schemas.RentProjection]
+    operating_summary: Dict[str, float]
+    compliance_issues: List[schemas.ComplianceIssue]
+
+
+def build_shard(
+    bind: Engine,
+    property_ids: Sequence[int],
+    *,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> ShardResult:
+    """Run every report in the pack for one group of properties."""
+
+    property_ids = list(property_ids)
+    with db.session_scope(bind) as session:
+        service = ComplianceService(
+            session,
+            income_limits=get_income_limits(session),
+            property_ids=property_ids,
+        )
+        return ShardResult(
+            occupancy=financials.occupancy_reports(session, property_ids=property_ids),
+            rent=financials.rent_projection(session, property_ids=property_ids),
+            operating_summary=financials.operating_summary(
+                session, property_ids=property_ids, start=start, end=end
+            ),
+            compliance_issues=service.consolidate_issues(),
+        )
+
+
+def merge_shards(
+    results: Sequence[ShardResult],
+    *,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> schemas.ReportPack:
+    """Combine shard results into one pack ordered by property.
+
+    Shard totals are already in cents; their sums are rounded again so float
+    error from adding them does not show in the pack.
+    """
+
+    occupancy: List[schemas.OccupancyReport] = []
+    rent: List[schemas.RentProjection] = []
+    summary: Dict[str, float] = defaultdict(float)
+    issues: List[schemas.ComplianceIssue] = []
+    for result in results:
+        occupancy.extend(result.occupancy)
+        rent.extend(result.rent)
+        for category, amount in result.operating_summary.items():
+            summary[category] += amount
+        issues.extend(result.compliance_issues)
+    occupancy.sort(key=lambda report: report.property_id)
+    rent.sort(key=lambda report: report.property_id)
+    issues.sort(key=lambda issue: (issue.household_id, issue.issue))
+    return schemas.ReportPack(
+        generated_at=datetime.utcnow(),
+        start=start,
+        end=end,
+        property_count=len(occupancy),
+        occupancy=occupancy,
+        rent=rent,
+        operating_summary={category: round(amount, 2) for category, amount in summary.items()},
+        net_operating_income=financials.net_operating_income(summary),
+        compliance_issues=issues,
+    )
+
+
+def shard_property_ids(property_ids: Sequence[int], shard_count: int) -> List[List[int]]:
+    """Deal property ids round-robin so large and small properties spread out."""
+
+    shard_count = max(1, min(shard_count, len(property_ids)))
+    return [list(property_ids[index::shard_count]) for index in range(shard_count)]
+
+
+def _init_worker(database_url: str) -> None:
+    """Process pool initializer giving each worker its own engine."""
+
+    global _worker_engine
+    _worker_engine = db.create_db_engine(database_url)
+
+
+def _build_shard_in_worker(
+    property_ids: List[int], start: Optional[date], end: Optional[date]
+) -> ShardResult:
+    return build_shard(_worker_engine, property_ids, start=start, end=end)
+
+
+class ReportPackJob:
+    """Tracks the shards of one submitted pack and merges them when done."""
+
+    def __init__(
+        self, shard_count: int, *, start: Optional[date], end: Optional[date]
+    ) -> None:
+        self.id = uuid.uuid4().hex
+        self.start = start
+        self.end = end
+        self.shard_count = shard_count
+        self.submitted_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.pack: Optional[schemas.ReportPack] = None
+        self._results: List[Optional[ShardResult]] = [None] * shard_count
+        self._completed = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if shard_count == 0:
+            self._finish()
+
+    @property
+    def status(self) -> str:
+        if self.error is not None:
+            return "failed"
+        if self.pack is not None:
+            return "completed"
+        return "running" if self._completed else "pending"
+
+    def record(self, index: int, future: "Future[ShardResult]") -> None:
+        with self._lock:
+            if self.error is not None:
+                return
+            exc = future.exception()
+            if exc is not None:
+                self.error = f"{type(exc).__name__}: {exc}"
+                self.finished_at = datetime.utcnow()
+                self._done.set()
+                return
+            self._results[index] = future.result()
+            self._completed += 1
+            if self._completed == self.shard_count:
+                self._finish()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def summary(self) -> schemas.ReportPackJobRead:
+        return schemas.ReportPackJobRead(
+            id=self.id,
+            status=self.status,
+            shard_count=self.shard_count,
+            completed_shards=self._completed,
+            submitted_at=self.submitted_at,
+            finished_at=self.finished_at,
+            error=self.error,
+        )
+
+    def _finish(self) -> None:
+        self.pack = merge_shards(
+            [result for result in self._results if result is not None],
+            start=self.start,
+            end=self.end,
+        )
+        self.finished_at = datetime.utcnow()
+        self._done.set()
+
+
+class ReportPackRunner:
+    """Fan report packs out to a process pool, one engine per worker.
+
+    In-memory SQLite databases cannot be opened from another process, so
+    packs against them are built inline in the calling thread. Finished
+    packs are kept for ``result_ttl``; past ``max_jobs`` the oldest finished
+    ones are dropped early. Workers are spawned rather than forked, since
+    forking a threaded server copies whatever locks its threads hold.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        shards_per_worker: int = 2,
+        *,
+        result_ttl: timedelta = timedelta(hours=24),
+        max_jobs: int = 256,
+    ) -> None:
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shards_per_worker = shards_per_worker
+        self.result_ttl = result_ttl
+        self.max_jobs = max_jobs
+        self._pools: Dict[str, ProcessPoolExecutor] = {}
+        self._jobs: "OrderedDict[str, ReportPackJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        bind: Engine,
+        *,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> ReportPackJob:
+        with Session(bind) as session:
+            property_ids = session.exec(
+                select(models.Property.id).order_by(models.Property.id)
+            ).all()
+        shards = shard_property_ids(property_ids, self.max_workers * self.shards_per_worker)
+        job = ReportPackJob(len(shards), start=start, end=end)
+        with self._lock:
+            self._evict(datetime.utcnow())
+            self._jobs[job.id] = job
+
+        if db.is_in_memory(bind.url):
+            for index, shard in enumerate(shards):
+                future: "Future[ShardResult]" = Future()
+                try:
+                    future.set_result(build_shard(bind, shard, start=start, end=end))
+                except Exception as exc:  # surfaced through the job status
+                    future.set_exception(exc)
+                job.record(index, future)
+            return job
+
+        pool = self._pool_for(bind.url.render_as_string(hide_password=False))
+        for index, shard in enumerate(shards):
+            future = pool.submit(_build_shard_in_worker, shard, start, end)
+            future.add_done_callback(lambda done, index=index: job.record(index, done))
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportPackJob]:
+        with self._lock:
+            self._evict(datetime.utcnow())
+            return self._jobs.get(job_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def _evict(self, now: datetime) -> None:
+        """Drop expired packs, then the oldest finished ones beyond ``max_jobs``."""
+
+        finished = [job for job in self._jobs.values() if job.finished_at is not None]
+        excess = len(self._jobs) - self.max_jobs + 1
+        for job in finished:
+            if job.finished_at + self.result_ttl <= now or excess > 0:
+                del self._jobs[job.id]
+                excess -= 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _pool_for(self, database_url: str) -> ProcessPoolExecutor:
+        with self._lock:
+            pool = self._pools.get(database_url)
+            if pool is None:
+                pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(database_url,),
+                )
+                self._pools[database_url] = pool
+            return pool
+
+
+def pack_tables(pack: schemas.ReportPack) -> Dict[str, List[dict]]:
+    """Flatten a pack into named row sets for tabular exports."""
+
+    return {
+        "occupancy": [report.dict() for report in pack.occupancy],
+        "rent": [report.dict() for report in pack.rent],
+        "operating_summary": [
+            {"category": category, "amount": amount}
+            for category, amount in sorted(pack.operating_summary.items())
+        ],
+        "compliance_issues": [issue.dict() for issue in pack.compliance_issues],
+    }
+
+
+def render_pack(pack: schemas.ReportPack, fmt: str = "json") -> Tuple[bytes, str, str]:
+    """Serialize a pack, returning the payload, media type, and file name."""
+
+    if fmt == "json":
+        return pack.json().encode(), "application/json", "report-pack.json"
+    if fmt not in PACK_FORMATS:
+        raise ValueError(f"Unsupported report pack format: {fmt}")
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ValueError("Parquet report packs require pyarrow") from exc
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, rows in pack_tables(pack).items():
+            if fmt == "csv":
+                archive.writestr(f"{name}.csv", _rows_to_csv(rows))
+            else:
+                sink = io.BytesIO()
+                pq.write_table(pa.Table.from_pylist(rows), sink)
+                archive.writestr(f"{name}.parquet", sink.getvalue())
+    return buffer.getvalue(), "application/zip", f"report-pack-{fmt}.zip"
+
+
+def _rows_to_csv(rows: List[dict]) -> str:
+    output = io.StringIO()
+    if rows:
+        writer = csv.DictWriter(output, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return output.getvalue()
@@ -0,0 +1,300 @@
+"""Declarative compliance rules evaluated in one pass over active certifications.
+
+A rule names the columns it reads (``"<entity>.<column>"`` over
+certification, household, program, unit and property) and a check that
+turns one row into an optional ``Finding``. The engine selects the union of
+every rule's columns in a single query, or reads them from the portfolio
+snapshot, and runs all rules on each row, so adding a rule costs a few
+columns rather than another scan. Time spent in each rule is recorded.
+
+Rules registered with ``default=False`` only run when named. A rule may
+also give a SQL ``where`` predicate matching the rows it can flag, which
+the query applies when that rule runs on its own.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from sqlmodel import Session, select
+
+from .. import models, schemas
+from .income_limits import IncomeLimitTable
+from .rent_limits import MaxRentTable, rent_issue
+
+ENTITIES = {
+    "certification": models.Certification,
+    "household": models.Household,
+    "program": models.Program,
+    "unit": models.Unit,
+    "property": models.Property,
+}
+# Every issue needs these, whichever rule raised it.
+BASE_COLUMNS = (
+    "certification.next_due_date",
+    "household.id",
+    "household.name",
+    "program.name",
+)
+FETCH_BATCH = 1000
+
+Row = Mapping[str, Any]
+RowSource = Callable[[Sequence[str]], Iterable[Row]]
+
+
+class Finding(NamedTuple):
+    issue: str
+    severity: str
+
+
+class RuleContext(NamedTuple):
+    today: date
+    recertification_window: int
+    income_limits: IncomeLimitTable
+    max_rents: MaxRentTable
+
+
+class Rule(NamedTuple):
+    name: str
+    columns: Tuple[str, ...]
+    check: Callable[[RuleContext, Row], Optional[Finding]]
+    description: str = ""
+    default: bool = True
+    where: Optional[Callable[[RuleContext], Any]] = None
+
+
+RULES: Dict[str, Rule] = {}
+
+
+def rule(
+    name: str,
+    *columns: str,
+    description: str = "",
+    default: bool = True,
+    where: Optional[Callable[[RuleContext], Any]] = None,
+):
+    """Register ``check(context, row)`` as a rule reading ``columns``."""
+
+    for column in columns:
+        _column(column)
+
+    def register(check: Callable[[RuleContext, Row], Optional[Finding]]):
+        RULES[name] = Rule(
+            name,
+            tuple(columns),
+            check,
+            description or (check.__doc__ or "").strip(),
+            default,
+            where,
+        )
+        return check
+
+    return register
+
+
+def select_rules(names: Optional[Sequence[str]] = None) -> List[Rule]:
+    """The named rules, or every rule that runs by default."""
+
+    if names is None:
+        return [rule_ for rule_ in RULES.values() if rule_.default]
+    unknown = [name for name in names if name not in RULES]
+    if unknown:
+        raise KeyError(", ".join(unknown))
+    return [RULES[name] for name in names]
+
+
+def required_columns(rules: Iterable[Rule]) -> Tuple[str, ...]:
+    columns = dict.fromkeys(BASE_COLUMNS)
+    for rule_ in rules:
+        columns.update(dict.fromkeys(rule_.columns))
+    return tuple(columns)
+
+
+def _column(key: str):
+    entity, _, name = key.partition(".")
+    try:
+        return getattr(ENTITIES[entity], name)
+    except (KeyError, AttributeError):
+        raise ValueError(f"Unknown rule column '{key}'") from None
+
+
+def database_rows(
+    session: Session,
+    columns: Sequence[str],
+    property_ids: Optional[Sequence[int]] = None,
+    *,
+    program_names: Optional[Callable[[int], Optional[str]]] = None,
+    where: Sequence[Any] = (),
+) -> Iterator[Row]:
+    """Active certifications joined to their household, program, unit and property.
+
+    With ``program_names``, a program name is looked up there instead of
+    joining ``Program``, as long as no rule needs another program column.
+    ``where`` adds SQL predicates, such as a lone rule's ``where``.
+    """
+
+    cached_names = program_names is not None and [
+        key for key in columns if key.startswith("program.")
+    ] == ["program.name"]
+    selected = list(columns)
+    if cached_names:
+        selected.remove("program.name")
+        if "certification.program_id" not in selected:
+            selected.append("certification.program_id")
+    statement = (
+        select(*(_column(key).label(key) for key in selected))
+        .select_from(models.Certification)
+        .join(models.Household, models.Household.id == models.Certification.household_id)
+        .join(models.Unit, models.Unit.id == models.Household.unit_id)
+        .join(models.Property, models.Property.id == models.Unit.property_id)
+        .where(models.Certification.status == "Active", *where)
+        .order_by(models.Certification.id)
+    )
+    if not cached_names:
+        statement = statement.join(
+            models.Program, models.Program.id == models.Certification.program_id
+        )
+    if property_ids is not None:
+        statement = statement.where(models.Property.id.in_(property_ids))
+    for row in session.execute(statement.execution_options(yield_per=FETCH_BATCH)):
+        if not cached_names:
+            yield row._mapping
+            continue
+        values = dict(row._mapping)
+        values["program.name"] = program_names(values["certification.program_id"])
+        yield values
+
+
+def iter_findings(
+    source: RowSource,
+    rules: Sequence[Rule],
+    context: RuleContext,
+    timings: Optional[Dict[str, float]] = None,
+) -> Iterator[Tuple[str, schemas.ComplianceIssue]]:
+    """Evaluate every rule on every row; ``timings`` accumulates seconds per rule."""
+
+    timings = timings if timings is not None else defaultdict(float)
+    clock = time.perf_counter
+    for row in source(required_columns(rules)):
+        for rule_ in rules:
+            started = clock()
+            finding = rule_.check(context, row)
+            timings[rule_.name] = timings.get(rule_.name, 0.0) + clock() - started
+            if finding is not None:
+                yield rule_.name, schemas.ComplianceIssue(
+                    household_id=row["household.id"],
+                    household_name=row["household.name"],
+                    program_name=row["program.name"],
+                    issue=finding.issue,
+                    severity=finding.severity,
+                    next_due_date=row["certification.next_due_date"],
+                )
+
+
+def sweep(source: RowSource, rules: Sequence[Rule], context: RuleContext) -> schemas.RuleSweep:
+    """Run ``rules`` to completion and report findings with per-rule timings."""
+
+    timings: Dict[str, float] = {rule_.name: 0.0 for rule_ in rules}
+    counts: Dict[str, int] = {rule_.name: 0 for rule_ in rules}
+    rows_scanned = 0
+
+    def counted(columns: Sequence[str]) -> Iterator[Row]:
+        nonlocal rows_scanned
+        for row in source(columns):
+            rows_scanned += 1
+            yield row
+
+    started = time.perf_counter()
+    issues = []
+    for name, issue in iter_findings(counted, rules, context, timings):
+        counts[name] += 1
+        issues.append(issue)
+    return schemas.RuleSweep(
+        rows_scanned=rows_scanned,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 3),
+        rules=[
+            schemas.RuleTiming(
+                name=rule_.name,
+                findings=counts[rule_.name],
+                elapsed_ms=round(timings[rule_.name] * 1000, 3),
+            )
+            for rule_ in rules
+        ],
+        issues=issues,
+    )
+
+
+# ----------------------------------------------------------------------
+# Built-in rules
+# ----------------------------------------------------------------------
+@rule(
+    "certification-due",
+    "certification.next_due_date",
+    where=lambda context: models.Certification.next_due_date
+    <= context.today + timedelta(days=context.recertification_window),
+)
+def certification_due(context: RuleContext, row: Row) -> Optional[Finding]:
+    """Active certification due within the recertification window or past due."""
+
+    due = row["certification.next_due_date"]
+    if due > context.today + timedelta(days=context.recertification_window):
+        return None
+    return Finding("Certification due", "High" if due < context.today else "Medium")
+
+
+@rule(
+    "income-limit",
+    "certification.household_income",
+    "program.income_limit_percent",
+    "household.household_size",
+    "property.ami_area",
+)
+def income_limit(context: RuleContext, row: Row) -> Optional[Finding]:
+    """Certified income above the program's limit for the area and household size."""
+
+    income = row["certification.household_income"]
+    limit = context.income_limits.limit_for(
+        row["property.ami_area"], row["program.income_limit_percent"], row["household.household_size"]
+    )
+    if income <= limit:
+        return None
+    return Finding(f"Household income ${income:,.0f} exceeds limit ${limit:,.0f}", "High")
+
+
+@rule(
+    "utility-allowance-missing",
+    "certification.utility_allowance",
+    "certification.contract_rent",
+    default=False,
+)
+def utility_allowance_missing(context: RuleContext, row: Row) -> Optional[Finding]:
+    """Certification with rent and a zero utility allowance. Opt-in: zero is
+    correct where the owner pays every utility."""
+
+    if row["certification.utility_allowance"] or not row["certification.contract_rent"]:
+        return None
+    return Finding("Utility allowance missing", "Low")
+
+
+@rule(
+    "rent-limit",
+    "program.rent_limit_percent",
+    "unit.bedrooms",
+    "property.ami_area",
+    "certification.tenant_rent",
+    "certification.utility_allowance",
+)
+def rent_limit(context: RuleContext, row: Row) -> Optional[Finding]:
+    """Tenant rent plus utility allowance above the program's max gross rent for the unit size."""
+
+    percent = row["program.rent_limit_percent"]
+    if not percent:
+        return None
+    gross = row["certification.tenant_rent"] + (row["certification.utility_allowance"] or 0.0)
+    limit = context.max_rents.max_for(percent, row["property.ami_area"], row["unit.bedrooms"])
+    if gross <= limit:
+        return None
+    return Finding(rent_issue(gross, limit), "High")
@@ -0,0 +1,175 @@
+"""Name search over households, residents, waitlist applicants and properties.
+
+On SQLite the ``search_index`` FTS5 table (declared in ``models.EXTRA_DDL``)
+holds one row per searchable record and is written by the crud helpers in
+the same transaction as the record itself. Queries match every term as a
+prefix and rank with bm25. Other backends fall back to case-insensitive
+``LIKE`` matching on the source columns, unranked.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import and_, func, or_, text
+from sqlmodel import Session, SQLModel, select
+
+from .. import models, schemas
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+ROWID_SHIFT = 48
+REBUILD_BATCH = 10_000
+
+
+class Searchable(NamedTuple):
+    code: int
+    model: Type[SQLModel]
+    label: Callable[[SQLModel], str]
+    keywords: Callable[[SQLModel], str]
+    columns: Tuple[str, ...]
+
+
+SEARCHABLE: Dict[str, Searchable] = {
+    "household": Searchable(1, models.Household, lambda row: row.name, lambda row: "", ("name",)),
+    "resident": Searchable(
+        2,
+        models.Resident,
+        lambda row: f"{row.first_name} {row.last_name}",
+        lambda row: "",
+        ("first_name", "last_name"),
+    ),
+    "waitlistapplicant": Searchable(
+        3, models.WaitlistApplicant, lambda row: row.applicant_name, lambda row: "", ("applicant_name",)
+    ),
+    "property": Searchable(4, models.Property, lambda row: row.name, lambda row: row.code, ("name", "code")),
+}
+ENTITY_BY_MODEL = {spec.model: entity for entity, spec in SEARCHABLE.items()}
+
+
+def _uses_fts(session: Session) -> bool:
+    return session.get_bind().dialect.name == "sqlite"
+
+
+def _rowid(entity: str, entity_id: int) -> int:
+    return (SEARCHABLE[entity].code << ROWID_SHIFT) | entity_id
+
+
+def index_rows(session: Session, instances: Iterable[SQLModel]) -> None:
+    """Upsert index entries for flushed instances (caller commits)."""
+
+    if not _uses_fts(session):
+        return
+    rows = []
+    for instance in instances:
+        entity = ENTITY_BY_MODEL.get(type(instance))
+        if entity is None:
+            continue
+        spec = SEARCHABLE[entity]
+        rows.append(
+            {
+                "rowid": _rowid(entity, instance.id),
+                "entity": entity,
+                "entity_id": instance.id,
+                "label": spec.label(instance),
+                "keywords": spec.keywords(instance),
+            }
+        )
+    if rows:
+        session.execute(
+            text(
+                "INSERT OR REPLACE INTO search_index (rowid, entity, entity_id, label, keywords) "
+                "VALUES (:rowid, :entity, :entity_id, :label, :keywords)"
+            ),
+            rows,
+        )
+
+
+def rebuild_index(session: Session) -> int:
+    """Re-derive the whole index from the source tables."""
+
+    if not _uses_fts(session):
+        return 0
+    session.execute(text("DELETE FROM search_index"))
+    count = 0
+    for spec in SEARCHABLE.values():
+        last_id = 0
+        while True:
+            batch = session.exec(
+                select(spec.model)
+                .where(spec.model.id > last_id)
+                .order_by(spec.model.id)
+                .limit(REBUILD_BATCH)
+            ).all()
+            if not batch:
+                break
+            index_rows(session, batch)
+            count += len(batch)
+            last_id = batch[-1].id
+            session.expunge_all()
+    session.commit()
+    return count
+
+
+def terms(query: str) -> List[str]:
+    return TOKEN.findall(query.lower())
+
+
+def search(
+    session: Session,
+    query: str,
+    *,
+    entities: Optional[Sequence[str]] = None,
+    limit: int = 20,
+) -> List[schemas.SearchResult]:
+    """Records whose names start with every term of ``query``, best first."""
+
+    words = terms(query)
+    if not words:
+        return []
+    entities = [entity for entity in (entities or SEARCHABLE) if entity in SEARCHABLE]
+    if not entities:
+        return []
+    if _uses_fts(session):
+        return _search_fts(session, words, entities, limit)
+    return _search_like(session, words, entities, limit)
+
+
+def _search_fts(session: Session, words: List[str], entities: List[str], limit: int) -> List[schemas.SearchResult]:
+    match = " ".join(f'"{word}"*' for word in words)
+    params = {"match": match, "limit": limit}
+    entity_filter = ""
+    if len(entities) < len(SEARCHABLE):
+        names = [f":entity_{index}" for index in range(len(entities))]
+        entity_filter = f" AND entity IN ({', '.join(names)})"
+        params.update({f"entity_{index}": entity for index, entity in enumerate(entities)})
+    rows = session.execute(
+        text(
+            "SELECT entity, entity_id, label, bm25(search_index, 0, 0, 10.0, 1.0) AS score "
+            f"FROM search_index WHERE search_index MATCH :match{entity_filter} "
+            "ORDER BY score LIMIT :limit"
+        ),
+        params,
+    ).all()
+    return [
+        schemas.SearchResult(entity=entity, entity_id=entity_id, label=label, score=round(-score, 4))
+        for entity, entity_id, label, score in rows
+    ]
+
+
+def _search_like(session: Session, words: List[str], entities: List[str], limit: int) -> List[schemas.SearchResult]:
+    results: List[schemas.SearchResult] = []
+    for entity in entities:
+        spec = SEARCHABLE[entity]
+        columns = [getattr(spec.model, name) for name in spec.columns]
+        conditions = [
+            or_(*(func.lower(column).like(f"{word}%") for column in columns)) for word in words
+        ]
+        statement = select(spec.model).where(and_(*conditions)).limit(limit - len(results))
+        results.extend(
+            schemas.SearchResult(entity=entity, entity_id=row.id, label=spec.label(row), score=0.0)
+            for row in session.exec(statement).all()
+        )
+        if len(results) >= limit:
+            break
+    return results
@@ -0,0 +1,69 @@
+"""Coalesce identical report calls that are in flight at the same time.
+
+When many clients ask for the same report at once, the first request
+computes it and the rest wait for that result instead of repeating the
+work. Nothing is kept once the computation finishes: the next request
+after that starts a fresh one, so results are never older than the
+call that produced them.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+from sqlmodel import Session
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Shares one in-flight computation between callers with the same key."""
+
+    def __init__(self) -> None:
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.collapsed: Dict[str, int] = defaultdict(int)
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, name: str, key: Hashable, compute: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._inflight.get((name, key))
+            leader = future is None
+            if leader:
+                future = self._inflight[(name, key)] = Future()
+                self.calls[name] += 1
+            else:
+                self.collapsed[name] += 1
+        if not leader:
+            return future.result()
+        try:
+            result = compute()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[(name, key)]
+
+    def call(self, session: Session, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """``function(session, *args, **kwargs)``, shared with identical concurrent calls.
+
+        The key includes the session's engine, so reads routed to a replica
+        never join a computation running against the primary.
+        """
+
+        key = (session.get_bind(), args, tuple(sorted(kwargs.items())))
+        return self.do(function.__name__, key, lambda: function(session, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                name: {"calls": self.calls[name], "collapsed": self.collapsed[name]}
+                for name in sorted(set(self.calls) | set(self.collapsed))
+            }
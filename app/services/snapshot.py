@@ -0,0 +1,445 @@
+"""Read-optimized, columnar in-memory snapshot of the portfolio.
+
+Units, households, and active certifications are held as parallel
+``array`` columns keyed by integer id, so aggregate reports run in-process
+without database I/O or per-row model construction. The snapshot is built
+once per engine and kept current through the ``crud`` write hooks.
+"""
+
+from __future__ import annotations
+
+import threading
+from array import array
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from weakref import WeakKeyDictionary
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, select
+
+from .. import crud, db, models, schemas
+
+OBJECT = "O"
+
+_snapshots: "WeakKeyDictionary[Engine, PortfolioSnapshot]" = WeakKeyDictionary()
+
+
+class ColumnTable:
+    """Parallel columns with an id -> row index and swap-remove deletes.
+
+    Numeric columns use ``array`` type codes; ``"O"`` stores Python objects
+    (names) in a plain list. Missing integers are stored as 0.
+    """
+
+    __slots__ = ("ids", "columns", "index")
+
+    def __init__(self, **typecodes: str) -> None:
+        self.ids = array("q")
+        self.columns: Dict[str, object] = {
+            name: [] if code == OBJECT else array(code) for name, code in typecodes.items()
+        }
+        self.index: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, name: str):
+        return self.columns[name]
+
+    def upsert(self, row_id: int, **values) -> None:
+        row = self.index.get(row_id)
+        if row is None:
+            self.index[row_id] = len(self.ids)
+            self.ids.append(row_id)
+            for name, column in self.columns.items():
+                column.append(values[name])
+        else:
+            for name, column in self.columns.items():
+                column[row] = values[name]
+
+    def discard(self, row_id: int) -> None:
+        row = self.index.pop(row_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.ids[row] = moved_id
+            for column in self.columns.values():
+                column[row] = column[last]
+            self.index[moved_id] = row
+        self.ids.pop()
+        for column in self.columns.values():
+            column.pop()
+
+
+class PortfolioSnapshot:
+    """Columnar copy of the rows the financial and compliance reports read."""
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.properties = ColumnTable(name=OBJECT, ami_area=OBJECT)
+        self.programs = ColumnTable(name=OBJECT, income_limit_percent="i", rent_limit_percent="i")
+        self.units = ColumnTable(property_id="q", bedrooms="i", ami_percent="i")
+        self.households = ColumnTable(
+            unit_id="q", household_size="i", annual_income="d", name=OBJECT
+        )
+        self.certifications = ColumnTable(
+            household_id="q",
+            program_id="q",
+            next_due_date="i",
+            household_income="d",
+            contract_rent="d",
+            tenant_rent="d",
+            utility_allowance="d",
+        )
+
+    # ------------------------------------------------------------------
+    # Loading and incremental refresh
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls, session: Session) -> "PortfolioSnapshot":
+        """Load the snapshot with column-only queries (no ORM instances)."""
+
+        snapshot = cls()
+        for row in session.exec(
+            select(models.Property.id, models.Property.name, models.Property.ami_area)
+        ):
+            snapshot._put_property(*row)
+        for row in session.exec(
+            select(
+                models.Program.id,
+                models.Program.name,
+                models.Program.income_limit_percent,
+                models.Program.rent_limit_percent,
+            )
+        ):
+            snapshot._put_program(*row)
+        for row in session.exec(
+            select(
+                models.Unit.id,
+                models.Unit.property_id,
+                models.Unit.bedrooms,
+                models.Unit.ami_percent,
+            )
+        ):
+            snapshot._put_unit(*row)
+        for row in session.exec(
+            select(
+                models.Household.id,
+                models.Household.unit_id,
+                models.Household.household_size,
+                models.Household.annual_income,
+                models.Household.name,
+            )
+        ):
+            snapshot._put_household(*row)
+        for row in session.exec(
+            select(
+                models.Certification.id,
+                models.Certification.household_id,
+                models.Certification.program_id,
+                models.Certification.next_due_date,
+                models.Certification.household_income,
+                models.Certification.contract_rent,
+                models.Certification.tenant_rent,
+                models.Certification.utility_allowance,
+            ).where(models.Certification.status == "Active")
+        ):
+            snapshot._put_certification(*row)
+        return snapshot
+
+    def apply(self, instance: SQLModel) -> None:
+        """Fold one committed row into the snapshot."""
+
+        with self.lock:
+            if isinstance(instance, models.Property):
+                self._put_property(instance.id, instance.name, instance.ami_area)
+            elif isinstance(instance, models.Program):
+                self._put_program(
+                    instance.id,
+                    instance.name,
+                    instance.income_limit_percent,
+                    instance.rent_limit_percent,
+                )
+            elif isinstance(instance, models.Unit):
+                self._put_unit(
+                    instance.id, instance.property_id, instance.bedrooms, instance.ami_percent
+                )
+            elif isinstance(instance, models.Household):
+                self._put_household(
+                    instance.id,
+                    instance.unit_id,
+                    instance.household_size,
+                    instance.annual_income,
+                    instance.name,
+                )
+            elif isinstance(instance, models.Certification):
+                if instance.status != "Active":
+                    self.certifications.discard(instance.id)
+                    return
+                self._put_certification(
+                    instance.id,
+                    instance.household_id,
+                    instance.program_id,
+                    instance.next_due_date,
+                    instance.household_income,
+                    instance.contract_rent,
+                    instance.tenant_rent,
+                    instance.utility_allowance,
+                )
+
+    def _put_property(self, id_, name, ami_area) -> None:
+        self.properties.upsert(id_, name=name, ami_area=ami_area)
+
+    def _put_program(self, id_, name, income_limit_percent, rent_limit_percent) -> None:
+        self.programs.upsert(
+            id_,
+            name=name,
+            income_limit_percent=income_limit_percent,
+            rent_limit_percent=rent_limit_percent or 0,
+        )
+
+    def _put_unit(self, id_, property_id, bedrooms, ami_percent) -> None:
+        self.units.upsert(
+            id_, property_id=property_id, bedrooms=bedrooms, ami_percent=ami_percent or 0
+        )
+
+    def _put_household(self, id_, unit_id, household_size, annual_income, name) -> None:
+        self.households.upsert(
+            id_,
+            unit_id=unit_id,
+            household_size=household_size,
+            annual_income=annual_income,
+            name=name,
+        )
+
+    def _put_certification(
+        self,
+        id_,
+        household_id,
+        program_id,
+        next_due_date: date,
+        household_income,
+        contract_rent,
+        tenant_rent,
+        utility_allowance,
+    ) -> None:
+        self.certifications.upsert(
+            id_,
+            household_id=household_id,
+            program_id=program_id,
+            next_due_date=next_due_date.toordinal(),
+            household_income=household_income,
+            contract_rent=contract_rent,
+            tenant_rent=tenant_rent,
+            utility_allowance=utility_allowance,
+        )
+
+    # ------------------------------------------------------------------
+    # Financial reports
+    # ------------------------------------------------------------------
+    def occupancy_reports(
+        self,
+        property_id: Optional[int] = None,
+        *,
+        property_ids: Optional[Sequence[int]] = None,
+    ) -> List[schemas.OccupancyReport]:
+        with self.lock:
+            unit_property = self.units["property_id"]
+            unit_ami = self.units["ami_percent"]
+            total_units: Dict[int, int] = defaultdict(int)
+            for owner in unit_property:
+                total_units[owner] += 1
+            occupied_rows = {
+                self.units.index[unit_id]
+                for unit_id in self.households["unit_id"]
+                if unit_id in self.units.index
+            }
+            occupied: Dict[int, int] = defaultdict(int)
+            ami_sum: Dict[int, int] = defaultdict(int)
+            ami_count: Dict[int, int] = defaultdict(int)
+            for row in occupied_rows:
+                owner = unit_property[row]
+                occupied[owner] += 1
+                if unit_ami[row]:
+                    ami_sum[owner] += unit_ami[row]
+                    ami_count[owner] += 1
+
+            reports: List[schemas.OccupancyReport] = []
+            for owner, name in self._selected_properties(property_id, property_ids):
+                total = total_units.get(owner, 0)
+                occupied_units = occupied.get(owner, 0)
+                rate = (occupied_units / total) * 100 if total else 0
+                count = ami_count.get(owner, 0)
+                reports.append(
+                    schemas.OccupancyReport(
+                        property_id=owner,
+                        property_name=name,
+                        total_units=total,
+                        occupied_units=occupied_units,
+                        occupancy_rate=round(rate, 2),
+                        ami_average=ami_sum[owner] / count if count else None,
+                    )
+                )
+            return reports
+
+    def rent_projection(
+        self,
+        property_id: Optional[int] = None,
+        *,
+        property_ids: Optional[Sequence[int]] = None,
+    ) -> List[schemas.RentProjection]:
+        with self.lock:
+            tenant: Dict[int, float] = defaultdict(float)
+            subsidy: Dict[int, float] = defaultdict(float)
+            contract_rent = self.certifications["contract_rent"]
+            tenant_rent = self.certifications["tenant_rent"]
+            for row, household_id in enumerate(self.certifications["household_id"]):
+                owner = self._property_of_household(household_id)
+                if owner is None:
+                    continue
+                tenant[owner] += tenant_rent[row]
+                subsidy[owner] += contract_rent[row] - tenant_rent[row]
+
+            projections: List[schemas.RentProjection] = []
+            for owner, name in self._selected_properties(property_id, property_ids):
+                tenant_share = tenant.get(owner, 0.0)
+                subsidy_share = subsidy.get(owner, 0.0)
+                projections.append(
+                    schemas.RentProjection(
+                        property_id=owner,
+                        property_name=name,
+                        monthly_rent_roll=round(tenant_share + subsidy_share, 2),
+                        subsidy_share=round(subsidy_share, 2),
+                        tenant_share=round(tenant_share, 2),
+                    )
+                )
+            return projections
+
+    # ------------------------------------------------------------------
+    # Compliance rules
+    # ------------------------------------------------------------------
+    def supports(self, columns: Sequence[str]) -> bool:
+        """Whether every ``"<entity>.<column>"`` key is held in memory."""
+
+        for key in columns:
+            entity, _, name = key.partition(".")
+            table = self._tables().get(entity)
+            if table is None or (name != "id" and name not in table.columns):
+                return False
+        return True
+
+    def rule_rows(
+        self, columns: Sequence[str], property_ids: Optional[Sequence[int]] = None
+    ) -> Iterator[Dict[str, object]]:
+        """Active certification rows shaped like ``rules.database_rows``.
+
+        Values are copied out under the lock, so the caller may consume the
+        rows from another thread.
+        """
+
+        tables = self._tables()
+        keys = [key.partition(".") for key in columns]
+        with self.lock:
+            values = []
+            for positions in self._active_certifications(property_ids):
+                values.append(
+                    tuple(
+                        tables[entity].ids[positions[entity]]
+                        if name == "id"
+                        else tables[entity][name][positions[entity]]
+                        for entity, _, name in keys
+                    )
+                )
+        for item in values:
+            row = dict(zip(columns, item))
+            if "certification.next_due_date" in row:
+                row["certification.next_due_date"] = date.fromordinal(row["certification.next_due_date"])
+            yield row
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _selected_properties(
+        self, property_id: Optional[int], property_ids: Optional[Sequence[int]]
+    ) -> Iterator[Tuple[int, str]]:
+        wanted = set(property_ids) if property_ids is not None else None
+        names = self.properties["name"]
+        for row, owner in enumerate(self.properties.ids):
+            if property_id is not None and owner != property_id:
+                continue
+            if wanted is not None and owner not in wanted:
+                continue
+            yield owner, names[row]
+
+    def _property_of_household(self, household_id: int) -> Optional[int]:
+        household_row = self.households.index.get(household_id)
+        if household_row is None:
+            return None
+        unit_row = self.units.index.get(self.households["unit_id"][household_row])
+        if unit_row is None:
+            return None
+        owner = self.units["property_id"][unit_row]
+        return owner if owner in self.properties.index else None
+
+    def _tables(self) -> Dict[str, ColumnTable]:
+        return {
+            "certification": self.certifications,
+            "household": self.households,
+            "program": self.programs,
+            "unit": self.units,
+            "property": self.properties,
+        }
+
+    def _active_certifications(
+        self, property_ids: Optional[Sequence[int]]
+    ) -> Iterator[Dict[str, int]]:
+        """Yield row positions per entity for certifications whose related rows are known."""
+
+        wanted = set(property_ids) if property_ids is not None else None
+        programs = self.certifications["program_id"]
+        for row, household_id in enumerate(self.certifications["household_id"]):
+            household_row = self.households.index.get(household_id)
+            program_row = self.programs.index.get(programs[row])
+            if household_row is None or program_row is None:
+                continue
+            owner = self._property_of_household(household_id)
+            if owner is None or (wanted is not None and owner not in wanted):
+                continue
+            yield {
+                "certification": row,
+                "household": household_row,
+                "program": program_row,
+                "unit": self.units.index[self.households["unit_id"][household_row]],
+                "property": self.properties.index[owner],
+            }
+
+
+def enable_snapshot(bind: Engine) -> PortfolioSnapshot:
+    """Build the snapshot for an engine and keep it current on crud writes."""
+
+    with Session(bind) as session:
+        snapshot = PortfolioSnapshot.build(session)
+    _snapshots[bind] = snapshot
+    crud.register_write_hook(_apply_write)
+    return snapshot
+
+
+def disable_snapshot(bind: Engine) -> None:
+    _snapshots.pop(bind, None)
+
+
+def get_snapshot(session: Session) -> Optional[PortfolioSnapshot]:
+    """Snapshot for the session's database, or ``None`` when not enabled."""
+
+    if not _snapshots:
+        return None
+    return _snapshots.get(db.primary_bind(session))
+
+
+def _apply_write(session: Session, instance: SQLModel) -> None:
+    snapshot = get_snapshot(session)
+    if snapshot is not None:
+        snapshot.apply(instance)
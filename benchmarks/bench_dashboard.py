@@ -0,0 +1,176 @@
+"""Compare rows read by the separate report calls against ``/reports/dashboard``.
+
+Every statement a session executes is counted along with the rows it
+returns, once for the four calls the dashboard used to make (occupancy,
+rent, NOI and compliance issues, each in its own session) and once for
+``build_dashboard``.
+
+Usage::
+
+    python benchmarks/bench_dashboard.py --properties 200 --units 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.orm import Session as OrmSession  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app import crud, db, models  # noqa: E402
+from app.services import compliance, dashboard, financials  # noqa: E402
+
+
+class RowCounter:
+    """Counts statements and returned rows for every ORM session."""
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, state):
+        frozen = state.invoke_statement().freeze()
+        with self._lock:
+            self.statements += 1
+            self.rows += len(frozen.data)
+        return frozen()
+
+    def reset(self) -> None:
+        self.statements = self.rows = 0
+
+
+def seed(engine, properties: int, units: int) -> None:
+    today = date.today()
+    with Session(engine) as session:
+        session.execute(
+            insert(models.Program),
+            [{"name": "LIHTC", "category": "Tax Credit", "income_limit_percent": 60}],
+        )
+        session.execute(
+            insert(models.Property),
+            [
+                {
+                    "name": f"Property {p}",
+                    "code": f"P{p}",
+                    "address_line1": "1 Main St",
+                    "city": "Denver",
+                    "state": "CO",
+                    "postal_code": "80202",
+                }
+                for p in range(1, properties + 1)
+            ],
+        )
+        session.execute(
+            insert(models.Unit),
+            [
+                {
+                    "property_id": p,
+                    "number": str(n),
+                    "bedrooms": 2,
+                    "bathrooms": 1.0,
+                    "ami_percent": 60,
+                }
+                for p in range(1, properties + 1)
+                for n in range(units)
+            ],
+        )
+        occupied = [unit_id for unit_id in range(1, properties * units + 1) if unit_id % 10]
+        session.execute(
+            insert(models.Household),
+            [
+                {
+                    "unit_id": unit_id,
+                    "name": f"Household {unit_id}",
+                    "move_in_date": today - timedelta(days=400),
+                    "annual_income": 30000 + unit_id % 40000,
+                    "household_size": 1 + unit_id % 5,
+                }
+                for unit_id in occupied
+            ],
+        )
+        session.execute(
+            insert(models.Certification),
+            [
+                {
+                    "household_id": household_id,
+                    "program_id": 1,
+                    "effective_date": today - timedelta(days=300),
+                    "next_due_date": today + timedelta(days=household_id % 90),
+                    "household_income": 30000 + household_id % 40000,
+                    "contract_rent": 1400,
+                    "tenant_rent": 500,
+                    "utility_allowance": 100,
+                }
+                for household_id in range(1, len(occupied) + 1)
+            ],
+        )
+        session.commit()
+        crud.create_transactions(
+            session,
+            [
+                models.FinancialTransaction(
+                    property_id=p,
+                    transaction_date=today - timedelta(days=day),
+                    category=category,
+                    amount=amount,
+                )
+                for p in range(1, properties + 1)
+                for day in range(0, 60, 7)
+                for category, amount in (("Revenue", 900.0), ("Expense", 300.0))
+            ],
+        )
+
+
+def separate_calls(engine) -> None:
+    with Session(engine) as session:
+        financials.occupancy_reports(session)
+    with Session(engine) as session:
+        financials.rent_projection(session)
+    with Session(engine) as session:
+        financials.noi_report(session)
+    with Session(engine) as session:
+        compliance.portfolio_issues(session)
+
+
+def combined(engine) -> None:
+    with Session(engine) as session:
+        dashboard.build_dashboard(session)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--properties", type=int, default=200)
+    parser.add_argument("--units", type=int, default=50)
+    args = parser.parse_args()
+
+    counter = RowCounter()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = db.create_db_engine(f"sqlite:///{Path(tmp) / 'dashboard.db'}")
+        db.init_db(engine)
+        seed(engine, args.properties, args.units)
+        event.listen(OrmSession, "do_orm_execute", counter, retval=True)
+        for label, run in (("separate calls", separate_calls), ("dashboard", combined)):
+            counter.reset()
+            started = time.perf_counter()
+            run(engine)
+            elapsed = (time.perf_counter() - started) * 1000
+            print(
+                f"  {label:15} {counter.statements:6} statements "
+                f"{counter.rows:9} rows  {elapsed:8.1f} ms"
+            )
+        event.remove(OrmSession, "do_orm_execute", counter)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
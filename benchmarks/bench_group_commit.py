@@ -0,0 +1,89 @@
+"""Compare per-request commits with the group-commit writer on SQLite WAL.
+
+Usage::
+
+    python benchmarks/bench_group_commit.py --rows 5000 --threads 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from app import crud, db, models  # noqa: E402
+from app.services.group_commit import GroupCommitWriter  # noqa: E402
+
+
+def new_engine(directory: str, name: str):
+    engine = db.create_db_engine(f"sqlite:///{Path(directory) / name}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        crud.create_property(
+            session,
+            models.Property(
+                name="Bench", code="BENCH", address_line1="1 Way", city="Denver",
+                state="CO", postal_code="80202",
+            ),
+        )
+    return engine
+
+
+def transaction(index: int) -> models.FinancialTransaction:
+    return models.FinancialTransaction(
+        property_id=1,
+        transaction_date=date(2024, 1 + index % 12, 1 + index % 28),
+        category="revenue-rent",
+        amount=950.0,
+        source="processor",
+    )
+
+
+def per_request(engine, rows: int, threads: int) -> float:
+    def post(index: int) -> int:
+        with Session(engine) as session:
+            return crud.create_transaction(session, transaction(index)).id
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(post, range(rows)))
+    return time.perf_counter() - started
+
+
+def grouped(engine, rows: int, threads: int) -> float:
+    writer = GroupCommitWriter(engine)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = list(pool.map(lambda index: writer.submit(transaction(index)), range(rows)))
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - started
+    writer.close()
+    print(f"  group commit flushed {writer.rows} rows in {writer.batches} batches")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = per_request(new_engine(tmp, "single.db"), args.rows, args.threads)
+        batched = grouped(new_engine(tmp, "grouped.db"), args.rows, args.threads)
+    print(f"  per-request commits {args.rows / baseline:10.0f} rows/s")
+    print(f"  group commit        {args.rows / batched:10.0f} rows/s")
+    print(f"  speedup {baseline / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
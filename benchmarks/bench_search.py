@@ -0,0 +1,76 @@
+"""Time ``/search`` queries against a large resident table.
+
+Usage::
+
+    python benchmarks/bench_search.py --rows 1000000 --repeat 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app import db, models  # noqa: E402
+from app.services import search  # noqa: E402
+
+FIRST = ["Ana", "Ben", "Carla", "Dev", "Elena", "Farid", "Grace", "Hiro", "Imani", "Jonas"]
+LAST = ["Rivera", "Nguyen", "Okafor", "Smith", "Kowalski", "Haddad", "Tanaka", "Silva", "Murphy", "Cohen"]
+
+
+def seed(engine, rows: int) -> None:
+    rng = random.Random(7)
+    with Session(engine) as session:
+        for start in range(0, rows, 50_000):
+            session.execute(
+                insert(models.Resident),
+                [
+                    {
+                        "household_id": 1,
+                        "first_name": rng.choice(FIRST),
+                        "last_name": f"{rng.choice(LAST)}{index % 997}",
+                        "date_of_birth": date(1980, 1, 1),
+                        "relationship": "Head",
+                    }
+                    for index in range(start, min(rows, start + 50_000))
+                ],
+            )
+        session.commit()
+        started = time.perf_counter()
+        indexed = search.rebuild_index(session)
+        print(f"  indexed {indexed} rows in {time.perf_counter() - started:.1f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = db.create_db_engine(f"sqlite:///{Path(tmp) / 'search.db'}")
+        db.init_db(engine)
+        seed(engine, args.rows)
+        for query in ("riv", "ana rivera12", "kowalski99"):
+            timings = []
+            with Session(engine) as session:
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    results = search.search(session, query, limit=20)
+                    timings.append((time.perf_counter() - started) * 1000)
+            print(f"  {query!r:16} {len(results):3} hits  median {statistics.median(timings):7.2f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
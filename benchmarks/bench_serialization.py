@@ -0,0 +1,112 @@
+"""Compare row-tuple serialization against the ``response_model`` path.
+
+Usage::
+
+    python benchmarks/bench_serialization.py --rows 50000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from app import crud, db, models, schemas  # noqa: E402
+from app.serialization import rows_response  # noqa: E402
+
+
+def seed(engine, rows: int) -> None:
+    with Session(engine) as session:
+        property_ = models.Property(
+            name="Bench", code="BENCH", address_line1="1 Way", city="Denver",
+            state="CO", postal_code="80202",
+        )
+        session.add(property_)
+        session.flush()
+        unit = models.Unit(property_id=property_.id, number="1", bedrooms=2, bathrooms=1.0)
+        session.add(unit)
+        session.flush()
+        start = date(2020, 1, 1)
+        session.add_all(
+            models.Household(
+                unit_id=unit.id,
+                name=f"Household {index}",
+                move_in_date=start + timedelta(days=index % 1500),
+                annual_income=20000.0 + index % 50000,
+                household_size=1 + index % 6,
+                voucher_type="HCV" if index % 3 else None,
+            )
+            for index in range(rows)
+        )
+        session.commit()
+
+
+def build_app(engine) -> FastAPI:
+    app = FastAPI()
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    @app.get("/orm", response_model=list[schemas.HouseholdRead])
+    def orm_path(session: Session = Depends(get_session)):
+        return crud.list_households(session)
+
+    @app.get("/rows", response_model=list[schemas.HouseholdRead])
+    def rows_path(session: Session = Depends(get_session)):
+        return rows_response(
+            session, crud.households_query(), models.Household, schemas.HouseholdRead
+        )
+
+    return app
+
+
+def measure(call: Callable[[], object], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = db.create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        SQLModel.metadata.create_all(engine)
+        seed(engine, args.rows)
+        client = TestClient(build_app(engine))
+        assert client.get("/orm").json() == client.get("/rows").json()
+
+        results = {
+            path: measure(lambda path=path: client.get(path), args.repeat)
+            for path in ("/orm", "/rows")
+        }
+    print(f"households: {args.rows} rows, {args.repeat} runs")
+    for path, timings in results.items():
+        print(
+            f"  {path:<6} median {statistics.median(timings) * 1000:9.1f} ms"
+            f"  min {min(timings) * 1000:9.1f} ms"
+        )
+    speedup = statistics.median(results["/orm"]) / statistics.median(results["/rows"])
+    print(f"  speedup {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
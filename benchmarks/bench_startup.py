@@ -0,0 +1,104 @@
+"""Time-to-first-request and import cost for a cold application process.
+
+Usage::
+
+    python benchmarks/bench_startup.py --target-ms 1500
+    python benchmarks/bench_startup.py --importtime --top 15
+
+Each run spawns a fresh interpreter that times ``import app.main`` on its
+own, then builds the application as uvicorn does (``app.main:app``) and
+serves ``GET /health`` against a temporary SQLite file. The second run
+reuses that file, so ``init_db`` finds a current schema version. The script
+exits non-zero when the warm median time-to-first-request exceeds
+``--target-ms``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PROBE = """
+import time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    assert client.get("/health").status_code == 200
+finished = time.perf_counter()
+print((imported - started) * 1000, (finished - started) * 1000)
+"""
+
+IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_probe(database_url: str, *extra_flags: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, RENTMANAGER_DATABASE_URL=database_url)
+    return subprocess.run(
+        [sys.executable, *extra_flags, "-c", PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def probe_ms(database_url: str) -> Tuple[float, float]:
+    """(``import app.main``, time-to-first-request) in milliseconds."""
+
+    import_ms, first_request_ms = run_probe(database_url).stdout.strip().splitlines()[-1].split()
+    return float(import_ms), float(first_request_ms)
+
+
+def import_profile(database_url: str, top: int) -> List[Tuple[int, int, str]]:
+    """(cumulative us, self us, module) for the slowest top-level imports."""
+
+    rows = []
+    for line in run_probe(database_url, "-X", "importtime").stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            if len(indent) <= 3:
+                rows.append((int(cumulative_us), int(self_us), module))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=None)
+    parser.add_argument("--importtime", action="store_true", help="print the slowest imports")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'startup.db'}"
+        _, cold = probe_ms(database_url)
+        runs = [probe_ms(database_url) for _ in range(args.repeat)]
+        if args.importtime:
+            print("  cumulative     self  module")
+            for cumulative_us, self_us, module in import_profile(database_url, args.top):
+                print(f"  {cumulative_us / 1000:8.1f}ms {self_us / 1000:6.1f}ms  {module}")
+
+    median = statistics.median(first_request for _, first_request in runs)
+    print(f"  import app.main              {statistics.median(i for i, _ in runs):8.1f} ms median")
+    print(f"  cold start (schema created)  {cold:8.1f} ms")
+    print(f"  warm start (schema current)  {median:8.1f} ms median of {args.repeat}")
+    if args.target_ms is not None and median > args.target_ms:
+        print(f"  over target of {args.target_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
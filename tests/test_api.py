@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from datetime import date, timedelta
 
 
@@ -139,3 +140,983 @@ def test_end_to_end_workflow(client):
     issues = compliance_resp.json()
     assert any("Certification due" in issue["issue"] for issue in issues)
     assert any("exceeds limit" in issue["issue"] for issue in issues)
+
+
+def _seed_household(client, *, code="AMI01", ami_area=None, income=55000, household_size=3):
+    today = date.today()
+    property_payload = {
+        "name": f"Property {code}",
+        "code": code,
+        "address_line1": "1 Test Way",
+        "city": "Denver",
+        "state": "CO",
+        "postal_code": "80202",
+        "ami_area": ami_area,
+    }
+    property_id = client.post("/properties/", json=property_payload).json()["id"]
+    unit_id = client.post(
+        "/units/",
+        json={"property_id": property_id, "number": "1", "bedrooms": 2, "bathrooms": 1.0},
+    ).json()["id"]
+    program_id = client.post(
+        "/programs/",
+        json={"name": "LIHTC", "category": "Tax Credit", "income_limit_percent": 60},
+    ).json()["id"]
+    household_id = client.post(
+        "/households/",
+        json={
+            "unit_id": unit_id,
+            "name": f"Household {code}",
+            "move_in_date": today.isoformat(),
+            "annual_income": income,
+            "household_size": household_size,
+        },
+    ).json()["id"]
+    client.post(
+        f"/households/{household_id}/certifications",
+        json={
+            "household_id": household_id,
+            "program_id": program_id,
+            "effective_date": today.isoformat(),
+            "next_due_date": (today + timedelta(days=365)).isoformat(),
+            "household_income": income,
+            "contract_rent": 1200,
+            "tenant_rent": 400,
+            "utility_allowance": 100,
+        },
+    )
+    return {"property_id": property_id, "unit_id": unit_id, "program_id": program_id, "household_id": household_id}
+
+
+def test_income_limits_follow_property_area(client):
+    _seed_household(client, code="DEN", ami_area="08031", income=55000)
+    issues = client.get("/compliance/issues").json()
+    assert any("exceeds limit" in issue["issue"] for issue in issues)
+
+    csv_text = "area_code,area_name,median_income,l60_3\n08031,Denver,124000,67000\n"
+    resp = client.put(
+        "/compliance/income-limits", content=csv_text, headers={"content-type": "text/csv"}
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["limit_count"] == 1
+    assert body["areas"][0]["area_code"] == "08031"
+
+    issues = client.get("/compliance/issues").json()
+    assert not any("exceeds limit" in issue["issue"] for issue in issues)
+
+    reloaded = client.put(
+        "/compliance/income-limits",
+        content="area_code,median_income,l60_3\n08031,124000,50000\n",
+        headers={"content-type": "text/csv"},
+    ).json()
+    assert reloaded["version"] > body["version"]
+    issues = client.get("/compliance/issues").json()
+    assert any("exceeds limit $50,000" in issue["issue"] for issue in issues)
+
+    duplicated = client.put(
+        "/compliance/income-limits",
+        content="area_code,median_income\n08031,124000\n08059,98000\n08031,125000\n",
+        headers={"content-type": "text/csv"},
+    )
+    assert duplicated.status_code == 400
+    assert "line 4" in duplicated.json()["detail"]
+    assert client.get("/compliance/income-limits").json()["version"] == reloaded["version"]
+
+
+def test_report_pack_job_and_downloads(client):
+    first = _seed_household(client, code="PK1", income=90000)
+    _seed_household(client, code="PK2", income=20000)
+    client.post(
+        "/transactions/",
+        json={
+            "property_id": first["property_id"],
+            "transaction_date": date.today().isoformat(),
+            "category": "revenue-rent",
+            "amount": 500.0,
+        },
+    )
+
+    submitted = client.post("/reports/packs", json={})
+    assert submitted.status_code == 202
+    job = submitted.json()
+    status = client.get(f"/reports/packs/{job['id']}").json()
+    assert status["status"] == "completed"
+
+    pack = client.get(f"/reports/packs/{job['id']}/download").json()
+    assert pack["property_count"] == 2
+    assert [report["property_id"] for report in pack["occupancy"]] == sorted(
+        report["property_id"] for report in pack["occupancy"]
+    )
+    assert pack["operating_summary"] == {"revenue-rent": 500.0}
+    assert any("exceeds limit" in issue["issue"] for issue in pack["compliance_issues"])
+
+    archive = client.get(f"/reports/packs/{job['id']}/download", params={"format": "csv"})
+    assert archive.headers["content-type"] == "application/zip"
+    assert client.get("/reports/packs/missing").status_code == 404
+
+
+def test_background_report_jobs(client):
+    seeded = _seed_household(client, code="JOB", income=90000)
+    submitted = client.post("/jobs/noi", json={"property_id": seeded["property_id"]})
+    assert submitted.status_code == 202
+    job = submitted.json()
+    assert job["kind"] == "noi"
+
+    status = client.get(f"/jobs/{job['id']}").json()
+    assert status["status"] == "completed"
+    assert status["expires_at"] is not None
+    result = client.get(f"/jobs/{job['id']}/result").json()
+    assert result == {"net_operating_income": 0.0, "summary": {}}
+
+    issues_job = client.post("/jobs/compliance-issues", json={}).json()
+    issues = client.get(f"/jobs/{issues_job['id']}/result").json()
+    assert any("exceeds limit" in issue["issue"] for issue in issues)
+
+    assert client.post("/jobs/unknown", json={}).status_code == 404
+    assert client.get("/jobs/missing").status_code == 404
+
+
+def test_portfolio_snapshot_matches_database_reports(client, engine):
+    from app.services import snapshot
+
+    _seed_household(client, code="SN1", income=90000)
+    seeded = _seed_household(client, code="SN2", income=20000)
+    expected = {
+        path: client.get(path).json()
+        for path in ("/reports/occupancy", "/reports/rent", "/compliance/issues")
+    }
+
+    snapshot.enable_snapshot(engine)
+    try:
+        for path, body in expected.items():
+            assert client.get(path).json() == body
+
+        client.post(
+            "/units/",
+            json={"property_id": seeded["property_id"], "number": "2", "bedrooms": 1, "bathrooms": 1.0},
+        )
+        occupancy = client.get(
+            "/reports/occupancy", params={"property_id": seeded["property_id"]}
+        ).json()
+        assert occupancy[0]["total_units"] == 2
+        assert occupancy[0]["occupancy_rate"] == 50.0
+    finally:
+        snapshot.disable_snapshot(engine)
+
+
+def test_list_routes_match_response_model_output(client, session):
+    from app import crud, schemas
+
+    seeded = _seed_household(client, code="FAST", income=40000)
+    client.post(
+        "/transactions/",
+        json={
+            "property_id": seeded["property_id"],
+            "transaction_date": date.today().isoformat(),
+            "category": "revenue-rent",
+            "amount": 812.5,
+            "description": None,
+        },
+    )
+    expected = {
+        "/households/": (crud.list_households(session), schemas.HouseholdRead),
+        "/units/": (crud.list_units(session), schemas.UnitRead),
+        "/transactions/": (crud.list_transactions(session), schemas.FinancialTransactionRead),
+        f"/households/{seeded['household_id']}/certifications": (
+            crud.list_certifications(session, household_id=seeded["household_id"]),
+            schemas.CertificationRead,
+        ),
+    }
+    for path, (rows, schema) in expected.items():
+        validated = [schema.from_orm(row) for row in rows]
+        assert client.get(path).json() == [json.loads(item.json()) for item in validated]
+
+
+def test_change_feed_follows_writes_in_order(client):
+    seeded = _seed_household(client, code="CDC")
+    feed = client.get("/changes/").json()
+    entities = [change["entity"] for change in feed["changes"]]
+    assert entities == ["property", "unit", "program", "household", "certification"]
+    assert feed["changes"][3]["payload"]["name"] == "Household CDC"
+    assert feed["changes"][3]["entity_id"] == seeded["household_id"]
+
+    client.post(
+        "/transactions/",
+        json={
+            "property_id": seeded["property_id"],
+            "transaction_date": date.today().isoformat(),
+            "category": "revenue-rent",
+            "amount": 100.0,
+        },
+    )
+    incremental = client.get(
+        "/changes/", params={"since": feed["last_seq"], "wait": 1}
+    ).json()
+    assert [change["entity"] for change in incremental["changes"]] == ["financialtransaction"]
+    assert incremental["last_seq"] > feed["last_seq"]
+
+    empty = client.get("/changes/", params={"since": incremental["last_seq"]}).json()
+    assert empty == {"changes": [], "last_seq": incremental["last_seq"]}
+    only_units = client.get("/changes/", params={"entity": "unit"}).json()
+    assert [change["entity_id"] for change in only_units["changes"]] == [seeded["unit_id"]]
+
+
+def test_read_replica_routing_and_lag_fallback(tmp_path):
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app import db
+    from app.db import get_session
+    from app.main import create_app
+    from app.replica import refresh_sqlite_copy
+
+    primary = db.create_db_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    db.init_db(primary)
+    app = create_app(replica_url=f"sqlite:///{tmp_path / 'replica.db'}")
+    replica = app.state.replica
+    replica.check_interval = 0
+
+    def override_get_session():
+        with Session(primary) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    with TestClient(app) as client:
+        payload = {
+            "name": "Maple Court",
+            "code": "MC1",
+            "address_line1": "1 Main St",
+            "city": "Denver",
+            "state": "CO",
+            "postal_code": "80202",
+        }
+        assert client.post("/properties/", json=payload).status_code == 201
+        refresh_sqlite_copy(primary, replica.bind)
+        assert client.post("/properties/", json={**payload, "code": "MC2"}).status_code == 201
+
+        replica.max_lag = 10
+        assert len(client.get("/properties/").json()) == 1
+        assert replica.reads == 1
+        primary_read = client.get("/properties/", headers={"X-Read-Consistency": "primary"})
+        assert len(primary_read.json()) == 2
+
+        replica.max_lag = 0
+        assert replica.lag(primary) == 1
+        assert len(client.get("/properties/").json()) == 2
+        assert replica.fallbacks == 2
+    primary.dispose()
+
+
+def test_replica_reads_share_the_primary_caches(tmp_path):
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app import db
+    from app.db import get_session
+    from app.main import create_app
+    from app.replica import refresh_sqlite_copy
+
+    primary = db.create_db_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    db.init_db(primary)
+    app = create_app(replica_url=f"sqlite:///{tmp_path / 'replica.db'}")
+    replica = app.state.replica
+    replica.check_interval = 0
+    replica.max_lag = 1000
+
+    def override_get_session():
+        with Session(primary) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    with TestClient(app) as client:
+        _seed_household(client, code="REP", ami_area="08031", income=55000)
+        refresh_sqlite_copy(primary, replica.bind)
+        issues = client.get("/compliance/issues").json()
+        assert any("exceeds limit" in issue["issue"] for issue in issues)
+
+        client.put(
+            "/compliance/income-limits",
+            content="area_code,median_income,l60_3\n08031,124000,67000\n",
+            headers={"content-type": "text/csv"},
+        )
+        issues = client.get("/compliance/issues").json()
+        assert not any("exceeds limit" in issue["issue"] for issue in issues)
+        assert replica.reads == 2
+    primary.dispose()
+
+
+def test_replica_dashboard_sees_new_income_limits(tmp_path):
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app import db
+    from app.db import get_session
+    from app.main import create_app
+    from app.replica import refresh_sqlite_copy
+
+    primary = db.create_db_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    db.init_db(primary)
+    app = create_app(replica_url=f"sqlite:///{tmp_path / 'replica.db'}")
+    replica = app.state.replica
+    replica.check_interval = 0
+    replica.max_lag = 1000
+
+    def override_get_session():
+        with Session(primary) as session:
+            yield session
+
+    def over_limit(dashboard):
+        return [issue for issue in dashboard["compliance"]["issues"] if "exceeds limit" in issue["issue"]]
+
+    app.dependency_overrides[get_session] = override_get_session
+    with TestClient(app) as client:
+        _seed_household(client, code="RDB", ami_area="08031", income=55000)
+        refresh_sqlite_copy(primary, replica.bind)
+        # The dashboard runs its sections on worker sessions of the replica.
+        assert over_limit(client.get("/reports/dashboard").json())
+
+        client.put(
+            "/compliance/income-limits",
+            content="area_code,median_income,l60_3\n08031,124000,67000\n",
+            headers={"content-type": "text/csv"},
+        )
+        refresh_sqlite_copy(primary, replica.bind)
+        assert not over_limit(client.get("/reports/dashboard").json())
+        assert replica.reads == 2
+    primary.dispose()
+
+
+def test_replica_export_sees_new_income_limits(tmp_path):
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app import db
+    from app.db import get_session
+    from app.main import create_app
+    from app.replica import refresh_sqlite_copy
+
+    primary = db.create_db_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    db.init_db(primary)
+    app = create_app(replica_url=f"sqlite:///{tmp_path / 'replica.db'}")
+    replica = app.state.replica
+    replica.check_interval = 0
+    replica.max_lag = 1000
+
+    def override_get_session():
+        with Session(primary) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    with TestClient(app) as client:
+        _seed_household(client, code="REX", ami_area="08031", income=55000)
+        refresh_sqlite_copy(primary, replica.bind)
+        # The export streams from its own session on the replica.
+        assert "exceeds limit" in client.get("/exports/compliance-issues.csv").text
+
+        client.put(
+            "/compliance/income-limits",
+            content="area_code,median_income,l60_3\n08031,124000,67000\n",
+            headers={"content-type": "text/csv"},
+        )
+        refresh_sqlite_copy(primary, replica.bind)
+        assert "exceeds limit" not in client.get("/exports/compliance-issues.csv").text
+        assert replica.reads == 2
+    primary.dispose()
+
+
+def test_group_commit_route_awaits_the_writer(tmp_path):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app import db
+    from app.db import get_session
+    from app.main import create_app
+
+    primary = db.create_db_engine(f"sqlite:///{tmp_path / 'grouped.db'}")
+    db.init_db(primary)
+    app = create_app(group_commit=True)
+
+    def override_get_session():
+        with Session(primary) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    with TestClient(app) as client:
+        property_id = client.post(
+            "/properties/",
+            json={
+                "name": "Grouped", "code": "GRP", "address_line1": "1 Way",
+                "city": "Denver", "state": "CO", "postal_code": "80202",
+            },
+        ).json()["id"]
+
+        def post(day: int):
+            return client.post(
+                "/transactions/",
+                json={
+                    "property_id": property_id,
+                    "transaction_date": f"2024-01-{day:02d}",
+                    "category": "revenue-rent",
+                    "amount": 100.0,
+                },
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(post, range(1, 21)))
+        assert [resp.status_code for resp in responses] == [201] * 20
+        assert len({resp.json()["id"] for resp in responses}) == 20
+
+        group_commit = app.state.group_commit
+        writer = group_commit.writer(primary)
+        group_commit.timeout = 0.01
+        writer.max_delay = 0.5
+        assert post(21).status_code == 503
+        while writer.rows < 21:  # the timed-out posting still commits
+            time.sleep(0.01)
+        summary = client.get("/reports/operating-summary", params={"property_id": property_id})
+        assert summary.json() == {"revenue-rent": 2100.0}
+    primary.dispose()
+
+
+def test_search_ranks_prefix_matches_across_entities(client, session):
+    from app.services import search
+
+    household_id = _seed_household(client, code="RIV", income=30000)["household_id"]
+    client.post(
+        f"/households/{household_id}/residents",
+        json={
+            "household_id": household_id,
+            "first_name": "Ana",
+            "last_name": "Rivera",
+            "date_of_birth": "1990-04-01",
+            "relationship": "Head",
+        },
+    )
+
+    results = client.get("/search/", params={"q": "riv"}).json()
+    assert {(row["entity"], row["label"]) for row in results} == {
+        ("household", "Household RIV"),
+        ("resident", "Ana Rivera"),
+        ("property", "Property RIV"),
+    }
+    residents = client.get("/search/", params={"q": "ana riv", "entity": "resident"}).json()
+    assert [row["label"] for row in residents] == ["Ana Rivera"]
+    assert client.get("/search/", params={"q": "household riv"}).json()[0]["entity_id"] == household_id
+    assert client.get("/search/", params={"q": "zzz"}).json() == []
+
+    assert search.rebuild_index(session) == 3
+    assert len(client.get("/search/", params={"q": "riv"}).json()) == 3
+
+
+def test_list_filters_sort_and_total_count(client):
+    seeded = [
+        _seed_household(client, code=f"F{index}", income=income)
+        for index, income in enumerate((18000, 32000, 45000, 61000))
+    ]
+
+    resp = client.get(
+        "/households/",
+        params={"annual_income__gte": "30000", "sort": "-annual_income", "limit": 2},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["X-Total-Count"] == "3"
+    assert [row["annual_income"] for row in resp.json()] == [61000, 45000]
+
+    page = client.get(
+        "/households/", params={"annual_income__gte": "30000", "limit": 2, "offset": 10}
+    )
+    assert page.json() == [] and page.headers["X-Total-Count"] == "3"
+
+    ids = f"{seeded[0]['household_id']},{seeded[3]['household_id']}"
+    certifications = client.get(
+        "/compliance/certifications",
+        params={"household_id__in": ids, "status__eq": "Active", "sort": "household_id"},
+    )
+    assert [row["household_income"] for row in certifications.json()] == [18000, 61000]
+
+    assert client.get("/households/", params={"annual_income__near": "1"}).status_code == 400
+    assert client.get("/households/", params={"secret__eq": "1"}).status_code == 400
+    assert client.get("/transactions/", params={"amount__gt": "abc"}).status_code == 400
+
+
+def test_streaming_exports_plain_and_gzip(client):
+    import csv
+    import gzip
+    import io
+
+    seeded = _seed_household(client, code="EXP", income=25000)
+
+    resp = client.get("/exports/rent-roll.csv")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(resp.text)))
+    assert rows[0]["household_id"] == str(seeded["household_id"])
+    assert rows[0]["subsidy"] == "800.0"
+
+    resp = client.get("/exports/compliance-issues.csv", params={"gzip": "true"})
+    assert 'filename="compliance-issues.csv.gz"' in resp.headers["content-disposition"]
+    text = gzip.decompress(resp.content).decode()
+    assert text.splitlines()[0] == "household_id,household_name,program_name,issue,severity,next_due_date"
+
+
+def test_budget_import_and_variance_by_month(client):
+    property_id = _seed_household(client, code="BUD")["property_id"]
+    for day, category, amount in (
+        ("2024-01-05", "revenue-rent", 4800.0),
+        ("2024-01-20", "revenue-rent", 300.0),
+        ("2024-02-03", "expense-maintenance", 900.0),
+    ):
+        client.post(
+            "/transactions/",
+            json={"property_id": property_id, "transaction_date": day, "category": category, "amount": amount},
+        )
+
+    budget_rows = [
+        {"property_id": property_id, "period": "2024-01-01", "category": "revenue-rent", "amount": 5000},
+        {"property_id": property_id, "period": "2024-02-15", "category": "expense-maintenance", "amount": 1000},
+        {"property_id": property_id, "period": "2024-02-01", "category": "revenue-rent", "amount": 5000},
+    ]
+    assert client.put("/reports/budgets", json=budget_rows).json() == {"imported": 3}
+    budget_rows[0]["amount"] = 5200
+    assert client.put("/reports/budgets", json=budget_rows[:1]).json() == {"imported": 1}
+
+    report = client.get("/reports/budget-variance", params={"property_id": property_id}).json()
+    assert [(row["period"], row["category"], row["budget"], row["actual"], row["variance"]) for row in report] == [
+        ("2024-01-01", "revenue-rent", 5200.0, 5100.0, -100.0),
+        ("2024-02-01", "expense-maintenance", 1000.0, 900.0, -100.0),
+        ("2024-02-01", "revenue-rent", 5000.0, 0.0, -5000.0),
+    ]
+    february = client.get(
+        "/reports/budget-variance", params={"start": "2024-02-10", "end": "2024-02-10"}
+    ).json()
+    assert [row["category"] for row in february] == ["expense-maintenance", "revenue-rent"]
+
+
+def test_household_income_recomputation_reports_and_applies(client):
+    seeded = _seed_household(client, code="INC", income=40000)
+    household_id = seeded["household_id"]
+    for first_name, monthly in (("Lee", 2000.0), ("Sam", 1500.0), ("Kid", None)):
+        client.post(
+            f"/households/{household_id}/residents",
+            json={
+                "household_id": household_id,
+                "first_name": first_name,
+                "last_name": "Income",
+                "date_of_birth": "1985-01-01",
+                "relationship": "Member",
+                "monthly_income": monthly,
+            },
+        )
+    untouched = _seed_household(client, code="NOR", income=20000)["household_id"]
+
+    preview = client.post("/households/income/recompute").json()
+    assert preview["checked"] == 1
+    assert preview["updated_households"] == 0
+    [discrepancy] = preview["discrepancies"]
+    assert discrepancy["household_id"] == household_id
+    assert discrepancy["computed_income"] == 42000.0
+    assert discrepancy["certification_income"] == 40000.0
+
+    since = client.get("/changes/").json()["last_seq"]
+    applied = client.post("/households/income/recompute", params={"apply": "true"}).json()
+    assert (applied["updated_households"], applied["updated_certifications"]) == (1, 1)
+    assert client.get(f"/households/{household_id}").json()["annual_income"] == 42000.0
+    assert client.get(f"/households/{untouched}").json()["annual_income"] == 20000.0
+    certification = client.get(f"/households/{household_id}/certifications").json()[0]
+    assert certification["household_income"] == 42000.0
+    changes = client.get("/changes/", params={"since": since}).json()["changes"]
+    assert {(change["entity"], change["operation"]) for change in changes} == {
+        ("household", "update"),
+        ("certification", "update"),
+    }
+    assert client.post("/households/income/recompute").json()["discrepancies"] == []
+
+
+def test_rent_limit_violations_sql_and_rule_agree(client):
+    from app.services import rent_limits
+    from app.services.income_limits import IncomeLimitTable
+
+    seeded = _seed_household(client, code="RNT", income=30000)
+    program_id = client.post(
+        "/programs/",
+        json={"name": "HOME", "category": "Grant", "income_limit_percent": 60, "rent_limit_percent": 50},
+    ).json()["id"]
+    limit = rent_limits.max_gross_rent(IncomeLimitTable.flat(), None, 50, 2)
+    today = date.today()
+    for age, tenant_rent in enumerate((limit - 200, limit)):
+        client.post(
+            f"/households/{seeded['household_id']}/certifications",
+            json={
+                "household_id": seeded["household_id"],
+                "program_id": program_id,
+                "effective_date": (today - timedelta(days=age)).isoformat(),
+                "next_due_date": (today + timedelta(days=365)).isoformat(),
+                "household_income": 30000,
+                "contract_rent": 1500,
+                "tenant_rent": tenant_rent,
+                "utility_allowance": 100,
+            },
+        )
+
+    violations = client.get("/compliance/rent-limits").json()
+    assert [row["issue"] for row in violations] == [
+        f"Gross rent ${limit + 100:,.0f} exceeds limit ${limit:,.0f}"
+    ]
+    sweep = client.get("/compliance/sweep", params={"rule": "rent-limit"}).json()
+    assert sweep["issues"] == violations
+    assert sweep["rules"][0]["name"] == "rent-limit"
+    assert client.get("/compliance/sweep", params={"rule": "nope"}).status_code == 404
+
+
+def test_dashboard_matches_individual_reports(client):
+    first = _seed_household(client, code="DSH1")
+    _seed_household(client, code="DSH2", income=90000)
+    client.post(
+        "/units/",
+        json={"property_id": first["property_id"], "number": "2", "bedrooms": 1, "bathrooms": 1.0},
+    )
+    client.post(
+        "/properties/",
+        json={
+            "name": "Empty",
+            "code": "EMPTY",
+            "address_line1": "2 Test Way",
+            "city": "Denver",
+            "state": "CO",
+            "postal_code": "80202",
+        },
+    )
+
+    resp = client.get("/reports/dashboard")
+    assert resp.status_code == 200
+    dashboard = resp.json()
+    assert dashboard["occupancy"] == client.get("/reports/occupancy").json()
+    assert dashboard["rent"] == client.get("/reports/rent").json()
+    assert dashboard["noi"] == client.get("/reports/noi").json()
+    issues = client.get("/compliance/issues").json()
+    assert dashboard["compliance"]["issues"] == issues
+    assert dashboard["compliance"]["total"] == len(issues)
+    assert sum(dashboard["compliance"]["by_severity"].values()) == len(issues)
+
+
+def test_metrics_report_single_flight_counters(client):
+    _seed_household(client, code="MET")
+    client.get("/reports/rent")
+    client.get("/compliance/issues")
+    counters = client.get("/metrics").json()["single_flight"]
+    assert counters["rent_projection"] == {"calls": 1, "collapsed": 0}
+    assert counters["portfolio_issues"] == {"calls": 1, "collapsed": 0}
+
+
+def test_trace_recorder_and_loadtest_replay(engine, tmp_path):
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app import loadtest
+    from app.db import get_session
+    from app.main import create_app
+
+    trace_path = tmp_path / "trace.jsonl"
+    app = create_app(trace_path=str(trace_path))
+
+    def override_get_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    with TestClient(app) as recording:
+        seeded = _seed_household(recording, code="TRC")
+        recording.get("/search/", params={"q": "Household TRC"})
+        recording.get(f"/households/{seeded['household_id']}")
+        recording.get("/households/999999")
+
+    entries = loadtest.load_trace(str(trace_path))
+    raw = trace_path.read_text()
+    assert "Household TRC" not in raw and "Property TRC" not in raw
+    assert entries[0].method == "POST" and entries[0].path == "/properties/"
+    assert entries[0].body["name"].startswith("anon-")
+    assert entries[0].body["city"] == "Denver"
+
+    # The test engine shares one in-memory connection, so only reads run concurrently.
+    reads = [entry for entry in entries if entry.method == "GET"] * 3
+    with TestClient(app) as target:
+        stats = {row.route: row for row in loadtest.replay(target, reads, concurrency=4)}
+    assert set(stats) == {"GET /search/", "GET /households/{id}"}
+    lookups = stats["GET /households/{id}"]
+    assert lookups.requests == 6 and lookups.client_errors == 3 and lookups.errors == 0
+    assert lookups.p99_ms >= lookups.p50_ms > 0
+
+
+def test_trace_recorder_scrubs_resident_and_event_details(engine, tmp_path):
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app import loadtest
+    from app.db import get_session
+    from app.main import create_app
+
+    trace_path = tmp_path / "trace.jsonl"
+    app = create_app(trace_path=str(trace_path))
+
+    def override_get_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    with TestClient(app) as recording:
+        seeded = _seed_household(recording, code="PII", income=48213)
+        resident = recording.post(
+            f"/households/{seeded['household_id']}/residents",
+            json={
+                "household_id": seeded["household_id"],
+                "first_name": "Marisol",
+                "last_name": "Quintero",
+                "date_of_birth": "1957-03-14",
+                "relationship": "Head",
+                "disability_status": "Mobility impairment",
+                "monthly_income": 1873.5,
+            },
+        )
+        event = recording.post(
+            "/compliance/events",
+            json={
+                "household_id": seeded["household_id"],
+                "program_id": seeded["program_id"],
+                "event_type": "Recertification",
+                "finding": "Unreported child support from ex-spouse",
+                "severity": "High",
+                "occurred_on": date.today().isoformat(),
+                "notes": "Tenant disclosed pending eviction case",
+            },
+        )
+        recording.get("/households/", params={"name__contains": "Quintero"})
+    assert resident.status_code == 201 and event.status_code == 201
+
+    raw = trace_path.read_text()
+    for value in (
+        "Marisol",
+        "Quintero",
+        "1957-03-14",
+        "Mobility impairment",
+        "1873.5",
+        "48213",
+        "child support",
+        "eviction",
+    ):
+        assert value not in raw
+    bodies = {entry.path: entry.body for entry in loadtest.load_trace(str(trace_path))}
+    assert bodies["/compliance/events"]["severity"] == "High"
+    assert bodies["/compliance/events"]["household_id"] == seeded["household_id"]
+    assert bodies[f"/households/{seeded['household_id']}/residents"]["monthly_income"] == 0
+
+
+def test_archive_job_moves_closed_years_and_lists_union_when_needed(client, engine):
+    from sqlmodel import Session, select
+
+    from app import models
+    from app.services import archive
+
+    seeded = _seed_household(client, code="ARC")
+    today = date.today()
+    old = date(today.year - 3, 6, 1)
+    posted = [
+        {
+            "property_id": seeded["property_id"],
+            "transaction_date": posted_on.isoformat(),
+            "category": "Revenue",
+            "amount": amount,
+            "external_ref": ref,
+        }
+        for posted_on, amount, ref in (
+            (old, 900.0, "ARC-1"),
+            (old + timedelta(days=1), 100.0, None),
+            (today, 500.0, None),
+        )
+    ]
+    for payload in posted:
+        client.post("/transactions/", json=payload)
+    for resolved_on in (old, None):
+        client.post(
+            "/compliance/events",
+            json={
+                "household_id": seeded["household_id"],
+                "program_id": seeded["program_id"],
+                "event_type": "Audit",
+                "finding": "Missing form",
+                "severity": "Low",
+                "occurred_on": old.isoformat(),
+                "resolved_on": resolved_on and resolved_on.isoformat(),
+            },
+        )
+    summary = client.get("/reports/operating-summary").json()
+    listed = client.get("/transactions/", params={"sort": "id"}).json()
+
+    job = client.post("/jobs/archive", json={"resolved_months": 12}).json()
+    result = client.get(f"/jobs/{job['id']}/result").json()
+    assert result["transactions"] == 2
+    assert result["compliance_events"] == 1
+    assert result["transactions_through"] == (old + timedelta(days=1)).isoformat()
+
+    with Session(engine) as session:
+        assert len(session.exec(select(models.FinancialTransaction)).all()) == 1
+        assert archive.source(session, "transactions", today) is models.FinancialTransaction
+        assert archive.source(session, "transactions", old) is not models.FinancialTransaction
+    assert client.get("/transactions/", params={"sort": "id"}).json() == listed
+    recent = client.get("/transactions/", params={"start_date": today.isoformat()})
+    assert [row["amount"] for row in recent.json()] == [500.0]
+    assert client.get("/reports/operating-summary").json() == summary
+    # An archived reference is still known to both write paths.
+    assert client.post("/transactions/", json=posted[0]).status_code == 409
+    assert client.put("/transactions/", json=posted[:1]).json()["written"] == 0
+    assert client.get("/reports/operating-summary").json() == summary
+    assert client.get("/reports/ledger/verify").json()["balanced"] is True
+    events = client.get("/compliance/events", params={"sort": "id"}).json()
+    assert [event["resolved_on"] for event in events] == [old.isoformat(), None]
+
+
+def test_feed_upserts_are_idempotent_on_natural_keys(client):
+    properties = [
+        {
+            "name": f"Feed {code}",
+            "code": code,
+            "address_line1": "1 Feed St",
+            "city": "Denver",
+            "state": "CO",
+            "postal_code": "80202",
+        }
+        for code in ("FD1", "FD2")
+    ]
+    first = client.put("/properties/", json=properties).json()
+    assert first["written"] == 2
+    repeat = client.put("/properties/", json=properties).json()
+    assert repeat == {"received": 2, "written": 0, "unchanged": 2, "ids": []}
+    properties[1]["city"] = "Boulder"
+    assert client.put("/properties/", json=properties).json()["ids"] == first["ids"][1:]
+    assert client.post("/properties/", json=properties[0]).status_code == 409
+
+    property_id = first["ids"][0]
+    units = [{"property_id": property_id, "number": "101", "bedrooms": 2, "bathrooms": 1.0}]
+    unit_id = client.put("/units/", json=units).json()["ids"][0]
+    assert client.put("/units/", json=units).json()["written"] == 0
+    assert client.post("/units/", json=units[0]).status_code == 409
+    assert client.put("/units/", json=[dict(units[0], property_id=999)]).status_code == 404
+
+    today = date.today()
+    households = [
+        {
+            "unit_id": unit_id,
+            "name": "Feed Household",
+            "move_in_date": today.isoformat(),
+            "annual_income": 30000,
+            "household_size": 2,
+        }
+    ]
+    household_id = client.put("/households/", json=households).json()["ids"][0]
+    program_id = client.post(
+        "/programs/", json={"name": "HCV", "category": "Voucher", "income_limit_percent": 50}
+    ).json()["id"]
+    certification = {
+        "household_id": household_id,
+        "program_id": program_id,
+        "effective_date": today.isoformat(),
+        "next_due_date": (today + timedelta(days=365)).isoformat(),
+        "household_income": 30000,
+        "contract_rent": 1100,
+        "tenant_rent": 450,
+        "utility_allowance": 75,
+    }
+    assert client.put("/households/certifications", json=[certification]).json()["written"] == 1
+    certification["tenant_rent"] = 475
+    assert client.put("/households/certifications", json=[certification]).json()["written"] == 1
+    stored = client.get(f"/households/{household_id}/certifications").json()
+    assert [row["tenant_rent"] for row in stored] == [475]
+
+    transactions = [
+        {
+            "property_id": property_id,
+            "transaction_date": today.isoformat(),
+            "category": "Revenue",
+            "amount": 475.0,
+            "external_ref": f"AGENCY-{n}",
+        }
+        for n in range(3)
+    ]
+    assert client.put("/transactions/", json=transactions).json()["written"] == 3
+    transactions[0]["amount"] = 1.0
+    assert client.put("/transactions/", json=transactions).json()["written"] == 0
+    assert client.put("/transactions/", json=[dict(transactions[0], external_ref=None)]).status_code == 400
+    summary = client.get("/reports/operating-summary", params={"property_id": property_id}).json()
+    assert summary == {"Revenue": 1425.0}
+    assert client.get("/reports/ledger/verify").json()["balanced"] is True
+
+
+def test_occupancy_snapshots_build_a_history(client, engine):
+    from sqlmodel import Session
+
+    from app import models
+
+    seeded = _seed_household(client, code="HIS")
+    second_unit = client.post(
+        "/units/",
+        json={"property_id": seeded["property_id"], "number": "2", "bedrooms": 1, "bathrooms": 1.0},
+    ).json()["id"]
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    with Session(engine) as session:
+        # Yesterday's job run; the job itself only records today.
+        session.add(
+            models.OccupancySnapshot(
+                property_id=seeded["property_id"],
+                snapshot_date=yesterday,
+                total_units=1,
+                occupied_units=1,
+                vacant_by_bedroom='{"2":0}',
+                ami_average=None,
+            )
+        )
+        session.commit()
+    rejected = client.post("/jobs/occupancy-snapshot", json={"snapshot_date": yesterday.isoformat()})
+    assert rejected.status_code == 422
+
+    job = client.post("/jobs/occupancy-snapshot", json={}).json()
+    assert client.get(f"/jobs/{job['id']}/result").json() == 1
+    before = client.get(
+        "/reports/occupancy/history", params={"property_id": seeded["property_id"], "start": today.isoformat()}
+    ).json()
+    assert [(point["occupied_units"], point["vacant_by_bedroom"]) for point in before] == [
+        (1, {"1": 1, "2": 0})
+    ]
+
+    client.post(
+        "/households/",
+        json={
+            "unit_id": second_unit,
+            "name": "Second Household",
+            "move_in_date": today.isoformat(),
+            "annual_income": 25000,
+            "household_size": 1,
+        },
+    )
+    # Re-running the same day replaces its row with the new state.
+    job = client.post("/jobs/occupancy-snapshot", json={}).json()
+    assert client.get(f"/jobs/{job['id']}/result").json() == 1
+
+    history = client.get(
+        "/reports/occupancy/history",
+        params={"property_id": seeded["property_id"], "start": yesterday.isoformat()},
+    ).json()
+    assert [(point["snapshot_date"], point["occupied_units"]) for point in history] == [
+        (yesterday.isoformat(), 1),
+        (today.isoformat(), 2),
+    ]
+    assert history[0]["vacant_by_bedroom"] == {"2": 0}
+    assert history[1]["vacant_by_bedroom"] == {"1": 0, "2": 0}
+    current = client.get("/reports/occupancy", params={"property_id": seeded["property_id"]}).json()[0]
+    assert history[1]["occupancy_rate"] == current["occupancy_rate"]
+    assert history[1]["total_units"] == current["total_units"] == 2
+    earlier = client.get("/reports/occupancy/history", params={"end": yesterday.isoformat()})
+    assert earlier.json() == history[:1]
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from sqlmodel import Session, select
+
 from app.services import financials
 
 
@@ -13,3 +15,594 @@ def test_budget_variance_and_noi():
     assert variance["revenue-rent"] == -200.0
     assert variance["expense-maintenance"] == 200.0
     assert variance["expense-admin"] == 800.0
+
+
+def test_income_limit_table_prefers_published_limits():
+    import io
+
+    from app.services import income_limits
+
+    areas, limits = income_limits.parse_hud_csv(
+        io.StringIO(
+            "fips,County_Name,median2024,l50_1,l50_4,eli_4,l80_4\n"
+            "08031,Denver County,\"124,000\",43400,62000,37200,99200\n"
+        )
+    )
+    assert [area.area_code for area in areas] == ["08031"]
+    assert areas[0].median_income == 124000.0
+    table = income_limits.IncomeLimitTable(
+        1,
+        {area.area_code: area.median_income for area in areas},
+        {(limit.area_code, limit.ami_percent, limit.household_size): limit.amount for limit in limits},
+    )
+    assert table.limit_for("08031", 50, 4) == 62000.0
+    assert table.limit_for("08031", 30, 4) == 37200.0
+    assert table.limit_for("08031", 60, 4) == 124000.0 * 0.6
+    assert table.limit_for("99999", 60, 6) == income_limits.estimated_limit(65000.0, 60, 6)
+    assert table.limit_for(None, 60, 2) == 65000.0 * 0.6
+
+
+def test_report_pack_runner_uses_process_pool(tmp_path):
+    from datetime import date, timedelta
+
+    from sqlmodel import Session, SQLModel
+
+    from app import db, models
+    from app.services import ledger, report_packs
+
+    engine = db.create_db_engine(f"sqlite:///{tmp_path / 'packs.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for index in range(5):
+            property_ = models.Property(
+                name=f"P{index}", code=f"P{index}", address_line1="1 Way",
+                city="Denver", state="CO", postal_code="80202",
+            )
+            session.add(property_)
+            session.flush()
+            session.add(models.Unit(property_id=property_.id, number="1", bedrooms=1, bathrooms=1.0))
+            session.add(
+                models.FinancialTransaction(
+                    property_id=property_.id, transaction_date=date.today(),
+                    category="revenue-rent", amount=100.0,
+                )
+            )
+        session.commit()
+        ledger.rebuild_ledger(session)
+
+    runner = report_packs.ReportPackRunner(max_workers=2)
+    try:
+        job = runner.submit(engine)
+        assert job.wait(timeout=60)
+    finally:
+        runner.shutdown()
+    assert job.status == "completed", job.error
+    assert job.shard_count == 4
+    serial = report_packs.merge_shards([report_packs.build_shard(engine, [1, 2, 3, 4, 5])])
+    assert job.pack.occupancy == serial.occupancy
+    assert job.pack.operating_summary == {"revenue-rent": 500.0}
+    cents = report_packs.ShardResult(
+        occupancy=[], rent=[], operating_summary={"revenue-rent": 0.1}, compliance_issues=[]
+    )
+    assert report_packs.merge_shards([cents] * 3).operating_summary == {"revenue-rent": 0.3}
+
+    bounded = report_packs.ReportPackRunner(max_workers=1, max_jobs=2)
+    in_memory = db.create_db_engine("sqlite://")
+    SQLModel.metadata.create_all(in_memory)
+    jobs = [bounded.submit(in_memory) for _ in range(3)]
+    assert len(bounded) == 2
+    assert bounded.get(jobs[0].id) is None
+    bounded.result_ttl = timedelta(0)
+    assert bounded.get(jobs[2].id) is None
+
+
+def test_job_queue_deduplicates_and_expires(session):
+    from datetime import datetime, timedelta
+
+    from app import models
+    from app.services import jobs
+
+    params = jobs.ReportWindowParams(property_id=1)
+    running = models.ReportJob(
+        id="running",
+        kind="noi",
+        params_key=jobs.params_key("noi", params),
+        parameters=params.json(),
+        status="running",
+        submitted_at=datetime.utcnow(),
+        owner="other-worker",
+        heartbeat_at=datetime.utcnow(),
+    )
+    expired = models.ReportJob(
+        id="expired",
+        kind="rent",
+        params_key="stale",
+        parameters="{}",
+        status="completed",
+        submitted_at=datetime.utcnow() - timedelta(days=2),
+        expires_at=datetime.utcnow() - timedelta(days=1),
+    )
+    session.add(running)
+    session.add(expired)
+    session.commit()
+
+    queue = jobs.JobQueue(max_workers=1)
+    try:
+        duplicate = queue.submit(session, "noi", {"property_id": 1})
+    finally:
+        queue.shutdown()
+    assert duplicate.id == "running"
+    assert session.get(models.ReportJob, "expired") is None
+
+    # Another live worker's job survives this process booting...
+    queue = jobs.JobQueue(max_workers=1)
+    assert queue.recover(session) == 0
+    # ...until its heartbeat goes stale.
+    running.heartbeat_at = datetime.utcnow() - queue.stale_after * 2
+    session.add(running)
+    session.commit()
+    assert queue.recover(session) == 1
+    session.refresh(running)
+    assert running.status == "failed"
+    assert running.expires_at is not None
+    # The stopped worker's late finish does not overwrite the failure.
+    queue._run(session.get_bind(), "running")
+    session.refresh(running)
+    assert running.status == "failed"
+    try:
+        fresh = queue.submit(session, "noi", {"property_id": 1})
+    finally:
+        queue.shutdown()
+    assert fresh.id != "running" and fresh.status == "completed"
+    assert fresh.owner == queue.owner
+
+
+def test_report_jobs_allow_one_active_job_per_key(session):
+    from datetime import datetime
+
+    import pytest
+    from sqlalchemy.exc import IntegrityError
+
+    from app import models
+
+    def job(id_: str, status: str) -> models.ReportJob:
+        return models.ReportJob(
+            id=id_, kind="noi", params_key="same", parameters="{}", status=status,
+            submitted_at=datetime.utcnow(),
+        )
+
+    session.add_all([job("done-1", "completed"), job("done-2", "failed"), job("active", "pending")])
+    session.commit()
+    session.add(job("duplicate", "running"))
+    with pytest.raises(IntegrityError):
+        session.commit()
+
+
+def test_job_queue_shutdown_fails_cancelled_jobs(tmp_path, monkeypatch):
+    import threading
+    import time
+    from datetime import timedelta
+
+    from sqlmodel import Session, SQLModel
+
+    from app import db, models
+    from app.services import jobs
+
+    release = threading.Event()
+    monkeypatch.setitem(
+        jobs.JOB_KINDS,
+        "blocking",
+        jobs.JobKind(jobs.PropertyParams, lambda session, p: release.wait(10)),
+    )
+    engine = db.create_db_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    SQLModel.metadata.create_all(engine)
+    queue = jobs.JobQueue(max_workers=1, heartbeat_interval=timedelta(milliseconds=20))
+    with Session(engine) as session:
+        first = queue.submit(session, "blocking", {"property_id": 1}).id
+        queued = queue.submit(session, "blocking", {"property_id": 2})
+        submitted_beat, queued = queued.heartbeat_at, queued.id
+        while session.get(models.ReportJob, first, populate_existing=True).status != "running":
+            time.sleep(0.01)
+        # Queued jobs are kept alive too, so other workers do not fail them.
+        while session.get(models.ReportJob, queued, populate_existing=True).heartbeat_at == submitted_beat:
+            time.sleep(0.01)
+    threading.Timer(0.2, release.set).start()
+    queue.shutdown()
+
+    with Session(engine) as session:
+        assert session.get(models.ReportJob, first).status == "completed"
+        cancelled = session.get(models.ReportJob, queued)
+        assert cancelled.status == "failed"
+        assert cancelled.expires_at is not None
+
+
+def test_ledger_window_totals_and_verification(session):
+    from datetime import date
+
+    from app import crud, models
+    from app.services import financials, ledger
+
+    property_ = crud.create_property(
+        session,
+        models.Property(
+            name="Ledger", code="LED", address_line1="1 Way", city="Denver",
+            state="CO", postal_code="80202",
+        ),
+    )
+
+    def post(day: date, category: str, amount: float) -> None:
+        crud.create_transaction(
+            session,
+            models.FinancialTransaction(
+                property_id=property_.id, transaction_date=day, category=category, amount=amount
+            ),
+        )
+
+    post(date(2024, 1, 15), "revenue-rent", 1000.0)
+    post(date(2024, 3, 1), "revenue-rent", 1000.0)
+    post(date(2024, 2, 1), "revenue-rent", 1000.0)  # back-dated
+    post(date(2024, 2, 1), "expense-maintenance", 250.0)
+    post(date(2023, 12, 31), "expense-admin", 75.0)
+
+    assert financials.operating_summary(session) == {
+        "revenue-rent": 3000.0,
+        "expense-maintenance": 250.0,
+        "expense-admin": 75.0,
+    }
+    assert financials.operating_summary(
+        session, start=date(2024, 2, 1), end=date(2024, 2, 29)
+    ) == {"revenue-rent": 1000.0, "expense-maintenance": 250.0}
+    assert financials.operating_summary(session, start=date(2024, 3, 2)) == {}
+
+    march = session.exec(
+        select(models.LedgerBalance).where(models.LedgerBalance.balance_date == date(2024, 3, 1))
+    ).one()
+    assert march.cumulative_amount == 3000.0
+    assert ledger.verify_ledger(session).balanced
+
+    march.cumulative_amount = 10.0
+    session.add(march)
+    session.commit()
+    report = ledger.verify_ledger(session)
+    assert not report.balanced
+    assert [item.balance_date for item in report.discrepancies] == [date(2024, 3, 1)]
+    ledger.rebuild_ledger(session)
+    assert ledger.verify_ledger(session).balanced
+
+
+def test_group_commit_batches_concurrent_postings(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import date
+
+    from sqlmodel import Session, SQLModel
+
+    from app import crud, db, models
+    from app.services import ledger
+    from app.services.group_commit import GroupCommitWriter
+
+    engine = db.create_db_engine(f"sqlite:///{tmp_path / 'writes.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        property_id = crud.create_property(
+            session,
+            models.Property(
+                name="GC", code="GC", address_line1="1 Way", city="Denver",
+                state="CO", postal_code="80202",
+            ),
+        ).id
+
+    writer = GroupCommitWriter(engine, max_batch=64, max_delay_ms=20)
+    try:
+        def post(index: int):
+            return writer.submit(
+                models.FinancialTransaction(
+                    property_id=property_id,
+                    transaction_date=date(2024, 1, 1 + index % 28),
+                    category="revenue-rent",
+                    amount=10.0 if index != 7 else None,
+                )
+            )
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            futures = list(pool.map(post, range(200)))
+        outcomes = [future.exception(timeout=30) or future.result() for future in futures]
+    finally:
+        writer.close()
+
+    failed = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    ids = [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+    assert len(failed) == 1
+    assert len(set(ids)) == 199
+    assert writer.rows == 199
+    assert writer.batches < 199
+    with Session(engine) as session:
+        assert len(crud.list_transactions(session)) == 199
+        assert ledger.verify_ledger(session).balanced
+
+
+def test_init_db_skips_ddl_when_schema_version_matches(tmp_path):
+    from app import db, models
+
+    engine = db.create_db_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    assert db.init_db(engine) is True
+    assert db.init_db(engine) is False
+    with db.session_scope(engine) as session:
+        stored = session.get(models.SchemaVersion, 1)
+        assert stored.version == db.schema_version(engine)
+        stored.version = "stale"
+        session.add(stored)
+    assert db.init_db(engine) is True
+    engine.dispose()
+
+
+def test_init_db_backfills_ledger_for_existing_transactions(tmp_path):
+    from datetime import date
+
+    from sqlalchemy import text
+    from sqlmodel import Session, SQLModel
+
+    from app import db, models
+    from app.services import financials
+
+    engine = db.create_db_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        # Written without crud, as before the ledger existed.
+        session.add(
+            models.Property(
+                name="Old", code="OLD", address_line1="1 Way", city="Denver",
+                state="CO", postal_code="80202",
+            )
+        )
+        session.flush()
+        session.add(
+            models.FinancialTransaction(
+                property_id=1, transaction_date=date(2024, 3, 1), category="Revenue", amount=100.0
+            )
+        )
+        session.commit()
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE ledgerbalance"))
+        connection.execute(text("DROP TABLE schemaversion"))
+    assert db.init_db(engine) is True
+    with Session(engine) as session:
+        assert financials.operating_summary(session) == {"Revenue": 100.0}
+    engine.dispose()
+
+
+def test_init_db_refuses_unique_index_over_duplicate_keys(tmp_path):
+    import pytest
+    from sqlalchemy import text
+
+    from app import db
+
+    engine = db.create_db_engine(f"sqlite:///{tmp_path / 'duplicates.db'}")
+    db.init_db(engine)
+    with engine.begin() as connection:
+        # A database from before property codes were unique.
+        connection.execute(text("DROP INDEX ux_property_code"))
+        connection.execute(text("DELETE FROM schemaversion"))
+        for name in ("First", "Second"):
+            connection.execute(
+                text(
+                    "INSERT INTO property (name, code, type, address_line1, city, state, postal_code) "
+                    "VALUES (:name, 'DUP', 'Affordable', '1 Way', 'Denver', 'CO', '80202')"
+                ),
+                {"name": name},
+            )
+    with pytest.raises(RuntimeError, match=r"ux_property_code.*\('DUP'\) x2"):
+        db.init_db(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM property WHERE name = 'Second'"))
+    assert db.init_db(engine) is True
+    with engine.connect() as connection:
+        indexes = connection.execute(text("PRAGMA index_list(property)")).all()
+    assert any(row.name == "ux_property_code" and row.unique for row in indexes)
+    engine.dispose()
+
+
+def test_is_unique_violation_ignores_other_integrity_errors():
+    import sqlite3
+
+    from sqlalchemy.exc import IntegrityError
+
+    from app.db import is_unique_violation
+
+    def error(message: str) -> IntegrityError:
+        return IntegrityError("INSERT ...", {}, sqlite3.IntegrityError(message))
+
+    assert is_unique_violation(error("UNIQUE constraint failed: property.code"))
+    assert not is_unique_violation(error("NOT NULL constraint failed: property.city"))
+    assert not is_unique_violation(error("FOREIGN KEY constraint failed"))
+
+
+def test_rent_roll_export_memory_is_independent_of_row_count(tmp_path):
+    import tracemalloc
+    from datetime import date
+
+    from sqlalchemy import insert
+
+    from app import db, models
+    from app.services import exports
+
+    def peak_for(rows: int) -> int:
+        engine = db.create_db_engine(f"sqlite:///{tmp_path / f'export-{rows}.db'}")
+        db.init_db(engine)
+        with Session(engine) as session:
+            session.add(
+                models.Property(
+                    name="Export", code="EX", address_line1="1 Main", city="Denver", state="CO", postal_code="80202"
+                )
+            )
+            session.execute(
+                insert(models.Unit),
+                [{"property_id": 1, "number": f"{i:06d}", "bedrooms": 2, "bathrooms": 1.0} for i in range(rows)],
+            )
+            session.execute(
+                insert(models.Household),
+                [
+                    {
+                        "unit_id": i + 1,
+                        "name": f"Household {i}",
+                        "move_in_date": date(2024, 1, 1),
+                        "annual_income": 30000.0,
+                        "household_size": 2,
+                    }
+                    for i in range(rows)
+                ],
+            )
+            session.commit()
+
+        tracemalloc.start()
+        size = sum(
+            len(chunk)
+            for chunk in exports.stream_export(
+                engine, exports.RENT_ROLL_HEADER, exports.rent_roll_rows, compress=True
+            )
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        engine.dispose()
+        assert size > 0
+        return peak
+
+    small, large = peak_for(5_000), peak_for(50_000)
+    assert large < small * 1.5
+
+
+def test_rule_engine_single_pass_matches_snapshot(session):
+    from datetime import date, timedelta
+
+    from app import models
+    from app.services import rules
+    from app.services.compliance import ComplianceService
+    from app.services.snapshot import PortfolioSnapshot
+
+    today = date.today()
+    session.add(models.Property(name="Rules", code="RU", address_line1="1", city="D", state="CO", postal_code="1"))
+    session.add(models.Program(name="LIHTC", category="Tax Credit", income_limit_percent=60))
+    session.add(models.Unit(property_id=1, number="1", bedrooms=2, bathrooms=1))
+    session.add(models.Household(unit_id=1, name="Over", move_in_date=today, annual_income=99000, household_size=2))
+    session.add(
+        models.Certification(
+            household_id=1,
+            program_id=1,
+            effective_date=today,
+            next_due_date=today - timedelta(days=1),
+            household_income=99000,
+            contract_rent=1200,
+            tenant_rent=400,
+            utility_allowance=0,
+        )
+    )
+    session.commit()
+
+    queries = []
+
+    def source(columns):
+        queries.append(columns)
+        return rules.database_rows(session, columns)
+
+    context = ComplianceService(session).rule_context()
+    found = {
+        name: issue.issue
+        for name, issue in rules.iter_findings(source, rules.select_rules(), context)
+    }
+    assert len(queries) == 1
+    assert set(queries[0]) >= {"property.ami_area", "certification.utility_allowance"}
+    assert found == {
+        "certification-due": "Certification due",
+        "income-limit": "Household income $99,000 exceeds limit $39,000",
+    }
+    opt_in = rules.select_rules(["utility-allowance-missing"])
+    assert [issue.issue for _, issue in rules.iter_findings(source, opt_in, context)] == [
+        "Utility allowance missing"
+    ]
+
+    sweep = ComplianceService(session).sweep()
+    assert sweep.rows_scanned == 1
+    assert [timing.name for timing in sweep.rules] == ["certification-due", "income-limit", "rent-limit"]
+    assert [timing.findings for timing in sweep.rules] == [1, 1, 0]
+    snapshot = PortfolioSnapshot.build(session)
+    assert ComplianceService(session, snapshot=snapshot).sweep().issues == sweep.issues
+
+    # Run alone, the due-date rule narrows the query rather than the scan.
+    session.add(
+        models.Certification(
+            household_id=1, program_id=1, effective_date=today - timedelta(days=1),
+            next_due_date=today + timedelta(days=365), household_income=20000,
+            contract_rent=1200, tenant_rent=400, utility_allowance=50,
+        )
+    )
+    session.commit()
+    due_sweep = ComplianceService(session).sweep(["certification-due"])
+    assert due_sweep.rows_scanned == 1
+    assert [issue.issue for issue in ComplianceService(session).certifications_due()] == [
+        "Certification due"
+    ]
+
+
+def test_single_flight_collapses_concurrent_identical_calls(session):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services.single_flight import SingleFlight
+
+    flight = SingleFlight()
+    release = threading.Event()
+    computed = []
+
+    def report(session, property_id, *, start=None):
+        computed.append(property_id)
+        release.wait(5)
+        return [property_id]
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        futures = [executor.submit(flight.call, session, report, 1, start=None) for _ in range(5)]
+        other = executor.submit(flight.call, session, report, 2)
+        deadline = time.monotonic() + 5
+        while flight.collapsed["report"] < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert other.result() == [2]
+    assert results == [[1]] * 5
+    assert all(result is results[0] for result in results)
+    assert sorted(computed) == [1, 2]
+    assert flight.stats() == {"report": {"calls": 2, "collapsed": 4}}
+    # Nothing is cached once the shared computation has finished.
+    assert flight.call(session, report, 1) == [1]
+    assert flight.stats()["report"]["calls"] == 3
+
+
+def test_reference_cache_tracks_writes_and_falls_back_on_misses(session):
+    from app import crud, models
+    from app.services.reference import get_reference_cache
+
+    cache = get_reference_cache(session)
+    property_ = crud.create_property(
+        session,
+        models.Property(
+            name="Cached",
+            code="CCH",
+            address_line1="1 Main",
+            city="Denver",
+            state="CO",
+            postal_code="80202",
+        ),
+    )
+    assert cache.property_code_exists("CCH")
+    assert cache.property_exists(session, property_.id)
+    assert cache.missing(session, models.Property, [property_.id, 999]) == [999]
+
+    # Written outside crud, as another process would: found by primary key on first use.
+    program = models.Program(name="Outside", category="Grant", income_limit_percent=50)
+    session.add(program)
+    session.commit()
+    assert cache.program_name(session, program.id) == "Outside"
+    assert not cache.program_exists(session, program.id + 1)
+
+    crud.bulk_update(session, models.Program, [{"id": program.id, "name": "Renamed"}])
+    assert cache.program_name(session, program.id) == "Renamed"